@@ -0,0 +1,266 @@
+"""
+Daily Seongsu production DAG: collect → merge → features → store → verify, plus training.
+
+Every run processes only its own data interval (one KST day):
+- collect_subway waits (reschedule-mode sensor) until Seoul publishes that day, then stores it
+- collect_weather stores that day from the Open-Meteo archive (best effort: until the archive
+  publishes it, the merge falls back to the hourly nowcast roll-ups)
+- merge / features read the FEATURE_CONTEXT_DAYS before the day as context and keep only
+  the day's feature row (gap-flagged lags stay NaN); store upserts it into 'model_features'
+- train runs for the latest interval only (skipped during catchup)
+
+Steps hand artifact keys (not DataFrames) to each other over XCom; the frames live in the
+step cache (STEP_CACHE_DIR must be shared by the workers).
+
+API rate limiting uses pools, so parallel catchup runs share the upstream quotas:
+    airflow pools set seoul_api 2 "Seoul Open Data (CardSubwayStatsNew)"
+    airflow pools set open_meteo_api 2 "Open-Meteo archive"
+
+Local test without external services (SQLite Supabase stand-in + fixture API server):
+    python airflow/dags/daily_seongsu_pipeline.py [YYYY-MM-DD]
+"""
+import os
+import sys
+import pendulum
+from datetime import timedelta
+
+from airflow import DAG
+from airflow.operators.latest_only import LatestOnlyOperator
+from airflow.operators.python import PythonOperator
+from airflow.sensors.python import PythonSensor
+
+# Repo root (airflow/dags/ -> repo) so the crawler package is importable by the workers.
+# crawler modules are imported inside the callables to keep DAG parsing fast.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+KST = "Asia/Seoul"
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(REPO_DIR, "data", "models"))
+
+
+def interval_day(data_interval_start):
+    """
+    The KST day (YYYYMMDD) a run is responsible for.
+    """
+    return data_interval_start.in_timezone(KST).strftime("%Y%m%d")
+
+
+def collect_subway(data_interval_start, **_):
+    """
+    Sensor callable: stores the day's subway rows and returns True once Seoul has published them.
+    """
+    from crawler.scraper import SeoulSubwayCollector
+    from crawler.storage_supabase import get_storage
+
+    day = interval_day(data_interval_start)
+    rows = SeoulSubwayCollector().fetch_daily_passenger_count(day)
+    if not rows:
+        print(f"Subway data for {day} not published yet.")
+        return False
+    get_storage().save_subway_data(rows)
+    return True
+
+
+def collect_weather(data_interval_start, **_):
+    from crawler.backfill_weather import run_weather_backfill
+    from crawler.run_pipeline import drain_logs
+
+    day = interval_day(data_interval_start)
+    drain_logs(run_weather_backfill(day, day), "collect_weather")
+
+
+def merge(data_interval_start, **_):
+    """
+    Merges the day plus its feature context window. Returns the merged artifact key (XCom).
+    """
+    from crawler.pipeline import FEATURE_CONTEXT_DAYS, DataPipeline
+    from crawler.run_pipeline import check_step
+
+    day = data_interval_start.in_timezone(KST)
+    pipeline = DataPipeline()
+    # A parallel run may have synced the mirror moments ago: force a sync so the row this
+    # run's sensor just stored is read (the TTL would otherwise serve the mirror as-is)
+    pipeline.mirror.sync("subway_traffic", force=True)
+    msg, _ = pipeline.step_7_merge(
+        start_date=day.subtract(days=FEATURE_CONTEXT_DAYS).strftime("%Y-%m-%d"),
+        end_date=day.strftime("%Y-%m-%d"),
+    )
+    check_step(msg, "merge")
+    return pipeline.default_session.merged_key
+
+
+def features(ti, data_interval_start, **_):
+    """
+    Features for the interval's own day over the merge window. Lags the context cannot supply
+    (gaps at 1, 7 or 364 days, an incomplete rolling window, missing weather) stay NaN and
+    are flagged by the lag_{n}d_is_gap masks, so historical gaps never fail the run.
+    Fails only when the day has no subway row for the primary station.
+    """
+    from crawler.pipeline import DataPipeline
+    from crawler.run_pipeline import PipelineStepError, check_step
+    from crawler.scraper import SUBWAY_STATIONS
+
+    day = data_interval_start.in_timezone(KST).strftime("%Y-%m-%d")
+    pipeline = DataPipeline()
+    pipeline.default_session.merged_key = ti.xcom_pull(task_ids="merge")
+    msg, _ = pipeline.step_8_features(incremental=False, day=day)
+    check_step(msg, "features")
+
+    primary_station, primary_line = SUBWAY_STATIONS[0]
+    df = pipeline.frames.get(pipeline.default_session.final_key)
+    if df is None or not ((df['station_name'] == primary_station) & (df['line_number'] == primary_line)).any():
+        raise PipelineStepError(f"No {primary_station} ({primary_line}) subway row for {day}")
+    return pipeline.default_session.final_key
+
+
+def store(ti, **_):
+    from crawler.pipeline import DataPipeline
+    from crawler.run_pipeline import check_step
+
+    pipeline = DataPipeline()
+    pipeline.default_session.final_key = ti.xcom_pull(task_ids="features")
+    check_step(pipeline.step_9_store(), "store")
+
+
+def verify(**_):
+    from crawler.pipeline import DataPipeline
+    from crawler.run_pipeline import check_step
+
+    msg, _ = DataPipeline().step_10_verify()
+    check_step(msg, "verify")
+
+
+def train(ds, **_):
+    """
+    Level 4 model comparison on the whole Feature Store (time-ordered 80/20 split).
+    Writes the RMSE per model and the best model to {MODEL_DIR}/metrics_{ds}.json.
+    scikit-learn is declared in requirements.txt (also used by the Level 4 tab).
+    """
+    import json
+    import numpy as np
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error
+    from crawler.local_mirror import get_mirror
+    from crawler.storage_supabase import get_storage
+
+    feature_cols = ['lag_1d', 'lag_7d', 'rolling_7d_avg']
+    df = get_mirror(get_storage()).read("model_features").sort_values("date")
+    df = df.dropna(subset=feature_cols + ['total_traffic'])
+    if len(df) < 30:
+        print(f"Only {len(df)} feature rows; skipping training.")
+        return None
+
+    split_idx = int(len(df) * 0.8)
+    train_df, test_df = df.iloc[:split_idx], df.iloc[split_idx:]
+    models = {
+        "Linear Regression": LinearRegression(),
+        "Random Forest": RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42),
+        "Gradient Boosting": GradientBoostingRegressor(n_estimators=50, max_depth=5, random_state=42),
+    }
+    rmse = {}
+    for name, model in models.items():
+        model.fit(train_df[feature_cols], train_df['total_traffic'])
+        y_pred = model.predict(test_df[feature_cols])
+        rmse[name] = float(np.sqrt(mean_squared_error(test_df['total_traffic'], y_pred)))
+
+    best_model = min(rmse, key=rmse.get)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with open(os.path.join(MODEL_DIR, f"metrics_{ds}.json"), "w") as f:
+        json.dump({"ds": ds, "rows": len(df), "rmse": rmse, "best_model": best_model}, f, indent=2)
+    print(f"Best model: {best_model} (RMSE {rmse[best_model]:.2f})")
+    return best_model
+
+
+default_args = {
+    'owner': 'daily_seongsu',
+    'depends_on_past': False,
+    'email_on_failure': False,
+    'email_on_retry': False,
+    'retries': 2,
+    'retry_delay': timedelta(minutes=10),
+    'retry_exponential_backoff': True,
+}
+
+dag = DAG(
+    'daily_seongsu_pipeline',
+    default_args=default_args,
+    description='Daily subway + weather collection, feature store update and training',
+    schedule_interval='@daily',
+    start_date=pendulum.datetime(2024, 1, 1, tz=KST),
+    catchup=True,
+    # Catchup processes several days at once; pools keep the API calls within quota
+    max_active_runs=4,
+    max_active_tasks=8,
+    tags=['daily_seongsu'],
+)
+
+t_subway = PythonSensor(
+    task_id='collect_subway',
+    python_callable=collect_subway,
+    # Seoul publishes a day's ridership a few days later: free the worker slot between pokes
+    mode='reschedule',
+    poke_interval=timedelta(hours=6).total_seconds(),
+    timeout=timedelta(days=7).total_seconds(),
+    pool='seoul_api',
+    dag=dag,
+)
+
+t_weather = PythonOperator(
+    task_id='collect_weather',
+    python_callable=collect_weather,
+    pool='open_meteo_api',
+    dag=dag,
+)
+
+t_merge = PythonOperator(task_id='merge', python_callable=merge, dag=dag)
+t_features = PythonOperator(task_id='features', python_callable=features, dag=dag)
+t_store = PythonOperator(task_id='store', python_callable=store, dag=dag)
+t_verify = PythonOperator(task_id='verify', python_callable=verify, dag=dag)
+t_latest = LatestOnlyOperator(task_id='latest_only', dag=dag)
+t_train = PythonOperator(task_id='train', python_callable=train, dag=dag)
+
+[t_subway, t_weather] >> t_merge >> t_features >> t_store >> t_verify
+t_verify >> t_latest >> t_train
+
+
+if __name__ == "__main__":
+    # Offline dag.test(): every external service is replaced before crawler modules are imported
+    import socket
+    import tempfile
+
+    work_dir = tempfile.mkdtemp(prefix="daily_seongsu_dag_")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    os.environ.update({
+        "API_FIXTURE_URL": f"http://127.0.0.1:{port}",
+        "SUPABASE_BACKEND": "sqlite",
+        "SUPABASE_SQLITE_PATH": os.path.join(work_dir, "supabase.sqlite3"),
+        "LOCAL_MIRROR_DIR": os.path.join(work_dir, "mirror"),
+        "HTTP_CACHE_DIR": os.path.join(work_dir, "http_cache"),
+        "BACKFILL_CHECKPOINT_DIR": os.path.join(work_dir, "checkpoints"),
+        "STEP_CACHE_DIR": os.path.join(work_dir, "step_cache"),
+    })
+    MODEL_DIR = os.path.join(work_dir, "models")
+
+    from crawler.fixture_server import FixtureConfig, start_fixture_server
+    start_fixture_server(FixtureConfig(), port=port)
+
+    from crawler.backfill_subway import run_subway_backfill
+    from crawler.backfill_weather import run_weather_backfill
+    from crawler.pipeline import FEATURE_CONTEXT_DAYS
+
+    logical_date = pendulum.parse(sys.argv[1], tz=KST) if len(sys.argv) > 1 else pendulum.today(KST).subtract(days=10)
+    # Seed the feature context window so the run's own day gets a full feature row
+    day = logical_date.subtract(days=1)
+    seed_start = day.subtract(days=FEATURE_CONTEXT_DAYS).strftime("%Y%m%d")
+    seed_end = day.subtract(days=1).strftime("%Y%m%d")
+    print(f"Seeding {seed_start} ~ {seed_end} from the fixture server...")
+    for logs in (run_subway_backfill(seed_start, seed_end), run_weather_backfill(seed_start, seed_end)):
+        for _ in logs:
+            pass
+
+    print(f"dag.test() for {logical_date.to_date_string()} (work dir: {work_dir})")
+    dag.test(execution_date=logical_date)
@@ -3,7 +3,7 @@ import traceback
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from crawler.scraper import SeoulSubwayCollector
-from crawler.storage_supabase import SupabaseStorage
+from crawler.storage_supabase import get_storage
 
 load_dotenv()
 
@@ -19,7 +19,7 @@ def run_backfill(start_date="2024-01-01", end_date=None):
     
     try:
         collector = SeoulSubwayCollector()
-        storage = SupabaseStorage()
+        storage = get_storage()
         
         current = datetime.strptime(start_date, "%Y%m%d")
         end = datetime.strptime(end_date, "%Y%m%d")
@@ -29,26 +29,30 @@ def run_backfill(start_date="2024-01-01", end_date=None):
         
         logs = []
         
-        while current <= end:
-            target_date = current.strftime("%Y%m%d")
-            print(f"[{processed+1}/{total_days}] Fetching {target_date}...")
-            
-            try:
-                data = collector.fetch_daily_passenger_count(target_date)
-                if data:
-                    _ = storage.save_subway_data(data)
-                    msg = f"✅ {target_date}: Saved {len(data)} rows."
-                else:
-                    msg = f"⚠️ {target_date}: No data from API."
-            except Exception as e:
-                msg = f"❌ {target_date}: Error - {e}"
+        # Rows are buffered across days and upserted in batches (final flush on exit)
+        with storage.buffered_subway_writer() as writer:
+            while current <= end:
+                target_date = current.strftime("%Y%m%d")
+                print(f"[{processed+1}/{total_days}] Fetching {target_date}...")
                 
-            print(msg)
-            logs.append(msg)
-            
-            current += timedelta(days=1)
-            processed += 1
-            time.sleep(0.1) # Rate limit protection
+                try:
+                    data = collector.fetch_daily_passenger_count(target_date)
+                    if data:
+                        _ = writer.add(data)
+                        msg = f"✅ {target_date}: Buffered {len(data)} rows."
+                    else:
+                        msg = f"⚠️ {target_date}: No data from API."
+                except Exception as e:
+                    msg = f"❌ {target_date}: Error - {e}"
+                    
+                print(msg)
+                logs.append(msg)
+                
+                current += timedelta(days=1)
+                processed += 1
+                time.sleep(0.1) # Rate limit protection
+        
+        logs.append(f"💾 Saved {writer.flushed_rows} rows in {writer.batches} batches ({writer.failed_rows} failed).")
             
         return "\n".join(logs)
     except Exception as e:
@@ -0,0 +1,12 @@
+-- Make 'weather_data' upserts idempotent (conflict target: measured_at)
+-- Existing tables created before the unique constraint may contain duplicates from re-run backfills.
+
+-- 1. Keep only the newest row per measured_at
+delete from weather_data a
+using weather_data b
+where a.measured_at = b.measured_at
+  and a.id < b.id;
+
+-- 2. Add the constraint used by upsert(on_conflict="measured_at")
+alter table weather_data
+  add constraint weather_data_measured_at_key unique (measured_at);
@@ -1,21 +1,110 @@
-
 import os
 import time
+import queue
+import asyncio
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from crawler.scraper import SeoulSubwayCollector
-from crawler.storage_supabase import SupabaseStorage
+from crawler.storage_supabase import get_storage
+from crawler.checkpoint import BackfillCheckpoint, missing_dates
 
 
 # Ensure we load .env from the crawler directory
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(env_path)
 
+# Fan-out settings for the async backfill engine.
+# concurrency=1 + 10 req/s reproduces the old sequential loop (sleep 0.1s).
+DEFAULT_CONCURRENCY = int(os.getenv("SUBWAY_BACKFILL_CONCURRENCY", "8"))
+DEFAULT_RATE_LIMIT = float(os.getenv("SUBWAY_BACKFILL_RPS", "10"))
+
+_DONE = object()
+
+
+class AsyncRateLimiter:
+    """
+    Shared rate limiter for the backfill tasks.
+    Spaces request start times so that at most `rate` requests begin per second.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _fetch_days(collector, dates, concurrency, rate_limit, results, stop_event):
+    """
+    Fans fetch_daily_passenger_count out over `dates`.
+    At most `concurrency` requests are in flight; each (date, data, error) is put on `results`
+    as soon as it completes.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncRateLimiter(rate_limit)
+
+    # Dedicated pool: the default executor is capped at cpu_count + 4 workers,
+    # which would silently limit concurrency on our single-vCPU pod.
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="subway-backfill") as executor:
+        async def fetch_one(target_date):
+            async with semaphore:
+                if stop_event.is_set():
+                    return target_date, None, RuntimeError("Cancelled")
+                await limiter.wait()
+                try:
+                    data = await loop.run_in_executor(executor, collector.fetch_daily_passenger_count, target_date)
+                    return target_date, data, None
+                except Exception as e:
+                    return target_date, None, e
+
+        for next_done in asyncio.as_completed([fetch_one(d) for d in dates]):
+            results.put(await next_done)
 
-def run_subway_backfill(start_date="20220101", end_date="20251231"):
+
+def iter_subway_days(collector, dates, concurrency=DEFAULT_CONCURRENCY, rate_limit=DEFAULT_RATE_LIMIT):
+    """
+    Synchronous iterator over (date, data, error) tuples in completion order.
+    The asyncio event loop runs in a background thread so callers (Gradio generators, scripts)
+    keep a plain `for` loop. Closing the iterator early stops scheduling new requests.
+    """
+    results = queue.Queue()
+    stop_event = threading.Event()
+
+    def worker():
+        try:
+            asyncio.run(_fetch_days(collector, dates, max(1, concurrency), rate_limit, results, stop_event))
+        except Exception as e:
+            results.put((None, None, e))
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=worker, name="subway-backfill-loop", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop_event.set()
+
+
+def run_subway_backfill(start_date="20220101", end_date="20251231", concurrency=DEFAULT_CONCURRENCY, rate_limit=DEFAULT_RATE_LIMIT, resume=True):
     """
     Fetches daily subway data from start_date to end_date.
+    Requests are fanned out concurrently (bounded by `concurrency` and `rate_limit` req/s).
+    resume=True skips dates already in 'subway_traffic' or in the local checkpoint.
     Yields logs for real-time Gradio updates.
     """
     if end_date is None:
@@ -27,35 +116,59 @@ def run_subway_backfill(start_date="20220101", end_date="20251231"):
     # 1. Subway Backfill
     try:
         collector = SeoulSubwayCollector()
-        storage = SupabaseStorage()
+        storage = get_storage()
         
-        current = datetime.strptime(start_date, "%Y%m%d")
+        start = datetime.strptime(start_date, "%Y%m%d")
         end = datetime.strptime(end_date, "%Y%m%d")
         
-        total_days = (end - current).days + 1
+        all_dates = [(start + timedelta(days=i)).strftime("%Y%m%d") for i in range((end - start).days + 1)]
+        checkpoint = BackfillCheckpoint("subway")
+        
+        # Resume: only schedule dates missing from both the table and the checkpoint
+        if resume:
+            stored = {
+                d.replace("-", "")
+                for d in storage.fetch_stored_dates("subway_traffic", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), min_rows=len(collector.stations))
+            }
+            dates = missing_dates(all_dates, stored, checkpoint.completed())
+            yield f"♻️ Resume: {len(all_dates) - len(dates)}/{len(all_dates)} days already stored, {len(dates)} to fetch\n"
+        else:
+            dates = all_dates
+        total_days = len(dates)
         processed = 0
         
-        yield "🚇 [Subway] Accessing Seoul Data Plaza API...\n"
+        yield f"🚇 [Subway] Accessing Seoul Data Plaza API (concurrency={concurrency}, {rate_limit:g} req/s)...\n"
+        started_at = time.perf_counter()
         
-        while current <= end:
-            target_date = current.strftime("%Y%m%d")
-            status_prefix = f"[Subway {processed+1}/{total_days}] {target_date}: "
-            
-            try:
-                data = collector.fetch_daily_passenger_count(target_date)
-                if data:
-                    storage.save_subway_data(data)
-                    msg = f"✅ Saved {len(data)} rows"
+        # Rows are buffered across days and upserted in batches (final flush on exit)
+        def on_flush(rows):
+            checkpoint.mark(row["date"] for row in rows)
+        with storage.buffered_subway_writer(on_flush=on_flush) as writer:
+            for target_date, data, error in iter_subway_days(collector, dates, concurrency, rate_limit):
+                processed += 1
+                status_prefix = f"[Subway {processed}/{total_days}] {target_date}: "
+                flushed = 0
+                
+                if error is not None:
+                    msg = f"❌ Error: {str(error)}"
                 else:
-                    msg = "⚠️ No data"
-            except Exception as e:
-                msg = f"❌ Error: {str(e)}"
-            
-            yield f"{status_prefix}{msg}\n"
-            
-            current += timedelta(days=1)
-            processed += 1
-            time.sleep(0.1) # Rate limit protection
+                    try:
+                        if data:
+                            flushed = writer.add(data)
+                            msg = f"✅ Buffered {len(data)} rows"
+                        else:
+                            msg = "⚠️ No data"
+                    except Exception as e:
+                        msg = f"❌ Error: {str(e)}"
+                
+                yield f"{status_prefix}{msg}\n"
+                if flushed:
+                    yield f"💾 Flushed {flushed} rows to Supabase (batch #{writer.batches})\n"
+        
+        yield f"💾 Saved {writer.flushed_rows} rows in {writer.batches} batches ({writer.failed_rows} failed)\n"
+        elapsed = time.perf_counter() - started_at
+        if elapsed > 0:
+            yield f"⏱️ Throughput: {processed / elapsed:.2f} days/sec ({processed} days in {elapsed:.1f}s)\n"
             
     except Exception as e:
         traceback.print_exc()
@@ -64,4 +177,5 @@ def run_subway_backfill(start_date="20220101", end_date="20251231"):
     yield "=== Subway Backfill Complete ==="
 
 if __name__ == "__main__":
-    run_subway_backfill()
+    for line in run_subway_backfill():
+        print(line, end="")
@@ -1,28 +1,110 @@
 
-import requests
+import numpy as np
 import pandas as pd
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Ensure imports work if run directly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from crawler.storage_supabase import SupabaseStorage
+from crawler.storage_supabase import get_storage
+from crawler.http_cache import get_response_cache, ttl_for_date
+from crawler.http_client import api_base, get_transport
+from crawler.checkpoint import BackfillCheckpoint, missing_dates, to_ranges
+from crawler.local_mirror import DailyWeatherStore
+
+# The archive API publishes with a few days' delay; ranges ending before this are immutable
+OPEN_METEO_LAG_DAYS = 7
+# Parallel year-sized chunks per fetch_history call
+OPEN_METEO_WORKERS = 4
+
+
+def split_by_year(start_date, end_date):
+    """
+    Splits [start_date, end_date] (YYYY-MM-DD) into calendar-year (start, end) chunks.
+    """
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    chunks = []
+    while start <= end:
+        chunk_end = min(end, pd.Timestamp(year=start.year, month=12, day=31))
+        chunks.append((start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")))
+        start = chunk_end + pd.Timedelta(days=1)
+    return chunks
 
 class OpenMeteoCollector:
     def __init__(self):
         # Seongsu Station Coordinates
         self.lat = 37.5445
         self.lon = 127.0565
-        self.base_url = "https://archive-api.open-meteo.com/v1/archive"
-        self.storage = SupabaseStorage()
+        self.base_url = api_base("https://archive-api.open-meteo.com") + "/v1/archive"
+        self.storage = get_storage()
+        self.store = DailyWeatherStore()
 
     def fetch_history(self, start_date="2022-01-01", end_date="2025-12-31"):
         """
         Fetches daily weather history from Open-Meteo.
+        Long spans are split into calendar-year chunks fetched in parallel and stitched
+        (past years are immutable, so each chunk is cached independently). A failed chunk is
+        retried once; if it fails again it is reported and left out, and the other years
+        are still returned.
         Params:
             start_date (str): YYYY-MM-DD
             end_date (str): YYYY-MM-DD
         """
+        print(f"🌦️ Fetching Weather from Open-Meteo: {start_date} ~ {end_date}...")
+        
+        chunks = split_by_year(start_date, end_date)
+        if not chunks:
+            print(f"❌ Empty weather range: {start_date} ~ {end_date}.")
+            return pd.DataFrame()
+        with ThreadPoolExecutor(max_workers=min(OPEN_METEO_WORKERS, len(chunks))) as executor:
+            results = list(executor.map(self._try_fetch_range, chunks))
+        for i, chunk in enumerate(chunks):
+            if isinstance(results[i], Exception):
+                print(f"⚠️ Weather chunk {chunk[0]} ~ {chunk[1]} failed ({results[i]}), retrying...")
+                results[i] = self._try_fetch_range(chunk)
+                if isinstance(results[i], Exception):
+                    print(f"❌ Error fetching weather {chunk[0]} ~ {chunk[1]}: {results[i]}")
+        failed = [chunk for chunk, result in zip(chunks, results) if isinstance(result, Exception)]
+        frames = [df for df in results if not isinstance(df, Exception) and not df.empty]
+        
+        if not frames:
+            print("❌ No daily data found.")
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        
+        # Formatting
+        df.rename(columns={
+            "time": "date",
+            "temperature_2m_mean": "avg_temp",
+            "precipitation_sum": "precip_total",
+        }, inplace=True)
+        df = df.sort_values("date").reset_index(drop=True)
+        
+        # Map rain_sum/snowfall_sum to precipitation_type (simplified, vectorized)
+        # PTY: 0=None, 1=Rain, 2=Rain/Snow, 3=Snow
+        df['precipitation_type'] = np.select(
+            [df['snowfall_sum'] > 0, df['rain_sum'] > 0],
+            [3, 1], # Snow, Rain
+            default=0 # None
+        )
+        
+        print(f"✅ Fetched {len(df)} days of weather data ({len(chunks) - len(failed)}/{len(chunks)} chunks).")
+        return df
+
+    def _try_fetch_range(self, chunk):
+        """
+        _fetch_range for one (start, end) chunk, returning the exception instead of raising.
+        """
+        try:
+            return self._fetch_range(*chunk)
+        except Exception as e:
+            return e
+
+    def _fetch_range(self, start_date, end_date):
+        """
+        One archive request for [start_date, end_date]. Returns the raw 'daily' block as a DataFrame.
+        """
         params = {
             "latitude": self.lat,
             "longitude": self.lon,
@@ -32,77 +114,76 @@ class OpenMeteoCollector:
             "timezone": "Asia/Seoul"
         }
         
-        print(f"🌦️ Fetching Weather from Open-Meteo: {start_date} ~ {end_date}...")
-        
-        try:
-            resp = requests.get(self.base_url, params=params)
+        def fetch():
+            resp = get_transport().get(self.base_url, params=params, endpoint="open-meteo:archive")
             resp.raise_for_status()
-            data = resp.json()
-            
-            daily = data.get("daily", {})
-            if not daily:
-                print("❌ No daily data found.")
-                return pd.DataFrame()
-            
-            df = pd.DataFrame(daily)
-            
-            # Formatting
-            df.rename(columns={
-                "time": "date",
-                "temperature_2m_mean": "avg_temp",
-                "precipitation_sum": "precip_total",
-            }, inplace=True)
-            
-            # Map rain_sum/snowfall_sum to precipitation_type (simplified)
-            # PTY: 0=None, 1=Rain, 2=Rain/Snow, 3=Snow
-            def determine_pty(row):
-                if row['snowfall_sum'] > 0:
-                    return 3 # Snow
-                if row['rain_sum'] > 0:
-                    return 1 # Rain
-                return 0 # None
-            
-            df['precipitation_type'] = df.apply(determine_pty, axis=1)
-            
-            print(f"✅ Fetched {len(df)} days of weather data.")
-            return df
-            
-        except Exception as e:
-            print(f"❌ Error fetching weather: {e}")
-            return pd.DataFrame()
+            return resp.json()
+
+        data = get_response_cache().get_or_fetch(
+            self.base_url, fetch, params=params,
+            ttl=ttl_for_date(end_date, OPEN_METEO_LAG_DAYS),
+            cacheable=lambda body: bool(body.get("daily")),
+        )
+        return pd.DataFrame(data.get("daily", {}))
+
+    def fetch_daily(self, start_date, end_date):
+        """
+        Daily weather for [start_date, end_date] (YYYY-MM-DD) served from the local weather store.
+        Only dates missing from the store (and recent, not-yet-final days) are fetched from
+        Open-Meteo; the fetched rows are persisted for later merges.
+        """
+        stored = self.store.read(start_date, end_date)
+        final_before = (pd.Timestamp.now().normalize() - pd.Timedelta(days=OPEN_METEO_LAG_DAYS)).strftime("%Y-%m-%d")
+        have = set(stored.loc[stored['date'] < final_before, 'date']) if not stored.empty else set()
+        
+        wanted = pd.date_range(start_date, end_date).strftime("%Y%m%d").tolist()
+        todo = missing_dates(wanted, {d.replace("-", "") for d in have})
+        if not todo:
+            print(f"🌦️ Weather {start_date} ~ {end_date}: served from local store ({len(stored)} days).")
+            return stored
+        
+        for range_start, range_end in to_ranges(todo):
+            fetched = self.fetch_history(
+                f"{range_start[:4]}-{range_start[4:6]}-{range_start[6:]}",
+                f"{range_end[:4]}-{range_end[4:6]}-{range_end[6:]}",
+            )
+            if not fetched.empty:
+                self.store.upsert(fetched)
+        return self.store.read(start_date, end_date)
 
     def save_to_supabase(self, df):
+        """
+        Upserts daily weather into 'weather_data', keyed on measured_at (re-runs are idempotent).
+        """
         if df.empty:
             return False
         
         print(f"💾 Saving {len(df)} weather rows to Supabase...")
-        records = []
-        for _, row in df.iterrows():
-            # Match schema of 'weather_data' table
-            # measured_at, temperature, precipitation_type, humidity (missing from OpenMeteo daily, assume 0 or fetch generic)
-            # Use 12:00:00 for daily data
-            records.append({
-                "measured_at": f"{row['date']}T12:00:00", 
-                "temperature": row['avg_temp'],
-                "precipitation_type": int(row['precipitation_type']),
-                "humidity": 0 
-            })
-            
-        try:
-             # Batch upsert
-            batch_size = 1000
-            for i in range(0, len(records), batch_size):
-                 batch = records[i:i+batch_size]
-                 self.storage.client.table("weather_data").insert(batch).execute()
-                 print(f"   - Inserted batch {i}")
-            return True
-        except Exception as e:
-            print(f"❌ Error saving weather: {e}")
-            return False
+        records = self.to_weather_records(df)
+        written, failed = self.storage.upsert_records("weather_data", records, on_conflict="measured_at")
+        print(f"   - Upserted {written} rows" + (f" ({failed} failed)" if failed else ""))
+        return failed == 0
 
-def run_weather_backfill(start_date="20220101", end_date="20251231"):
+    @staticmethod
+    def to_weather_records(df):
+        """
+        Builds 'weather_data' payload rows with column operations.
+        measured_at uses 12:00:00 for daily data; humidity is missing from Open-Meteo daily (0).
+        """
+        out = pd.DataFrame({
+            "measured_at": df['date'].astype(str).str[:10] + "T12:00:00",
+            "temperature": df['avg_temp'].astype(float),
+            "precipitation_type": df['precipitation_type'].astype(int),
+            "humidity": 0,
+        }).drop_duplicates(subset=["measured_at"], keep="last")
+        # PostgREST wants null, not NaN; object dtype also yields plain Python scalars for JSON
+        out = out.astype(object).where(out.notna(), None)
+        return out.to_dict(orient="records")
+
+def run_weather_backfill(start_date="20220101", end_date="20251231", resume=True):
     """
     Generator for fetching weather data and yielding logs for Gradio.
+    resume=True only fetches the date ranges missing from 'weather_data' and the local checkpoint.
     """
     yield f"=== Starting Weather Backfill: {start_date} ~ {end_date} ===\n"
 
@@ -111,21 +192,41 @@ def run_weather_backfill(start_date="20220101", end_date="20251231"):
         s_date_fmt = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
         e_date_fmt = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
         
-        yield f"🌤️ Connecting to Open-Meteo ({s_date_fmt} ~ {e_date_fmt})...\n"
-        
         w_collector = OpenMeteoCollector()
-        df_weather = w_collector.fetch_history(s_date_fmt, e_date_fmt)
+        checkpoint = BackfillCheckpoint("weather")
+        
+        # Resume: set-difference against stored dates, then fetch only the missing spans
+        all_dates = pd.date_range(s_date_fmt, e_date_fmt).strftime("%Y%m%d").tolist()
+        if resume:
+            stored = {d.replace("-", "") for d in w_collector.storage.fetch_stored_dates("weather_data", s_date_fmt, e_date_fmt)}
+            todo = missing_dates(all_dates, stored, checkpoint.completed())
+            yield f"♻️ Resume: {len(all_dates) - len(todo)}/{len(all_dates)} days already stored, {len(todo)} to fetch\n"
+        else:
+            todo = all_dates
+        
+        frames = []
+        for range_start, range_end in to_ranges(todo):
+            r_start = f"{range_start[:4]}-{range_start[4:6]}-{range_start[6:]}"
+            r_end = f"{range_end[:4]}-{range_end[4:6]}-{range_end[6:]}"
+            yield f"🌤️ Connecting to Open-Meteo ({r_start} ~ {r_end})...\n"
+            frames.append(w_collector.fetch_history(r_start, r_end))
+        df_weather = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         
         if not df_weather.empty:
             yield f"✅ Fetched {len(df_weather)} days of weather data.\n"
+            if len(df_weather) < len(todo):
+                yield f"⚠️ {len(todo) - len(df_weather)} days not fetched; they stay unmarked and are retried on the next resume.\n"
             
             yield "💾 Saving to Supabase...\n"
             success = w_collector.save_to_supabase(df_weather)
             
             if success:
+                checkpoint.mark(df_weather['date'].astype(str))
                 yield f"✅ Successfully saved {len(df_weather)} rows to 'weather_data' table.\n"
             else:
                 yield "❌ Failed to save weather data to DB.\n"
+        elif not todo:
+             yield "✅ Nothing to do: every day in range is already stored.\n"
         else:
              yield "⚠️ No weather data found for this period.\n"
              
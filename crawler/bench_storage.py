@@ -0,0 +1,68 @@
+"""
+Benchmarks SupabaseStorage write/read paths offline against the SQLite PostgREST stand-in.
+
+Usage:
+    python crawler/bench_storage.py --days 365 --stations 3 --latency-ms 40
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+# Ensure imports work if run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.fake_supabase import FakeSupabaseClient
+from crawler.storage_supabase import SupabaseStorage
+
+
+def synthetic_days(n_days, n_stations):
+    for day in pd.date_range("2023-01-01", periods=n_days).strftime("%Y%m%d"):
+        yield [
+            {"USE_DT": day, "LINE_NUM": "2호선", "SUB_STA_NM": f"station_{s}", "RIDE_PASGR_NUM": 1000 + s, "ALIGHT_PASGR_NUM": 900 + s}
+            for s in range(n_stations)
+        ]
+
+
+def fresh_storage(db_path, latency_ms):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    storage = SupabaseStorage()
+    storage._client = FakeSupabaseClient(path=db_path, latency_ms=latency_ms)
+    return storage
+
+
+def timed(label, n_rows, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {n_rows / elapsed:10.1f} rows/s   ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    args = parser.parse_args()
+    n_rows = args.days * args.stations
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    print(f"Fake Supabase: {db_path} (latency {args.latency_ms:g} ms, {n_rows} rows)\n")
+
+    storage = fresh_storage(db_path, args.latency_ms)
+    timed("save_subway_data per day", n_rows, lambda: [storage.save_subway_data(rows) for rows in synthetic_days(args.days, args.stations)])
+
+    storage = fresh_storage(db_path, args.latency_ms)
+    def buffered():
+        with storage.buffered_subway_writer() as writer:
+            for rows in synthetic_days(args.days, args.stations):
+                writer.add(rows)
+    timed("buffered_subway_writer", n_rows, buffered)
+
+    timed("iter_table_chunks (keyset)", n_rows, lambda: sum(len(c) for c in storage.iter_table_chunks("subway_traffic")))
+    timed("fetch_stored_dates", n_rows, lambda: storage.fetch_stored_dates("subway_traffic", min_rows=args.stations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmarks the shared HttpTransport against bare requests.get on a local stub server.
+
+Usage:
+    python crawler/bench_transport.py --requests 200 --latency-ms 20 --concurrency 8
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure imports work if run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.http_client import HttpTransport
+
+
+def start_stub_server(latency_ms=20, error_rate=0.0):
+    """
+    Starts a keep-alive JSON stub on 127.0.0.1 (random port). Every Nth request returns 503
+    when error_rate > 0 so the retry path is exercised too. Returns (server, base_url).
+    """
+    counter = {"n": 0}
+    lock = threading.Lock()
+    every = int(1 / error_rate) if error_rate > 0 else 0
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            with lock:
+                counter["n"] += 1
+                fail = every and counter["n"] % every == 0
+            body = json.dumps({"ok": not fail}).encode()
+            self.send_response(503 if fail else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/stub"
+
+
+def run(label, get, url, n_requests, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        statuses = list(executor.map(lambda _: get(url).status_code, range(n_requests)))
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for s in statuses if s == 200)
+    print(f"{label:<18} {n_requests / elapsed:8.1f} req/s   {ok}/{n_requests} OK   ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.latency_ms, args.error_rate)
+    print(f"Stub server: {url} (latency {args.latency_ms:g} ms, error rate {args.error_rate:g})\n")
+
+    run("requests.get", lambda u: requests.get(u, timeout=10), url, args.requests, args.concurrency)
+    transport = HttpTransport(backoff_base=0.05)
+    run("HttpTransport", lambda u: transport.get(u, endpoint="stub"), url, args.requests, args.concurrency)
+
+    print("\nLatency (HttpTransport):")
+    for endpoint, stats in transport.latency_stats().items():
+        print(f"  {endpoint}: {stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,151 @@
 
 import pandas as pd
 import os
+import time
+import asyncio
+import threading
 from dotenv import load_dotenv
-from crawler.storage_supabase import SupabaseStorage
+from crawler.storage_supabase import get_storage
+from crawler.storage_supabase_async import get_async_storage
+from crawler.local_mirror import get_mirror
 
 # Ensure we load .env from the crawler directory
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(env_path)
 
+# Readiness panel: tables summarized and how long one summary is served to every viewer (seconds)
+STATUS_TABLES = ["subway_traffic", "weather_data", "model_features"]
+STATUS_TTL = float(os.environ.get("STATUS_TTL", "30"))
+_status_cache = {}
+_status_lock = threading.Lock()
+_status_refreshes = {}  # event loop -> in-flight async refresh, shared by concurrent viewers
+
 def get_data_preview(limit=1000):
     """
     Fetches the most recent subway data for preview.
     Returns a pandas DataFrame.
     """
     try:
-        storage = SupabaseStorage()
-        if not storage.client:
+        storage = get_storage()
+        mirror = get_mirror(storage)
+        df = mirror.read("subway_traffic")
+        if df.empty and not storage.client:
             return pd.DataFrame({"Error": ["Supabase Disconnected"]})
         
-        # Fetch data sorted by date descending
-        res = storage.client.table("subway_traffic").select("*").order("date", desc=True).limit(limit).execute()
-        
-        if res.data:
-            df = pd.DataFrame(res.data)
+        if not df.empty:
+            # Most recent rows first (served from the local mirror)
+            df = df.sort_values("date", ascending=False).head(limit)
             # Reorder columns for better readability if needed
             cols = ["date", "station_name", "line_number", "boarding_count", "alighting_count"]
             # Filter cols that exist
             cols = [c for c in cols if c in df.columns]
-            return df[cols]
+            return df[cols].reset_index(drop=True)
         else:
             return pd.DataFrame({"Status": ["No Data Found"]})
             
     except Exception as e:
         return pd.DataFrame({"Error": [str(e)]})
 
+def _tag_summary(status):
+    return {table: dict(stats, source="rpc") for table, stats in status.items()}
+
+def _mirror_summary(storage):
+    mirror = get_mirror(storage)
+    return {table: dict(mirror.stats(table), source="mirror") for table in STATUS_TABLES}
+
+def _cached_summary():
+    cached_at, summary = _status_cache.get("summary", (0, None))
+    if summary is not None and time.time() - cached_at < STATUS_TTL:
+        return summary
+    return None
+
+def get_status_summary(force=False):
+    """
+    Per-table status {table: {rows, min_date, max_date, days, gap_days, last_ingest}} from a
+    single aggregated query: the 'pipeline_status' RPC, or the local mirror if the RPC is
+    unavailable. Cached for STATUS_TTL seconds; concurrent callers share one refresh.
+    """
+    with _status_lock:
+        summary = None if force else _cached_summary()
+        if summary is not None:
+            return summary
+
+        storage = get_storage()
+        status = storage.fetch_status()
+        summary = _tag_summary(status) if status else _mirror_summary(storage)
+        _status_cache["summary"] = (time.time(), summary)
+        return summary
+
+async def aget_status_summary(force=False):
+    """
+    Async get_status_summary for Gradio handlers: the RPC is awaited on the async client and
+    only the local-mirror fallback runs in a worker thread. Shares the same TTL cache, and
+    concurrent callers await one in-flight refresh.
+    """
+    summary = None if force else _cached_summary()
+    if summary is not None:
+        return summary
+
+    loop = asyncio.get_running_loop()
+    refresh = _status_refreshes.get(loop)
+    if refresh is None:
+        refresh = _status_refreshes[loop] = loop.create_task(_arefresh_status())
+        refresh.add_done_callback(lambda _: _status_refreshes.pop(loop, None))
+    # Shielded: a viewer that disconnects must not cancel the refresh the others are awaiting
+    return await asyncio.shield(refresh)
+
+async def _arefresh_status():
+    status = await get_async_storage().fetch_status()
+    if status:
+        summary = _tag_summary(status)
+        _status_cache["summary"] = (time.time(), summary)
+        return summary
+    return await asyncio.to_thread(get_status_summary, True)
+
+def format_readiness(summary, connected=True):
+    """
+    Renders the Level 1 readiness message from a status summary.
+    """
+    sub_stats = summary.get("subway_traffic") or {}
+    wea_stats = summary.get("weather_data") or {}
+    if not sub_stats.get("rows") and not connected:
+        return "❌ Supabase Disconnected"
+    
+    count_sub = sub_stats.get("rows", 0)
+    count_wea = wea_stats.get("rows", 0)
+    min_date = sub_stats.get("min_date") or "N/A"
+    max_date = sub_stats.get("max_date") or "N/A"
+    
+    status_msg = f"📊 Subway Rows: {count_sub}\n🌤️ Weather Rows: {count_wea}\n🗓️ Dates: {min_date} ~ {max_date}\n"
+    status_msg += f"🕳️ Gap Days: Subway {sub_stats.get('gap_days', 0)}, Weather {wea_stats.get('gap_days', 0)}\n"
+    status_msg += f"⏱️ Last Ingest: {str(sub_stats.get('last_ingest') or 'N/A')[:19]} (source: {sub_stats.get('source', 'N/A')})\n"
+    
+    # Criteria: At least 30 days of data
+    if count_sub > 30 and count_wea > 30:
+        status_msg += "\n✅ READY FOR LEVEL 2: Data Preprocessing\n- Status: Sufficient Data (Subway + Weather)"
+    else:
+        status_msg += f"\n⚠️ NOT READY\n- Need > 30 rows.\n- Subway: {count_sub}, Weather: {count_wea}"
+        
+    return status_msg
+
 def check_readiness_stats():
     """
     Checks if we have enough data for Level 2 (Preprocessing).
     Returns a status string.
     """
     try:
-        storage = SupabaseStorage()
-        if not storage.client:
-            return "❌ Supabase Disconnected"
-        
-        # Check Subway Count
-        res_sub = storage.client.table("subway_traffic").select("count", count="exact").execute()
-        count_sub = res_sub.count
-
-        # Check Weather Count
-        res_wea = storage.client.table("weather_data").select("count", count="exact").execute()
-        count_wea = res_wea.count
+        summary = get_status_summary()
+        return format_readiness(summary, connected=bool(get_storage().client))
+    except Exception as e:
+        return f"❌ Error: {e}"
 
-        # Get date range (Subway)
-        res_min = storage.client.table("subway_traffic").select("date").order("date", desc=False).limit(1).execute()
-        res_max = storage.client.table("subway_traffic").select("date").order("date", desc=True).limit(1).execute()
-        
-        min_date = res_min.data[0]['date'] if res_min.data else "N/A"
-        max_date = res_max.data[0]['date'] if res_max.data else "N/A"
-        
-        status_msg = f"📊 Subway Rows: {count_sub}\n🌤️ Weather Rows: {count_wea}\n🗓️ Dates: {min_date} ~ {max_date}\n"
-        
-        # Criteria: At least 30 days of data
-        if count_sub > 30 and count_wea > 30:
-            status_msg += "\n✅ READY FOR LEVEL 2: Data Preprocessing\n- Status: Sufficient Data (Subway + Weather)"
-        else:
-            status_msg += f"\n⚠️ NOT READY\n- Need > 30 rows.\n- Subway: {count_sub}, Weather: {count_wea}"
-            
-        return status_msg
-            
+async def acheck_readiness_stats():
+    """
+    Async check_readiness_stats for Gradio handlers.
+    """
+    try:
+        summary = await aget_status_summary()
+        return format_readiness(summary, connected=bool(await get_async_storage().get_client()))
     except Exception as e:
         return f"❌ Error: {e}"
 
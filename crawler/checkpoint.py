@@ -0,0 +1,77 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+
+# Default location: <repo>/data/checkpoints (override with BACKFILL_CHECKPOINT_DIR)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKPOINT_DIR = os.environ.get("BACKFILL_CHECKPOINT_DIR", os.path.join(BASE_DIR, "data", "checkpoints"))
+
+
+class BackfillCheckpoint:
+    """
+    Records the dates (YYYYMMDD) a backfill source has fully stored, in {root}/{source}.json.
+    Marks are persisted immediately (atomic replace), so an interrupted run loses nothing
+    that was already flushed to Supabase.
+    """
+    def __init__(self, source, root=CHECKPOINT_DIR):
+        self.source = source
+        self.path = os.path.join(root, f"{source}.json")
+        self._lock = threading.Lock()
+        self._dates = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return set(json.load(f).get("completed", []))
+        except (OSError, ValueError):
+            return set()
+
+    def completed(self):
+        with self._lock:
+            return set(self._dates)
+
+    def mark(self, dates):
+        """
+        Marks dates as completed. Accepts YYYYMMDD or YYYY-MM-DD strings.
+        """
+        dates = {d.replace("-", "")[:8] for d in dates}
+        with self._lock:
+            # Diffed under the lock, so concurrent flushes never both write the same dates
+            new_dates = dates - self._dates
+            if not new_dates:
+                return
+            self._dates |= new_dates
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"source": self.source, "completed": sorted(self._dates)}, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._dates = set()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def missing_dates(dates, *done_sets):
+    """
+    Set difference preserving the order of `dates` (YYYYMMDD strings).
+    """
+    done = set().union(*done_sets)
+    return [d for d in dates if d not in done]
+
+
+def to_ranges(dates):
+    """
+    Groups sorted YYYYMMDD strings into contiguous (start, end) ranges.
+    """
+    ranges = []
+    for d in sorted(dates):
+        day = datetime.strptime(d, "%Y%m%d")
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [(s.strftime("%Y%m%d"), e.strftime("%Y%m%d")) for s, e in ranges]
@@ -0,0 +1,34 @@
+-- One-call pipeline status for the Level 1 readiness panel (check_status.check_readiness_stats)
+-- Returns, per table: row count, date range, distinct days, missing days inside the range and last ingest.
+-- Called via PostgREST as rpc('pipeline_status'); read-only, so it is safe to expose to the anon role.
+
+create or replace function pipeline_status()
+returns jsonb
+language sql
+stable
+as $$
+    with per_table as (
+        select 'subway_traffic' as tbl, count(*) as rows, min(date) as min_date, max(date) as max_date,
+               count(distinct date) as days, max(created_at) as last_ingest
+        from subway_traffic
+        union all
+        select 'weather_data', count(*), min(measured_at::date), max(measured_at::date),
+               count(distinct measured_at::date), max(created_at)
+        from weather_data
+        union all
+        select 'model_features', count(*), min(date), max(date),
+               count(distinct date), max(created_at)
+        from model_features
+    )
+    select jsonb_object_agg(tbl, jsonb_build_object(
+        'rows', rows,
+        'min_date', min_date,
+        'max_date', max_date,
+        'days', days,
+        'gap_days', coalesce((max_date - min_date + 1) - days, 0),
+        'last_ingest', last_ingest
+    ))
+    from per_table;
+$$;
+
+grant execute on function pipeline_status() to anon, authenticated;
@@ -0,0 +1,71 @@
+-- Hourly KMA nowcast observations (append-only) and their daily roll-ups
+-- weather_hourly is written by crawler/nowcast.py; weather_daily is maintained by the trigger below
+-- and joined by step_7_merge for days the Open-Meteo archive has not published yet.
+
+create table if not exists weather_hourly (
+    measured_at timestamp with time zone primary key, -- observation hour (KST base_date/base_time)
+    temperature float,        -- T1H (°C)
+    precipitation float,      -- RN1 (mm over the past hour)
+    precipitation_type int,   -- PTY (0 none, 1 rain, 2 rain/snow, 3 snow, 5 drizzle, 6 drizzle/snow, 7 snow flurry)
+    humidity float,           -- REH (%)
+    wind_speed float,         -- WSD (m/s)
+    created_at timestamp with time zone default timezone('utc'::text, now())
+);
+
+create table if not exists weather_daily (
+    date date primary key,    -- KST calendar day
+    hours int not null default 0,
+    temp_count int not null default 0,
+    temp_sum float not null default 0,
+    temp_min float,
+    temp_max float,
+    precip_total float not null default 0,
+    rain_hours int not null default 0,
+    snow_hours int not null default 0,
+    humidity_sum float not null default 0,
+    humidity_count int not null default 0,
+    avg_temp float generated always as (temp_sum / nullif(temp_count, 0)) stored,
+    avg_humidity float generated always as (humidity_sum / nullif(humidity_count, 0)) stored,
+    created_at timestamp with time zone default timezone('utc'::text, now())
+);
+
+-- Incremental roll-up: each newly inserted hour is folded into its day (no recomputation).
+-- Duplicate hours are skipped by the collector's insert (on conflict do nothing), so the trigger never double counts.
+create or replace function weather_daily_rollup() returns trigger as $$
+begin
+    insert into weather_daily as d (
+        date, hours, temp_count, temp_sum, temp_min, temp_max, precip_total,
+        rain_hours, snow_hours, humidity_sum, humidity_count
+    )
+    values (
+        (new.measured_at at time zone 'Asia/Seoul')::date,
+        1,
+        (new.temperature is not null)::int,
+        coalesce(new.temperature, 0),
+        new.temperature,
+        new.temperature,
+        coalesce(new.precipitation, 0),
+        (new.precipitation_type in (1, 2, 5, 6))::int,
+        (new.precipitation_type in (2, 3, 6, 7))::int,
+        coalesce(new.humidity, 0),
+        (new.humidity is not null)::int
+    )
+    on conflict (date) do update set
+        hours = d.hours + excluded.hours,
+        temp_count = d.temp_count + excluded.temp_count,
+        temp_sum = d.temp_sum + excluded.temp_sum,
+        temp_min = least(d.temp_min, excluded.temp_min),
+        temp_max = greatest(d.temp_max, excluded.temp_max),
+        precip_total = d.precip_total + excluded.precip_total,
+        rain_hours = d.rain_hours + excluded.rain_hours,
+        snow_hours = d.snow_hours + excluded.snow_hours,
+        humidity_sum = d.humidity_sum + excluded.humidity_sum,
+        humidity_count = d.humidity_count + excluded.humidity_count;
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists weather_hourly_rollup on weather_hourly;
+create trigger weather_hourly_rollup
+    after insert on weather_hourly
+    for each row execute function weather_daily_rollup();
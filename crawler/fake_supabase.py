@@ -0,0 +1,356 @@
+"""
+SQLite-backed stand-in for the part of the Supabase/PostgREST table API that SupabaseStorage uses,
+so every pipeline step and backfill can run (and be benchmarked) without a live project.
+
+Select it with SUPABASE_BACKEND=sqlite (SUPABASE_URL/KEY are then not needed):
+    SUPABASE_BACKEND=sqlite SUPABASE_FAKE_LATENCY_MS=40 python crawler/backfill_weather.py
+
+Supported: table().select(columns, count="exact"), eq/neq/gt/gte/lt/lte/in_/is_, or_ (PostgREST
+logic trees, e.g. keyset filters), order, limit, range, insert, upsert(on_conflict, ignore_duplicates)
+and rpc("pipeline_status"). Tables and columns are created on first write; database triggers
+(e.g. the weather_daily roll-up) are not emulated.
+"""
+import os
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend switch and fake settings
+SUPABASE_BACKEND = os.environ.get("SUPABASE_BACKEND", "supabase").lower()
+FAKE_DB_PATH = os.environ.get("SUPABASE_SQLITE_PATH", os.path.join(BASE_DIR, "data", "fake_supabase.sqlite3"))
+FAKE_LATENCY_MS = float(os.environ.get("SUPABASE_FAKE_LATENCY_MS", "0"))
+FAKE_JITTER_MS = float(os.environ.get("SUPABASE_FAKE_JITTER_MS", "0"))
+
+# Date column per table for rpc("pipeline_status") (mirrors create_status_rpc.sql)
+STATUS_DATE_COLUMNS = {
+    "subway_traffic": "date",
+    "weather_data": "measured_at",
+    "model_features": "date",
+}
+
+SQL_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def use_fake_backend():
+    return SUPABASE_BACKEND == "sqlite"
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeAPIError(Exception):
+    """Raised where PostgREST would answer with an error (messages follow Postgres wording)."""
+
+
+def _split_top_level(text):
+    """Splits 'a,b(c,d),"e,f"' on commas outside parentheses and quotes."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _unquote(value):
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def parse_logic_tree(text, joiner="OR"):
+    """
+    Translates a PostgREST or=(...) filter body into (sql, params).
+    Example: 'date.gt."2024-01-01",and(date.eq."2024-01-01",id.gt."5")'
+    """
+    clauses, params = [], []
+    for part in _split_top_level(text):
+        for op in ("and", "or"):
+            if part.startswith(op + "(") and part.endswith(")"):
+                sql, sub_params = parse_logic_tree(part[len(op) + 1:-1], op.upper())
+                clauses.append(f"({sql})")
+                params.extend(sub_params)
+                break
+        else:
+            column, op, value = part.split(".", 2)
+            sql, sub_params = _condition(column, op, _unquote(value))
+            clauses.append(sql)
+            params.extend(sub_params)
+    return f" {joiner} ".join(clauses), params
+
+
+def _condition(column, op, value):
+    if op in SQL_OPS:
+        return f'"{column}" {SQL_OPS[op]} ?', [value]
+    if op == "is":
+        if str(value).lower() == "null":
+            return f'"{column}" IS NULL', []
+        return f'"{column}" IS ?', [value]
+    if op == "in":
+        values = [_unquote(v) for v in _split_top_level(str(value).strip("()"))]
+        return f'"{column}" IN ({",".join("?" * len(values))})', values
+    raise FakeAPIError(f"unsupported operator: {op}")
+
+
+def _quote(identifier):
+    return f'"{identifier}"'
+
+
+def _sql_type(value):
+    if isinstance(value, int):  # bool included
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+class FakeSupabaseClient:
+    """
+    In-process PostgREST stand-in. One SQLite connection shared across threads (serialized by a
+    lock); each execute() first sleeps latency_ms ± jitter_ms outside the lock, like a network call.
+    With is_async=True, execute() returns a coroutine (AsyncClient-compatible).
+    """
+    def __init__(self, path=FAKE_DB_PATH, latency_ms=FAKE_LATENCY_MS, jitter_ms=FAKE_JITTER_MS, is_async=False):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.is_async = is_async
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.RLock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params or {})
+
+    # --- Internals ---
+    def delay(self):
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def columns(self, table):
+        with self._lock:
+            return [row[1] for row in self._conn.execute(f'PRAGMA table_info("{table}")')]
+
+    def ensure_table(self, table, rows):
+        """Creates the table / missing columns for the keys in `rows` (types from the first non-null value)."""
+        existing = self.columns(table)
+        if not existing:
+            self._conn.execute(
+                f'CREATE TABLE "{table}" (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                f"created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')))"
+            )
+            existing = ["id", "created_at"]
+        for key in dict.fromkeys(k for row in rows for k in row):
+            if key not in existing:
+                sample = next((row[key] for row in rows if row.get(key) is not None), "")
+                self._conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{key}" {_sql_type(sample)}')
+                existing.append(key)
+
+    def query(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            names = [d[0] for d in cursor.description] if cursor.description else []
+            return [dict(zip(names, row, strict=True)) for row in cursor.fetchall()]
+
+    def write(self, table, rows, on_conflict=None, ignore_duplicates=False):
+        with self._lock:
+            self.ensure_table(table, rows)
+            keys = list(dict.fromkeys(k for row in rows for k in row))
+            sql = f'INSERT INTO "{table}" ({",".join(_quote(k) for k in keys)}) VALUES ({",".join("?" * len(keys))})'
+            if on_conflict:
+                conflict = [c.strip() for c in on_conflict.split(",")]
+                index = f'ux_{table}_{"_".join(conflict)}'
+                try:
+                    self._conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{index}" ON "{table}" ({",".join(conflict)})')
+                except sqlite3.IntegrityError as e:
+                    raise FakeAPIError(f"could not create unique index on {table} ({on_conflict}): {e}") from e
+                updates = [k for k in keys if k not in conflict]
+                if ignore_duplicates or not updates:
+                    sql += f" ON CONFLICT ({','.join(conflict)}) DO NOTHING"
+                else:
+                    sql += f" ON CONFLICT ({','.join(conflict)}) DO UPDATE SET " + ",".join(f'"{k}"=excluded."{k}"' for k in updates)
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(sql, [[row.get(k) for k in keys] for row in rows])
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._conn.execute("ROLLBACK")
+                raise FakeAPIError(str(e)) from e
+        return rows
+
+
+class _Executable:
+    def execute(self):
+        if self.client.is_async:
+            return self._aexecute()
+        time.sleep(self.client.delay())
+        return self._run()
+
+    async def _aexecute(self):
+        await asyncio.sleep(self.client.delay())
+        return self._run()
+
+
+class FakeQuery(_Executable):
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.mode = "select"
+        self.columns = "*"
+        self.count = None
+        self.rows = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        self.orders = []
+        self.limit_n = None
+        self.offset_n = None
+
+    # --- Operations ---
+    def select(self, columns="*", count=None, **kwargs):
+        self.mode, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, json, **kwargs):
+        self.mode, self.rows = "insert", json if isinstance(json, list) else [json]
+        return self
+
+    def upsert(self, json, on_conflict="", ignore_duplicates=False, **kwargs):
+        self.mode, self.rows = "upsert", json if isinstance(json, list) else [json]
+        self.on_conflict = on_conflict or None
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    # --- Filters / modifiers ---
+    def _filter(self, column, op, value):
+        self.filters.append(_condition(column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def in_(self, column, values):
+        self.filters.append((f'"{column}" IN ({",".join("?" * len(values))})', list(values)))
+        return self
+
+    def or_(self, filters, **kwargs):
+        self.filters.append(parse_logic_tree(filters))
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append(f'"{column}" {"DESC NULLS FIRST" if desc else "ASC NULLS LAST"}')
+        return self
+
+    def limit(self, size, **kwargs):
+        self.limit_n = size
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.offset_n, self.limit_n = start, end - start + 1
+        return self
+
+    # --- Execution ---
+    def _run(self):
+        if self.mode != "select":
+            on_conflict = self.on_conflict if self.mode == "upsert" else None
+            if self.mode == "upsert" and not on_conflict and all("id" in row for row in self.rows):
+                on_conflict = "id"
+            return FakeResponse(self.client.write(self.table, self.rows, on_conflict, self.ignore_duplicates))
+
+        available = self.client.columns(self.table)
+        if not available:
+            return FakeResponse([], 0 if self.count else None)
+        if self.columns.strip() == "*":
+            select_sql = "*"
+        else:
+            wanted = [c.strip() for c in self.columns.split(",") if c.strip()]
+            missing = [c for c in wanted if c not in available]
+            if missing:
+                raise FakeAPIError(f"column {self.table}.{missing[0]} does not exist")
+            select_sql = ",".join(f'"{c}"' for c in wanted)
+
+        where, params = "", []
+        if self.filters:
+            where = " WHERE " + " AND ".join(f"({sql})" for sql, _ in self.filters)
+            params = [p for _, ps in self.filters for p in ps]
+
+        sql = f'SELECT {select_sql} FROM "{self.table}"{where}'
+        if self.orders:
+            sql += " ORDER BY " + ", ".join(self.orders)
+        if self.limit_n is not None:
+            sql += f" LIMIT {int(self.limit_n)}"
+            if self.offset_n:
+                sql += f" OFFSET {int(self.offset_n)}"
+        try:
+            data = self.client.query(sql, params)
+            count = None
+            if self.count:
+                count = self.client.query(f'SELECT COUNT(*) AS n FROM "{self.table}"{where}', params)[0]["n"]
+        except sqlite3.Error as e:
+            raise FakeAPIError(str(e)) from e
+        return FakeResponse(data, count)
+
+
+class FakeRpc(_Executable):
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def _run(self):
+        if self.name != "pipeline_status":
+            raise FakeAPIError(f"function {self.name} does not exist")
+        status = {}
+        for table, date_col in STATUS_DATE_COLUMNS.items():
+            if date_col not in self.client.columns(table):
+                status[table] = {"rows": 0, "min_date": None, "max_date": None, "days": 0, "gap_days": 0, "last_ingest": None}
+                continue
+            row = self.client.query(
+                f'SELECT COUNT(*) AS "rows", MIN(substr("{date_col}", 1, 10)) AS min_date, MAX(substr("{date_col}", 1, 10)) AS max_date, '
+                f'COUNT(DISTINCT substr("{date_col}", 1, 10)) AS days, MAX(created_at) AS last_ingest FROM "{table}"'
+            )[0]
+            span = (date.fromisoformat(row["max_date"]) - date.fromisoformat(row["min_date"])).days + 1 if row["min_date"] else 0
+            row["gap_days"] = span - row["days"]
+            status[table] = row
+        return FakeResponse(status)
@@ -1,15 +1,43 @@
-
+import numpy as np
 import pandas as pd
 import holidays
+from functools import lru_cache
+
+CALENDAR_COLUMNS = ["year", "month", "day", "day_of_week", "is_weekend", "is_holiday"]
+LAG_DAYS = (1, 7, 364)
+ROLLING_WINDOW = 7
+
+
+@lru_cache(maxsize=32)
+def build_calendar_table(start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """
+    Builds (and memoizes per date range) a daily calendar table indexed by date.
+    Holidays are expanded once for the years in range, then matched with a vectorized isin.
+    The returned frame is shared between callers: treat it as read-only.
+    """
+    dates = pd.date_range(start=start, end=end, freq="D")
+    kr_holidays = holidays.KR(years=range(start.year, end.year + 1))
+    holiday_index = pd.DatetimeIndex(list(kr_holidays.keys()))
+
+    day_of_week = dates.dayofweek # 0=Mon, 6=Sun
+    return pd.DataFrame({
+        "year": dates.year,
+        "month": dates.month,
+        "day": dates.day,
+        "day_of_week": day_of_week,
+        # Weekend (Saturday=5, Sunday=6)
+        "is_weekend": (day_of_week >= 5).astype(int),
+        # Holiday (South Korea)
+        "is_holiday": dates.isin(holiday_index).astype(int),
+    }, index=dates)
 
-class FeatureEngineer:
-    def __init__(self):
-        self.kr_holidays = holidays.KR()
 
+class FeatureEngineer:
     def add_calendar_features(self, df: pd.DataFrame, date_col="date") -> pd.DataFrame:
         """
         Adds calendar-based features to the dataframe.
         Expected input: DataFrame with a 'date' column (datetime or string YYYY-MM-DD).
+        Features are looked up from a memoized calendar table covering the frame's date span.
         """
         df = df.copy()
         
@@ -17,21 +45,79 @@ class FeatureEngineer:
         if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
             df[date_col] = pd.to_datetime(df[date_col])
 
-        # Basic Calendar Features
-        df["year"] = df[date_col].dt.year
-        df["month"] = df[date_col].dt.month
-        df["day"] = df[date_col].dt.day
-        df["day_of_week"] = df[date_col].dt.dayofweek # 0=Mon, 6=Sun
-        
-        # Weekend (Saturday=5, Sunday=6)
-        df["is_weekend"] = df["day_of_week"].apply(lambda x: 1 if x >= 5 else 0)
-        
-        # Holiday (South Korea)
-        # holidays library keys are date objects
-        df["is_holiday"] = df[date_col].apply(lambda x: 1 if x in self.kr_holidays else 0)
+        days = df[date_col].dt.normalize()
+        if days.notna().sum() == 0:
+            for col in CALENDAR_COLUMNS:
+                df[col] = pd.Series(dtype=float, index=df.index)
+            return df
+
+        calendar = build_calendar_table(days.min(), days.max())
+        features = calendar.reindex(days.to_numpy())
+        for col in CALENDAR_COLUMNS:
+            df[col] = features[col].to_numpy()
         
         return df
 
+    def add_lag_features(self, df: pd.DataFrame, value_col="total_traffic", date_col="date", group_cols=None, lags=LAG_DAYS, rolling_window=ROLLING_WINDOW) -> pd.DataFrame:
+        """
+        Adds date-offset lag features (lag_{n}d), a trailing rolling mean (rolling_{w}d_avg)
+        and gap masks (lag_{n}d_is_gap = 1 when the day n days earlier is missing).
+        The values are laid out on a dense (day x group) matrix first, so a shift of n rows is
+        exactly n days for every group at once: missing days yield NaN lags instead of
+        silently misaligned ones, and adding stations adds columns, not Python loops.
+        Expected input: one row per date (per group_cols, e.g. station/line).
+        """
+        df = df.copy()
+        group_cols = list(group_cols or [])
+        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+            df[date_col] = pd.to_datetime(df[date_col])
+        if df.duplicated(subset=[date_col] + group_cols).any():
+            raise ValueError(f"add_lag_features expects one row per {[date_col] + group_cols}; found duplicates.")
+        if df.empty:
+            return df
+
+        # Row -> (day position, group position) on the dense matrix
+        start = df[date_col].min()
+        day_pos = (df[date_col] - start).dt.days.to_numpy()
+        group_pos = df.groupby(group_cols, sort=False).ngroup().to_numpy() if group_cols else np.zeros(len(df), dtype=int)
+
+        values = np.full((day_pos.max() + 1, group_pos.max() + 1), np.nan)
+        values[day_pos, group_pos] = df[value_col].to_numpy(dtype=float)
+        dense = pd.DataFrame(values, index=pd.date_range(start=start, periods=len(values), freq="D"))
+        present = dense.notna()
+
+        # One vectorized pass over the dense calendar: shift(n) == value n days earlier
+        features = {f"lag_{n}d": dense.shift(n) for n in lags}
+        features.update({f"lag_{n}d_is_gap": (~present.shift(n, fill_value=False)).astype(int) for n in lags})
+        # Rolling mean needs every day of the trailing window present
+        features[f"rolling_{rolling_window}d_avg"] = dense.shift(1).rolling(window=rolling_window, min_periods=rolling_window).mean()
+
+        for name, matrix in features.items():
+            df[name] = matrix.to_numpy()[day_pos, group_pos]
+        return df
+
+    @staticmethod
+    def to_dense_daily(df: pd.DataFrame, value_col="total_traffic", date_col="date") -> pd.Series:
+        """
+        Returns value_col as a Series on a gap-free daily DatetimeIndex (missing days are NaN).
+        Position i is always start + i days, so lookups by date are O(1).
+        """
+        series = df.set_index(date_col)[value_col].sort_index()
+        if series.empty:
+            return series
+        dense_index = pd.date_range(start=series.index.min(), end=series.index.max(), freq="D")
+        return series.reindex(dense_index)
+
+    @staticmethod
+    def find_gaps(dates: pd.Series) -> pd.DatetimeIndex:
+        """
+        Returns the calendar days missing between the first and last date.
+        """
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        if dates.empty:
+            return dates
+        return pd.date_range(start=dates.min(), end=dates.max(), freq="D").difference(dates)
+
 if __name__ == "__main__":
     # Test
     dates = ["2024-01-01", "2024-01-02", "2023-12-25", "2023-05-05"]
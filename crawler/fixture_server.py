@@ -0,0 +1,356 @@
+"""
+Local fixture server for the public APIs the collectors call: Seoul CardSubwayStatsNew,
+KMA getUltraSrtNcst and the Open-Meteo archive. Recorded responses are replayed when present;
+otherwise a deterministic synthetic generator answers for any date range. Latency, error rate,
+per-second rate limits and daily quotas can be injected to load-test backfills, caching and retries.
+
+Usage:
+    python crawler/fixture_server.py --port 8765 --latency-ms 50 --error-rate 0.05 --rate-limit 20
+    API_FIXTURE_URL=http://127.0.0.1:8765 python crawler/backfill_subway.py
+
+    # Record real responses (keys from crawler/.env) for later replay
+    python crawler/fixture_server.py --port 8765 --record
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure imports work if run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.scraper import SUBWAY_STATIONS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.environ.get("API_FIXTURE_DIR", os.path.join(BASE_DIR, "data", "fixtures"))
+
+# Upstreams used in --record mode (and the env var holding each real key)
+UPSTREAMS = {
+    "seoul": ("http://openapi.seoul.go.kr:8088", "SEOUL_DATA_API_KEY"),
+    "kma": ("http://apis.data.go.kr", "KMA_API_KEY"),
+    "open-meteo": ("https://archive-api.open-meteo.com", None),
+}
+
+# Synthetic data: rows per Seoul day (the real API has ~600; >1000 exercises pagination) and publish lags
+SEOUL_ROWS_PER_DAY = 620
+SEOUL_LAG_DAYS = 3
+OPEN_METEO_LAG_DAYS = 5
+
+
+def _rng(*parts):
+    """Deterministic RNG per (endpoint, date, ...) so synthetic responses replay identically."""
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _seasonal_temp(day, hour=None):
+    doy = day.timetuple().tm_yday
+    temp = 12.5 - 14 * math.cos(2 * math.pi * (doy - 15) / 365)
+    if hour is not None:
+        temp += 4 * math.sin(2 * math.pi * (hour - 9) / 24)
+    return temp
+
+
+# --- Synthetic generator ---
+def synth_seoul_day(use_ymd, rows_per_day=SEOUL_ROWS_PER_DAY, stations=None):
+    """
+    All CardSubwayStatsNew rows for one day (configured stations first, then filler stations).
+    Returns None for days the real API would not have published yet.
+    """
+    day = datetime.strptime(use_ymd, "%Y%m%d")
+    if day > datetime.now() - timedelta(days=SEOUL_LAG_DAYS):
+        return None
+    weekday_factor = [1.0, 1.05, 1.05, 1.05, 1.1, 0.8, 0.65][day.weekday()]
+    named = list(stations or SUBWAY_STATIONS)
+    named += [(f"역{i:04d}", f"{1 + i % 9}호선") for i in range(max(0, rows_per_day - len(named)))]
+    rows = []
+    for station, line in named[:rows_per_day]:
+        base = 5000 + _rng("base", station, line).random() * 60000
+        noise = _rng("seoul", use_ymd, station, line)
+        rows.append({
+            "USE_YMD": use_ymd,
+            "SBWY_ROUT_LN_NM": line,
+            "SBWY_STNS_NM": station,
+            "GTON_TNOPE": int(base * weekday_factor * noise.uniform(0.9, 1.1)),
+            "GTOFF_TNOPE": int(base * weekday_factor * noise.uniform(0.9, 1.1)),
+            "REG_YMD": (day + timedelta(days=SEOUL_LAG_DAYS)).strftime("%Y%m%d"),
+        })
+    return rows
+
+
+def synth_seoul_page(use_ymd, start, end, rows_per_day=SEOUL_ROWS_PER_DAY):
+    rows = synth_seoul_day(use_ymd, rows_per_day)
+    if not rows:
+        return {"RESULT": {"CODE": "INFO-200", "MESSAGE": "해당하는 데이터가 없습니다."}}
+    return {"CardSubwayStatsNew": {
+        "list_total_count": len(rows),
+        "RESULT": {"CODE": "INFO-000", "MESSAGE": "정상 처리되었습니다"},
+        "row": rows[start - 1:end],
+    }}
+
+
+def synth_kma_nowcast(base_date, base_time, nx=61, ny=126):
+    observed = datetime.strptime(base_date + base_time, "%Y%m%d%H%M")
+    rng = _rng("kma", base_date, base_time, nx, ny)
+    temp = _seasonal_temp(observed, observed.hour) + rng.gauss(0, 1.5)
+    raining = rng.random() < 0.12
+    rain = round(rng.expovariate(0.8), 1) if raining else 0
+    pty = (3 if temp < 0 else 1) if raining else 0
+    values = {"T1H": round(temp, 1), "RN1": rain, "PTY": pty, "REH": rng.randint(30, 95),
+              "UUU": round(rng.gauss(0, 2), 1), "VVV": round(rng.gauss(0, 2), 1),
+              "VEC": rng.randint(0, 359), "WSD": round(abs(rng.gauss(2, 1)), 1)}
+    items = [{"baseDate": base_date, "baseTime": base_time, "category": c, "nx": nx, "ny": ny, "obsrValue": str(v)}
+             for c, v in values.items()]
+    return {"response": {
+        "header": {"resultCode": "00", "resultMsg": "NORMAL_SERVICE"},
+        "body": {"dataType": "JSON", "items": {"item": items}, "pageNo": 1, "numOfRows": 1000, "totalCount": len(items)},
+    }}
+
+
+def synth_open_meteo(start_date, end_date, latitude=37.5445, longitude=127.0565):
+    days = []
+    current, end = datetime.strptime(start_date, "%Y-%m-%d"), datetime.strptime(end_date, "%Y-%m-%d")
+    while current <= end:
+        days.append(current)
+        current += timedelta(days=1)
+    published = datetime.now() - timedelta(days=OPEN_METEO_LAG_DAYS)
+    daily = {"time": [], "temperature_2m_mean": [], "precipitation_sum": [], "rain_sum": [], "snowfall_sum": []}
+    for day in days:
+        daily["time"].append(day.strftime("%Y-%m-%d"))
+        if day > published:
+            for key in ("temperature_2m_mean", "precipitation_sum", "rain_sum", "snowfall_sum"):
+                daily[key].append(None)
+            continue
+        rng = _rng("open-meteo", day.date())
+        temp = round(_seasonal_temp(day) + rng.gauss(0, 2), 1)
+        precip = round(rng.expovariate(0.3), 1) if rng.random() < 0.3 else 0.0
+        snow = round(precip * 0.7, 2) if temp < 0 else 0.0
+        daily["temperature_2m_mean"].append(temp)
+        daily["precipitation_sum"].append(precip)
+        daily["rain_sum"].append(0.0 if snow else precip)
+        daily["snowfall_sum"].append(snow)
+    return {"latitude": latitude, "longitude": longitude, "timezone": "Asia/Seoul", "daily": daily}
+
+
+# --- Routing ---
+def route(path, query):
+    """
+    Maps a request to (endpoint, fixture_key, synthesize) or None for unknown paths.
+    Fixture keys never include API keys.
+    """
+    parts = [p for p in path.split("/") if p]
+    if len(parts) == 6 and parts[1] == "json" and parts[2] == "CardSubwayStatsNew":
+        start, end, use_ymd = int(parts[3]), int(parts[4]), parts[5]
+        return "seoul", f"{use_ymd}_{start}_{end}", lambda config: synth_seoul_page(use_ymd, start, end, config.seoul_rows)
+    if path.endswith("/getUltraSrtNcst"):
+        q = {k: v[0] for k, v in query.items()}
+        key = f"{q.get('base_date')}_{q.get('base_time')}_{q.get('nx')}_{q.get('ny')}"
+        return "kma", key, lambda config: synth_kma_nowcast(q.get("base_date"), q.get("base_time"), int(q.get("nx", 61)), int(q.get("ny", 126)))
+    if path == "/v1/archive":
+        q = {k: v[0] for k, v in query.items()}
+        key = f"{q.get('start_date')}_{q.get('end_date')}_{q.get('latitude')}_{q.get('longitude')}"
+        return "open-meteo", key, lambda config: synth_open_meteo(q["start_date"], q["end_date"], float(q.get("latitude", 37.5445)), float(q.get("longitude", 127.0565)))
+    return None
+
+
+class FixtureConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit=0.0, daily_quota=0,
+                 seoul_rows=SEOUL_ROWS_PER_DAY, fixture_dir=FIXTURE_DIR, record=False, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit      # requests/second per endpoint (0 = unlimited)
+        self.daily_quota = daily_quota    # requests per endpoint before quota errors (0 = unlimited)
+        self.seoul_rows = seoul_rows
+        self.fixture_dir = fixture_dir
+        self.record = record
+        self.seed = seed
+
+
+class FixtureState:
+    """
+    Per-endpoint counters, rate-limit windows and the error RNG (shared by handler threads).
+    `clock` (seconds, monotonic) is injectable so tests control the rate-limit window.
+    """
+    def __init__(self, config, clock=time.monotonic):
+        self.config = config
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.windows = {}
+        self.stats = {}
+
+    def count(self, endpoint, field):
+        with self.lock:
+            counters = self.stats.setdefault(endpoint, {"requests": 0, "served": 0, "replayed": 0, "errors": 0, "throttled": 0, "quota": 0})
+            counters[field] += 1
+            return counters
+
+    def throttled(self, endpoint):
+        """Sliding one-second window per endpoint; True if this request exceeds rate_limit."""
+        if not self.config.rate_limit:
+            return False
+        now = self.clock()
+        with self.lock:
+            window = self.windows.setdefault(endpoint, deque())
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) >= self.config.rate_limit:
+                return True
+            window.append(now)
+            return False
+
+    def fail(self):
+        with self.lock:
+            return self.rng.random() < self.config.error_rate
+
+    def delay(self):
+        jitter = random.uniform(-self.config.jitter_ms, self.config.jitter_ms) if self.config.jitter_ms else 0
+        return max(0.0, self.config.latency_ms + jitter) / 1000
+
+
+def _fixture_path(config, endpoint, key):
+    return os.path.join(config.fixture_dir, endpoint, f"{key}.json")
+
+
+def _record(config, endpoint, path, query, key):
+    """Fetches the real response (real key substituted) and stores it as a fixture."""
+    import requests
+    upstream, key_env = UPSTREAMS[endpoint]
+    real_key = os.getenv(key_env) if key_env else None
+    if endpoint == "seoul":
+        parts = [p for p in path.split("/") if p]
+        parts[0] = real_key or parts[0]
+        url, params = f"{upstream}/" + "/".join(parts), None
+    else:
+        url, params = upstream + path, {k: v[0] for k, v in query.items()}
+        if real_key:
+            params["serviceKey"] = real_key
+    body = requests.get(url, params=params, timeout=60).json()
+    fixture = _fixture_path(config, endpoint, key)
+    os.makedirs(os.path.dirname(fixture), exist_ok=True)
+    with open(fixture, "w", encoding="utf-8") as f:
+        json.dump(body, f, ensure_ascii=False)
+    return body
+
+
+def _throttle_response(endpoint):
+    # KMA reports limits inside a 200 XML body; the others use 429 + Retry-After
+    if endpoint == "kma":
+        return 200, "text/xml", "<OpenAPI_ServiceResponse><cmmMsgHeader><returnAuthMsg>LIMITED_NUMBER_OF_SERVICE_REQUESTS_PER_SECOND_EXCEEDS_ERROR</returnAuthMsg><returnReasonCode>22</returnReasonCode></cmmMsgHeader></OpenAPI_ServiceResponse>", {}
+    return 429, "application/json", json.dumps({"error": True, "reason": "Too many requests"}), {"Retry-After": "1"}
+
+
+def _quota_response(endpoint):
+    if endpoint == "kma":
+        return 200, "text/xml", "<OpenAPI_ServiceResponse><cmmMsgHeader><returnAuthMsg>LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR</returnAuthMsg><returnReasonCode>22</returnReasonCode></cmmMsgHeader></OpenAPI_ServiceResponse>", {}
+    if endpoint == "seoul":
+        return 200, "application/json", json.dumps({"RESULT": {"CODE": "ERROR-337", "MESSAGE": "일별 트래픽 제한을 넘은 호출입니다."}}, ensure_ascii=False), {}
+    return 429, "application/json", json.dumps({"error": True, "reason": "Daily API request limit exceeded"}), {}
+
+
+def make_handler(state):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == "/_stats":
+                return self._send(200, "application/json", json.dumps(state.stats))
+            query = parse_qs(parsed.query)
+            matched = route(parsed.path, query)
+            if matched is None:
+                return self._send(404, "application/json", json.dumps({"error": "unknown fixture endpoint"}))
+            endpoint, key, synthesize = matched
+            counters = state.count(endpoint, "requests")
+            config = state.config
+
+            if config.daily_quota and counters["requests"] > config.daily_quota:
+                state.count(endpoint, "quota")
+                return self._send(*_quota_response(endpoint))
+            if state.throttled(endpoint):
+                state.count(endpoint, "throttled")
+                return self._send(*_throttle_response(endpoint))
+            time.sleep(state.delay())
+            if state.fail():
+                state.count(endpoint, "errors")
+                return self._send(503, "application/json", json.dumps({"error": "injected failure"}))
+
+            fixture = _fixture_path(config, endpoint, key)
+            if os.path.exists(fixture):
+                with open(fixture, "r", encoding="utf-8") as f:
+                    body = f.read()
+                state.count(endpoint, "replayed")
+            else:
+                data = _record(config, endpoint, parsed.path, query, key) if config.record else synthesize(config)
+                body = json.dumps(data, ensure_ascii=False)
+            state.count(endpoint, "served")
+            self._send(200, "application/json;charset=UTF-8", body)
+
+        def _send(self, status, content_type, body, headers=None):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return FixtureHandler
+
+
+def start_fixture_server(config=None, port=0, clock=time.monotonic):
+    """
+    Starts the fixture server on 127.0.0.1 in a background thread.
+    Returns (server, base_url); server.state.stats holds per-endpoint counters.
+    Stop it with server.shutdown() followed by server.server_close().
+    """
+    state = FixtureState(config or FixtureConfig(), clock=clock)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0, help="requests/second per endpoint (0 = unlimited)")
+    parser.add_argument("--daily-quota", type=int, default=0, help="requests per endpoint before quota errors (0 = unlimited)")
+    parser.add_argument("--seoul-rows", type=int, default=SEOUL_ROWS_PER_DAY)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--record", action="store_true", help="proxy unknown requests to the real APIs and save them")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FixtureConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit, args.daily_quota,
+                           args.seoul_rows, args.fixtures, args.record, args.seed)
+    server, url = start_fixture_server(config, args.port)
+    print(f"Fixture server: {url} (stats at {url}/_stats)")
+    print(f"  export API_FIXTURE_URL={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+# Default location: <repo>/data/http_cache (override with HTTP_CACHE_DIR)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", os.path.join(BASE_DIR, "data", "http_cache"))
+HTTP_CACHE_MAX_BYTES = int(float(os.environ.get("HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Responses for recent dates may still change; they expire after this many seconds
+RECENT_TTL = int(os.environ.get("HTTP_CACHE_RECENT_TTL", "3600"))
+
+# Never part of a cache key (API keys rotate; cached bodies stay valid)
+SECRET_PARAMS = {"serviceKey", "servicekey", "api_key", "apikey", "key"}
+
+
+def ttl_for_date(date_str, lag_days):
+    """
+    TTL rule: data for dates older than `lag_days` is published and immutable (None = never expires),
+    anything more recent expires after RECENT_TTL seconds.
+    Accepts YYYYMMDD or YYYY-MM-DD.
+    """
+    day = datetime.strptime(date_str.replace("-", ""), "%Y%m%d")
+    return None if day < datetime.now() - timedelta(days=lag_days) else RECENT_TTL
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for API response bodies (JSON).
+    Entries live at {root}/{key[:2]}/{key}.json where key = sha256(endpoint + params without secrets).
+    Reads bump the file mtime, and when the cache grows past max_bytes the least recently
+    used entries are evicted first.
+    """
+    def __init__(self, root=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(endpoint, params=None, secrets=()):
+        """
+        Builds the cache key. Secret param names (SECRET_PARAMS) are dropped and any secret
+        values embedded in the endpoint (e.g. the Seoul API key in the URL path) are masked.
+        """
+        for secret in secrets:
+            if secret:
+                endpoint = endpoint.replace(secret, "{KEY}")
+        clean_params = sorted(
+            (str(k), json.dumps(v, ensure_ascii=False, sort_keys=True))
+            for k, v in (params or {}).items() if k not in SECRET_PARAMS
+        )
+        payload = json.dumps({"endpoint": endpoint, "params": clean_params}, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns the cached body or None (miss / expired).
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and time.time() > expires_at:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None  # Already removed (e.g. by another process)
+            with self._lock:
+                if self._remove(path) and size is not None and self._size is not None:
+                    self._size -= size
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU: most recently used = newest mtime
+        except OSError:
+            pass
+        self._count("hits")
+        return entry["body"]
+
+    def set(self, key, body, ttl=None):
+        """
+        Stores a JSON-serializable body. ttl=None means immutable.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "stored_at": time.time(),
+            "expires_at": None if ttl is None else time.time() + ttl,
+            "body": body,
+        }
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)  # Overwriting an entry: its old size leaves the total
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            self.stores += 1
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += os.path.getsize(path) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def get_or_fetch(self, endpoint, fetch, params=None, ttl=None, secrets=(), cacheable=None):
+        """
+        Returns the cached body for (endpoint, params), or calls fetch() and stores its result.
+        `cacheable(body)` can veto storing (e.g. API error payloads).
+        """
+        key = self.make_key(endpoint, params, secrets)
+        body = self.get(key)
+        if body is not None:
+            return body
+        body = fetch()
+        if body is not None and (cacheable is None or cacheable(body)):
+            try:
+                self.set(key, body, ttl=ttl)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"HTTP cache write failed: {e}")
+        return body
+
+    def stats(self):
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "size_mb": self._size / (1024 * 1024),
+                "max_mb": self.max_bytes / (1024 * 1024),
+            }
+
+    # --- Internals ---
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                        entries.append((st.st_mtime, st.st_size, path))
+                    except OSError:
+                        continue
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Oldest mtime first, down to 90% of the budget so we don't evict on every write
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(self._entries()):
+            if self._size <= target:
+                break
+            if self._remove(path):
+                self._size -= size
+                self.evictions += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """
+    Process-wide ResponseCache, so hit/miss counters aggregate across collectors.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,199 @@
+import os
+import time
+import random
+import bisect
+import threading
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds per host; Open-Meteo archive ranges can take a while
+DEFAULT_TIMEOUT = (3.05, 30)
+HOST_TIMEOUTS = {
+    "openapi.seoul.go.kr": (3.05, 15),
+    "swopenapi.seoul.go.kr": (3.05, 10),
+    "apis.data.go.kr": (3.05, 10),
+    "archive-api.open-meteo.com": (3.05, 60),
+}
+
+# Route every collector to a local fixture server (crawler/fixture_server.py) instead of the public APIs
+API_FIXTURE_URL = os.environ.get("API_FIXTURE_URL", "").rstrip("/")
+FIXTURE_API_KEY = "fixture"
+
+def api_base(default):
+    """
+    Base URL of a public API, or the fixture server when API_FIXTURE_URL is set.
+    """
+    return API_FIXTURE_URL or default
+
+def api_key(env_name):
+    """
+    API key from the environment; any key works against the fixture server.
+    """
+    return os.getenv(env_name) or (FIXTURE_API_KEY if API_FIXTURE_URL else None)
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "32"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Transient API errors returned with HTTP 200: worth retrying after a backoff
+RETRY_MARKERS = (
+    "LIMITED_NUMBER_OF_SERVICE_REQUESTS_PER_SECOND_EXCEEDS_ERROR",  # KMA per-second limit
+    "ERROR-500", "ERROR-600", "ERROR-601",  # Seoul server/DB errors
+)
+# Daily quota exhausted: retrying only burns more quota, so the response is returned as-is
+QUOTA_MARKERS = (
+    "LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR",  # KMA daily quota
+    "ERROR-337",  # Seoul daily traffic limit
+)
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram for one endpoint (milliseconds).
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total_ms = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+
+    def observe(self, elapsed_ms):
+        self.counts[bisect.bisect_left(self.buckets, elapsed_ms)] += 1
+        self.total_ms += elapsed_ms
+        self.requests += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket containing the q-th quantile (inf if in the overflow bucket).
+        """
+        if not self.requests:
+            return 0.0
+        rank = q * self.requests
+        seen = 0
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": self.total_ms / self.requests if self.requests else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+        }
+
+
+class HttpTransport:
+    """
+    Shared HTTP transport for all collectors:
+    - keep-alive connection pooling (one requests.Session, pooled adapters)
+    - per-host (connect, read) timeouts so a slow API can't stall a Gradio worker
+    - jittered exponential backoff on 429/5xx and transient API error codes (honours Retry-After)
+    - per-endpoint latency histograms
+    """
+    def __init__(self, pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, timeouts=None,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.max_retries = max_retries
+        self.timeouts = {**HOST_TIMEOUTS, **(timeouts or {})}
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, endpoint=None, timeout=None):
+        """
+        GET with retries. Returns the final requests.Response (callers still check status/body);
+        raises the last connection/timeout error if every attempt failed.
+        endpoint: label for the latency histogram (defaults to the host; never include API keys).
+        """
+        host = urlparse(url).hostname or ""
+        endpoint = endpoint or host
+        timeout = timeout or self.timeouts.get(host, DEFAULT_TIMEOUT)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, started, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep_before_retry(endpoint, attempt)
+                continue
+
+            self._record(endpoint, started)
+            if attempt < self.max_retries and self._should_retry(response):
+                self._sleep_before_retry(endpoint, attempt, response.headers.get("Retry-After"))
+                continue
+            return response
+
+    @staticmethod
+    def _should_retry(response):
+        if response.status_code in RETRY_STATUS:
+            return True
+        head = response.text[:1024]
+        if any(marker in head for marker in QUOTA_MARKERS):
+            return False
+        return any(marker in head for marker in RETRY_MARKERS)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """
+        Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt)), or Retry-After if given.
+        """
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _sleep_before_retry(self, endpoint, attempt, retry_after=None):
+        with self._lock:
+            self._histogram(endpoint).retries += 1
+        time.sleep(self.backoff_delay(attempt, retry_after))
+
+    def _histogram(self, endpoint):
+        if endpoint not in self.histograms:
+            self.histograms[endpoint] = LatencyHistogram()
+        return self.histograms[endpoint]
+
+    def _record(self, endpoint, started, error=False):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            histogram = self._histogram(endpoint)
+            histogram.observe(elapsed_ms)
+            if error:
+                histogram.errors += 1
+
+    def latency_stats(self):
+        with self._lock:
+            return {endpoint: h.summary() for endpoint, h in sorted(self.histograms.items())}
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """
+    Process-wide HttpTransport shared by every collector (one connection pool, one set of histograms).
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
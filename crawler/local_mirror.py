@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import contextlib
+import pandas as pd
+from datetime import datetime
+from crawler.storage_supabase import get_storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, the in-process lock still applies
+    fcntl = None
+
+# Default location: <repo>/data/mirror (override with LOCAL_MIRROR_DIR, e.g. a writable PVC path)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIRROR_DIR = os.environ.get("LOCAL_MIRROR_DIR", os.path.join(BASE_DIR, "data", "mirror"))
+
+# Skip the network entirely if the last sync is younger than this (seconds)
+MIRROR_TTL = float(os.environ.get("LOCAL_MIRROR_TTL", "300"))
+
+# Upserts keep created_at, so the trailing days are re-pulled on every sync to pick up corrections
+MIRROR_REFRESH_DAYS = int(os.environ.get("LOCAL_MIRROR_REFRESH_DAYS", "7"))
+
+# table -> (date column used for partitioning/filtering, primary key used for de-duplication)
+MIRROR_TABLES = {
+    "subway_traffic": ("date", ["id"]),
+    "weather_data": ("measured_at", ["id"]),
+    "model_features": ("date", ["date"]),
+    "weather_daily": ("date", ["date"]),
+}
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Exclusive advisory lock on `path` (created if needed), held across processes
+    (Airflow task processes, Gradio replicas sharing a volume).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _replace_atomically(path, write):
+    """
+    Calls write(tmp_path) on a uniquely named temp file next to `path`, then renames it over `path`.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+class LocalMirror:
+    """
+    Read-through local mirror of the Supabase tables, stored as one Parquet file per table and year:
+        {MIRROR_DIR}/{table}/{YYYY}.parquet
+    sync() pulls only rows newer than the stored created_at watermark (plus the trailing
+    MIRROR_REFRESH_DAYS by date), and read() serves DataFrames straight from disk.
+    Writers hold {root}/_mirror.lock, so syncs from other processes never interleave; within
+    a process use get_mirror() so all callers share one instance per root.
+    """
+    def __init__(self, storage, root=MIRROR_DIR, ttl=MIRROR_TTL):
+        self.storage = storage
+        self.root = root
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._state_path = os.path.join(root, "_state.json")
+        self._lock_path = os.path.join(root, "_mirror.lock")
+        self.state = self._load_state()
+
+    # --- State (watermarks) ---
+    def _load_state(self):
+        try:
+            with open(self._state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(self.root, exist_ok=True)
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=2)
+        _replace_atomically(self._state_path, write)
+
+    def _table_dir(self, table):
+        return os.path.join(self.root, table)
+
+    def _partition_files(self, table, start_date=None, end_date=None):
+        table_dir = self._table_dir(table)
+        if not os.path.isdir(table_dir):
+            return []
+        files = []
+        for name in sorted(os.listdir(table_dir)):
+            if not name.endswith(".parquet"):
+                continue
+            year = name[:4]
+            if start_date and year < str(start_date)[:4]:
+                continue
+            if end_date and year > str(end_date)[:4]:
+                continue
+            files.append(os.path.join(table_dir, name))
+        return files
+
+    # --- Sync ---
+    def is_fresh(self, table):
+        last_sync = self.state.get(table, {}).get("synced_at_epoch")
+        return last_sync is not None and time.time() - last_sync < self.ttl
+
+    def sync(self, table, force=False):
+        """
+        Incrementally pulls new/changed rows of `table` from Supabase into the mirror.
+        Returns the number of rows pulled (0 if the mirror was fresh or the client is offline).
+        """
+        with self._lock, file_lock(self._lock_path):
+            # Another process may have synced since this instance last looked
+            self.state = self._load_state()
+            if not force and self.is_fresh(table):
+                return 0
+            if not self.storage.client:
+                print("Supabase client not initialized. Serving local mirror as-is.")
+                return 0
+
+            table_state = self.state.get(table, {})
+            watermark = table_state.get("created_at_watermark")
+            pulled = []
+            try:
+                pulled.extend(self.storage.iter_table_chunks(table, since=watermark))
+                max_date = table_state.get("max_date")
+                if watermark and max_date:
+                    refresh_from = (pd.Timestamp(max_date[:10]) - pd.Timedelta(days=MIRROR_REFRESH_DAYS)).strftime("%Y-%m-%d")
+                    pulled.extend(self.storage.iter_table_chunks(table, start_date=refresh_from))
+            except Exception as e:
+                print(f"Error syncing local mirror ({table}): {e}")
+                return 0
+
+            new_rows = pd.concat(pulled, ignore_index=True) if pulled else pd.DataFrame()
+            if not new_rows.empty:
+                if self._merge_rows(table, new_rows):
+                    table_state["revision"] = table_state.get("revision", 0) + 1
+                if "created_at" in new_rows.columns:
+                    table_state["created_at_watermark"] = max(filter(None, [watermark, str(new_rows["created_at"].max())]))
+                date_col = MIRROR_TABLES[table][0]
+                table_state["max_date"] = max(filter(None, [table_state.get("max_date"), str(new_rows[date_col].max())]))
+
+            table_state["synced_at"] = datetime.now().isoformat()
+            table_state["synced_at_epoch"] = time.time()
+            self.state[table] = table_state
+            self._save_state()
+            print(f"🪞 Local mirror synced ({table}): {len(new_rows)} rows pulled.")
+            return len(new_rows)
+
+    def _merge_rows(self, table, new_rows):
+        """
+        Upserts rows into the year partitions. Partitions the rows leave unchanged (e.g. the
+        re-pulled refresh window) are not rewritten. Returns True if any partition changed.
+        """
+        date_col, key_cols = MIRROR_TABLES[table]
+        table_dir = self._table_dir(table)
+        os.makedirs(table_dir, exist_ok=True)
+
+        changed = False
+        years = new_rows[date_col].astype(str).str[:4]
+        for year, new_part in new_rows.groupby(years):
+            path = os.path.join(table_dir, f"{year}.parquet")
+            stored = pd.read_parquet(path) if os.path.exists(path) else None
+            part = new_part if stored is None else pd.concat([stored, new_part], ignore_index=True)
+            part = part.drop_duplicates(subset=key_cols, keep="last").sort_values([date_col, *key_cols], ignore_index=True)
+            if stored is not None and part.equals(stored):
+                continue
+            _replace_atomically(path, lambda tmp_path, part=part: part.to_parquet(tmp_path, index=False))
+            changed = True
+        return changed
+
+    def watermark(self, table):
+        """
+        What the mirror holds for `table` as of the last sync (created_at watermark, max date,
+        content revision), without the sync timestamps: it changes only when a sync changed rows.
+        """
+        table_state = self.state.get(table, {})
+        return {k: table_state.get(k) for k in ("created_at_watermark", "max_date", "revision")}
+
+    # --- Read ---
+    def read(self, table, columns=None, start_date=None, end_date=None, sync=True):
+        """
+        Returns `table` as a DataFrame from the local mirror (syncing first unless fresh).
+        start_date / end_date (YYYY-MM-DD) are inclusive bounds on the table's date column.
+        """
+        if sync:
+            self.sync(table)
+
+        date_col = MIRROR_TABLES[table][0]
+        frames = [pd.read_parquet(path, columns=columns) for path in self._partition_files(table, start_date, end_date)]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(frames, ignore_index=True)
+
+        if (start_date or end_date) and date_col in df.columns:
+            dates = df[date_col].astype(str).str[:10]
+            mask = pd.Series(True, index=df.index)
+            if start_date:
+                mask &= dates >= start_date
+            if end_date:
+                mask &= dates <= end_date
+            df = df[mask].reset_index(drop=True)
+        return df
+
+    def stats(self, table, sync=True):
+        """
+        Row count, date range, missing days inside the range and last ingest of a mirrored
+        table (reads only the date column from disk; last_ingest is the created_at watermark).
+        """
+        if sync:
+            self.sync(table)
+        date_col = MIRROR_TABLES[table][0]
+        dates = self.read(table, columns=[date_col], sync=False)[date_col].astype(str).str[:10]
+        days = dates.nunique()
+        min_date = dates.min() if len(dates) else None
+        max_date = dates.max() if len(dates) else None
+        span = (pd.Timestamp(max_date) - pd.Timestamp(min_date)).days + 1 if len(dates) else 0
+        table_state = self.state.get(table, {})
+        return {
+            "rows": len(dates),
+            "min_date": min_date,
+            "max_date": max_date,
+            "days": days,
+            "gap_days": span - days,
+            "last_ingest": table_state.get("created_at_watermark"),
+            "synced_at": table_state.get("synced_at"),
+        }
+
+
+class DailyWeatherStore:
+    """
+    Local columnar store of Open-Meteo daily weather (one Parquet file, one row per date).
+    Lets merges re-read history from disk and fetch only the dates they are missing.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(MIRROR_DIR, "open_meteo_daily.parquet")
+        self._lock = threading.Lock()
+
+    def read(self, start_date=None, end_date=None):
+        """
+        Returns stored rows with start_date <= date <= end_date (YYYY-MM-DD strings).
+        """
+        try:
+            df = pd.read_parquet(self.path)
+        except Exception:
+            return pd.DataFrame()
+        if start_date:
+            df = df[df["date"] >= start_date]
+        if end_date:
+            df = df[df["date"] <= end_date]
+        return df.reset_index(drop=True)
+
+    def upsert(self, df):
+        """
+        Merges fetched rows into the store (latest fetch wins per date). Rows without a
+        temperature (not yet published) are not persisted.
+        """
+        df = df.dropna(subset=["avg_temp"]).copy()
+        if df.empty:
+            return
+        df["date"] = df["date"].astype(str).str[:10]
+        with self._lock, file_lock(self.path + ".lock"):
+            stored = self.read()
+            merged = pd.concat([stored, df], ignore_index=True) if not stored.empty else df
+            merged = merged.drop_duplicates(subset=["date"], keep="last").sort_values("date", ignore_index=True)
+            if merged.equals(stored):
+                return  # Re-fetched days unchanged: keep the file (and describe()) as is
+            _replace_atomically(self.path, lambda tmp_path: merged.to_parquet(tmp_path, index=False))
+
+    def describe(self):
+        """
+        Cheap descriptor of the stored rows (date range, row count, last write): changes only
+        when an upsert changed the store. Reads just the date column.
+        """
+        try:
+            dates = pd.read_parquet(self.path, columns=["date"])["date"]
+            modified = os.stat(self.path).st_mtime_ns
+        except Exception:
+            return None
+        return {
+            "min_date": dates.min() if len(dates) else None,
+            "max_date": dates.max() if len(dates) else None,
+            "rows": len(dates),
+            "modified_ns": modified,
+        }
+
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+def get_mirror(storage=None, root=MIRROR_DIR):
+    """
+    Process-wide LocalMirror per root (like get_storage()), so concurrent callers share
+    one lock and one view of the sync state.
+    """
+    with _mirrors_lock:
+        if root not in _mirrors:
+            if storage is None:
+                storage = get_storage()
+            _mirrors[root] = LocalMirror(storage, root=root)
+        return _mirrors[root]
@@ -1,8 +1,13 @@
 import os
+import sys
 import pandas as pd
 from datetime import datetime
-from scraper import SeoulSubwayCollector, WeatherCollector
-from storage_supabase import SupabaseStorage
+
+# Ensure imports work if run directly (python crawler/main.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.scraper import SeoulSubwayCollector
+from crawler.nowcast import run_nowcast_collection
+from crawler.storage_supabase import get_storage
 
 # Path Setup
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -21,8 +26,7 @@ def collect_data():
     
     if subway_data:
         # Supabase Save
-        supabase_storage = SupabaseStorage()
-        supabase_storage.save_subway_data(subway_data)
+        get_storage().save_subway_data(subway_data)
         
         # Local Backup (Optional, for safety)
         # df_subway = pd.DataFrame(subway_data)
@@ -31,26 +35,11 @@ def collect_data():
     else:
         print("No subway data found or error occurred.")
 
-    # 2. Weather Data (Current)
-    weather_collector = WeatherCollector()
-    print("Fetching current weather...")
-    weather_data = weather_collector.fetch_current_weather()
-    
-    if weather_data:
-        # Supabase Save
-        supabase_storage = SupabaseStorage() # Re-init or reuse, straightforward to re-init
-        supabase_storage.save_weather_data(weather_data)
-
-        # Local Backup
-        # weather_path = os.path.join(DATA_DIR, f"weather_{datetime.now().strftime('%Y%m%d_%H%M')}.json")
-        # try:
-        #      import json
-        #      with open(weather_path, 'w', encoding='utf-8') as f:
-        #          json.dump(weather_data, f, ensure_ascii=False, indent=4)
-        # except:
-        #      pass
-    else:
-        print("No weather data found or error occurred.")
+    # 2. Weather Data (Hourly nowcast, backfilling any hours missed since the last run)
+    print("Fetching hourly weather...")
+    for log in run_nowcast_collection():
+        print(log, end="")
+    print()
 
     print("Data collection finished.")
 
@@ -0,0 +1,123 @@
+
+import os
+import sys
+import pandas as pd
+from datetime import datetime, timedelta
+
+# Ensure imports work if run directly (python crawler/nowcast.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.scraper import KST, WeatherCollector, nowcast_base_time
+from crawler.storage_supabase import get_storage
+
+# KMA keeps ultra-short-term observations for about a day; older gaps cannot be recovered
+NOWCAST_BACKFILL_HOURS = int(os.environ.get("NOWCAST_BACKFILL_HOURS", "24"))
+
+# getUltraSrtNcst category -> weather_hourly column
+NOWCAST_CATEGORIES = {
+    "T1H": "temperature",         # °C
+    "RN1": "precipitation",       # mm over the past hour
+    "PTY": "precipitation_type",  # 0 none, 1 rain, 2 rain/snow, 3 snow, 5 drizzle, 6 drizzle/snow, 7 snow flurry
+    "REH": "humidity",            # %
+    "WSD": "wind_speed",          # m/s
+}
+
+
+def parse_nowcast(data):
+    """
+    Parses a getUltraSrtNcst JSON response into one 'weather_hourly' row, or None if it has no items.
+    measured_at is the observation hour in KST (ISO 8601 with offset).
+    """
+    try:
+        items = data['response']['body']['items']['item']
+    except (KeyError, TypeError):
+        return None
+    if not items:
+        return None
+
+    observed = datetime.strptime(f"{items[0]['baseDate']}{items[0]['baseTime']}", "%Y%m%d%H%M").replace(tzinfo=KST)
+    row = {"measured_at": observed.isoformat()}
+    for item in items:
+        column = NOWCAST_CATEGORIES.get(item.get('category'))
+        if column is None:
+            continue
+        try:
+            value = float(item.get('obsrValue'))
+        except (TypeError, ValueError):
+            value = None
+        row[column] = int(value) if column == "precipitation_type" and value is not None else value
+    return row
+
+
+def expected_hours(now=None, hours=NOWCAST_BACKFILL_HOURS):
+    """
+    Returns the published observation hours (KST datetimes, oldest first) within the backfill window.
+    """
+    base_date, base_time = nowcast_base_time(now)
+    latest = datetime.strptime(base_date + base_time, "%Y%m%d%H%M").replace(tzinfo=KST)
+    return [latest - timedelta(hours=h) for h in reversed(range(hours))]
+
+
+class NowcastCollector:
+    """
+    Hourly KMA nowcast collector for Seongsu.
+    Each run fetches every published hour of the backfill window that is missing from
+    'weather_hourly', so a run after downtime catches up on the hours it missed.
+    Rows are insert-only; daily roll-ups ('weather_daily') are maintained by a trigger on insert.
+    """
+    def __init__(self, storage=None):
+        self.kma = WeatherCollector()
+        self.storage = storage or get_storage()
+
+    def stored_hours(self, since):
+        """
+        Returns the set of observation hours (UTC timestamps) already in 'weather_hourly' since `since`.
+        """
+        hours = set()
+        # Date filters are evaluated in UTC; start a day early so KST hours near midnight are included
+        start_date = (since - timedelta(days=1)).strftime("%Y-%m-%d")
+        for chunk in self.storage.iter_table_chunks("weather_hourly", columns="measured_at", start_date=start_date):
+            hours.update(pd.to_datetime(chunk["measured_at"], utc=True))
+        return hours
+
+    def missing_hours(self, now=None):
+        wanted = expected_hours(now)
+        stored = self.stored_hours(wanted[0]) if self.storage.client else set()
+        return [h for h in wanted if pd.Timestamp(h).tz_convert("UTC") not in stored]
+
+    def collect(self, hours=None, now=None):
+        """
+        Fetches and stores `hours` (default: the missing hours). Returns the list of stored rows.
+        """
+        rows = []
+        for hour in self.missing_hours(now) if hours is None else hours:
+            data = self.kma.fetch_observation(hour.strftime("%Y%m%d"), hour.strftime("%H00"))
+            row = parse_nowcast(data) if isinstance(data, dict) else None
+            if row is None:
+                print(f"⚠️ No nowcast for {hour:%Y-%m-%d %H:00} KST")
+                continue
+            rows.append(row)
+        if rows:
+            self.storage.append_weather_hourly(rows)
+        return rows
+
+
+def run_nowcast_collection():
+    """
+    Generator for the hourly nowcast job, yielding logs (same shape as the backfill runners).
+    """
+    yield f"=== Nowcast Collection: {datetime.now(KST):%Y-%m-%d %H:%M} KST ===\n"
+    try:
+        collector = NowcastCollector()
+        missing = collector.missing_hours()
+        yield f"🕐 {len(missing)}/{NOWCAST_BACKFILL_HOURS} hours missing in the backfill window\n"
+        rows = collector.collect(missing)
+        yield f"✅ Stored {len(rows)} hourly observations.\n"
+    except Exception as e:
+        yield f"CRITICAL NOWCAST ERROR: {str(e)}\n"
+    yield "=== Nowcast Collection Complete ==="
+
+
+if __name__ == "__main__":
+    for log in run_nowcast_collection():
+        print(log, end="")
+    print()
@@ -1,34 +1,88 @@
 
+import asyncio
+import functools
+import numpy as np
 import pandas as pd
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Path setup
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from crawler.storage_supabase import SupabaseStorage
+from crawler.storage_supabase import get_storage
+from crawler.storage_supabase_async import get_async_storage
+from crawler.scraper import SUBWAY_STATIONS
 from crawler.backfill_weather import OpenMeteoCollector
 from crawler.features import FeatureEngineer
+from crawler.local_mirror import get_mirror
+from crawler.pipeline_sessions import FrameCache, PipelineSession, SessionRegistry
+from crawler.step_cache import describe_hit, frame_fingerprint, get_step_cache, source_fingerprint
 
 # Ensure .env is loaded
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(env_path)
 
+# Columns step_7_merge needs from 'subway_traffic' (created_at etc. are never read)
+SUBWAY_COLUMNS = "date,station_name,line_number,boarding_count,alighting_count"
+
+# Panel key: features are computed per station/line
+STATION_COLUMNS = ["station_name", "line_number"]
+
+# History needed before the first new date: lag_364d reaches back 364 days
+FEATURE_CONTEXT_DAYS = 364
+
+# Code versions of the cached steps: editing any of these files invalidates their artifacts
+CRAWLER_DIR = os.path.dirname(os.path.abspath(__file__))
+MERGE_CODE_VERSION = source_fingerprint(
+    [os.path.join(CRAWLER_DIR, name) for name in ("pipeline.py", "backfill_weather.py", "local_mirror.py")]
+)
+FEATURES_CODE_VERSION = source_fingerprint(
+    [os.path.join(CRAWLER_DIR, name) for name in ("pipeline.py", "features.py")]
+)
+
+
+def session_step(step):
+    """
+    Resolves a step's `session` argument (default: the pipeline's own session, for scripts)
+    and serializes calls within that session.
+    """
+    @functools.wraps(step)
+    def wrapper(self, *args, session=None, **kwargs):
+        session = session or self.default_session
+        with session.lock:
+            session.touch()
+            return step(self, *args, session=session, **kwargs)
+    return wrapper
+
 class DataPipeline:
+    """
+    Level 2 steps over shared components (storage, mirror, collectors, caches).
+    Per-visitor progress lives in PipelineSession objects holding artifact keys; the frames
+    behind them come from the shared FrameCache, so concurrent sessions never share mutable state.
+    """
     def __init__(self):
-        self.storage = SupabaseStorage()
+        self.storage = get_storage()
+        self.mirror = get_mirror(self.storage)
         self.weather_collector = OpenMeteoCollector()
         self.fe = FeatureEngineer()
+        self.step_cache = get_step_cache()
         
-        # State persistence for Gradio steps
-        self.df_subway = None
-        self.df_weather = None
-        self.df_merged_cache = None
-        self.df_final_cache = None
+        self.frames = FrameCache(self.step_cache)
+        
+        # Session state for Gradio steps (scripts use the default session)
+        self.sessions = SessionRegistry()
+        self.default_session = PipelineSession("default")
         self.version_id = f"v2.0_{datetime.now().strftime('%Y%m%d')}"
 
+    def session(self, session_id):
+        """
+        The PipelineSession of a visitor (e.g. a Gradio session hash), created on first use.
+        """
+        return self.sessions.get(session_id)
+
     # --- Step 6: Calendar ---
     def step_6_calendar(self):
         """
@@ -41,86 +95,323 @@ class DataPipeline:
         return processed[['date', 'year', 'day_of_week', 'is_weekend', 'is_holiday']]
 
     # --- Step 7: Merge ---
-    def step_7_merge(self):
+    @session_step
+    def step_7_merge(self, start_date=None, end_date=None, session=None):
         """
-        Fetches Subway and Weather, Merges them.
+        Fetches Subway and Weather concurrently, Merges them.
+        Subway rows are read from the local Parquet mirror (incrementally synced from Supabase),
+        falling back to streaming keyset-paginated chunks (optionally bounded by
+        start_date/end_date, YYYY-MM-DD) if the mirror is unavailable. Weather is fetched for the
+        known date range at the same time, so the step waits only for the slower source.
+        The merged frame is cached as an artifact keyed by descriptors of the mirror and the
+        weather store (see _merge_inputs), checked before fetching, so unchanged inputs return
+        without reading either; step_8_features keys its own artifact on that key.
         Returns: String status, Dataframe preview
         """
         print("📥 [Step 7] Fetching Data...")
-        # 1. Subway
-        raw_subway = self.storage.fetch_all_subway_data()
-        if not raw_subway:
+        # 0. Unchanged inputs are served from the step cache before anything is fetched: the key
+        #    describes the mirror and weather store contents, not the frames read from them
+        try:
+            self.mirror.sync("subway_traffic")
+            self.mirror.sync("weather_daily")
+            inputs = self._merge_inputs(start_date, end_date)
+        except Exception as e:
+            print(f"⚠️ Local mirror unavailable ({e}).")
+            inputs = None
+        if inputs is not None:
+            key = self.step_cache.make_key("step_7_merge", inputs)
+            cached = self.step_cache.get(key)
+            if cached is not None:
+                merged, meta = cached
+                self.frames.put(key, merged)
+                session.merged_key = key
+                return f"{meta['message']}\n{describe_hit(meta)}", merged.head()
+
+        # 1. Subway and weather are fetched concurrently. Weather starts from the requested range,
+        #    completed from the dates already in the subway mirror; a first run has no range yet.
+        weather_range = self._known_subway_range(start_date, end_date)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            subway_future = executor.submit(self._load_subway, start_date, end_date)
+            weather_future = executor.submit(self._load_weather, *weather_range) if weather_range else None
+            chunks = subway_future.result()
+            df_weather = weather_future.result() if weather_future else None
+        if not chunks:
             return "❌ No subway data found.", pd.DataFrame()
-        self.df_subway = pd.DataFrame(raw_subway)
+        df_subway = pd.concat(chunks, ignore_index=True)
         
-        # 2. Weather
-        min_date = self.df_subway['date'].min()
-        max_date = self.df_subway['date'].max()
-        print(f"   Date Range: {min_date} ~ {max_date}")
+        # 2. Weather for the dates the subway rows actually span
+        min_date = df_subway['date'].min().strftime('%Y-%m-%d')
+        max_date = df_subway['date'].max().strftime('%Y-%m-%d')
+        print(f"   Date Range: {min_date} ~ {max_date} ({len(chunks)} chunks)")
         
-        # Try fetching weather (cached or fresh)
-        # For simplicity, we fetch fresh from OpenMeteo for range
-        self.df_weather = self.weather_collector.fetch_history(min_date, max_date)
-        if self.df_weather.empty:
+        if df_weather is None:
+            df_weather = self._load_weather(min_date, max_date)
+        else:
+            # The sync brought dates outside the known range: only those edges are loaded
+            edges = self._missing_edges(weather_range, min_date, max_date)
+            frames = [df_weather] + [self._load_weather(*edge) for edge in edges]
+            frames = [df for df in frames if not df.empty]
+            df_weather = pd.concat(frames, ignore_index=True) if frames else df_weather
+        if not df_weather.empty:
+            df_weather = df_weather[df_weather['date'].between(pd.Timestamp(min_date), pd.Timestamp(max_date))]
+        if df_weather.empty:
              return "❌ No weather data found.", pd.DataFrame()
 
-        # 3. Merge
-        self.df_subway['date'] = pd.to_datetime(self.df_subway['date'])
-        self.df_weather['date'] = pd.to_datetime(self.df_weather['date'])
-        
-        merged = pd.merge(self.df_subway, self.df_weather, on='date', how='left')
+        # 3. Merge, cached under the inputs as they are now (the loads may have synced or fetched);
+        #    without a mirror (streamed rows) the key falls back to the frames' content
+        merged = self._join_weather(df_subway, df_weather)
         
         # Drop rows where weather might be missing (inner join effect equivalent)
         # merged = merged.dropna(subset=['avg_temp']) 
         
-        self.df_merged_cache = merged
-        
-        return f"✅ Merged {len(merged)} rows.\nRange: {min_date}~{max_date}", merged.head()
+        inputs = self._merge_inputs(start_date, end_date) or {
+            "code": MERGE_CODE_VERSION,
+            "subway": frame_fingerprint(df_subway),
+            "weather": frame_fingerprint(df_weather),
+        }
+        key = self.step_cache.make_key("step_7_merge", inputs)
+        msg = f"✅ Merged {len(merged)} rows.\nRange: {min_date}~{max_date}"
+        self._store_artifact(key, merged, "step_7_merge", message=msg)
+        self.frames.put(key, merged)
+        session.merged_key = key
+        return msg, merged.head()
+
+    def _merge_inputs(self, start_date, end_date):
+        """
+        Cheap description of everything step_7_merge reads: the requested range, the mirror
+        watermarks of the subway rows and nowcast roll-ups, the local weather store and the code
+        version. None when it cannot stand for the data: no mirrored subway rows (they would be
+        streamed), or a weather store that stops before the subway dates (those are fetched).
+        """
+        subway = self.mirror.watermark("subway_traffic")
+        weather = self.weather_collector.store.describe()
+        if not subway["max_date"] or not weather or not weather["max_date"]:
+            return None
+        if weather["max_date"] < (end_date or subway["max_date"][:10]):
+            return None
+        return {
+            "code": MERGE_CODE_VERSION,
+            "range": [start_date, end_date],
+            "subway": subway,
+            "nowcast": self.mirror.watermark("weather_daily"),
+            "weather": weather,
+        }
+
+    def _known_subway_range(self, start_date, end_date):
+        """
+        (start, end) as YYYY-MM-DD: the requested bounds, completed from the subway dates already
+        in the local mirror (read without syncing). None if a bound is still unknown.
+        """
+        if not (start_date and end_date):
+            try:
+                stats = self.mirror.stats("subway_traffic", sync=False)
+            except Exception:
+                return None
+            start_date = start_date or stats["min_date"]
+            end_date = end_date or stats["max_date"]
+        return (start_date, end_date) if start_date and end_date else None
+
+    @staticmethod
+    def _missing_edges(known_range, min_date, max_date):
+        """
+        The (start, end) spans of [min_date, max_date] outside known_range (YYYY-MM-DD).
+        """
+        day = pd.Timedelta(days=1)
+        edges = []
+        if min_date < known_range[0]:
+            edges.append((min_date, (pd.Timestamp(known_range[0]) - day).strftime('%Y-%m-%d')))
+        if max_date > known_range[1]:
+            edges.append(((pd.Timestamp(known_range[1]) + day).strftime('%Y-%m-%d'), max_date))
+        return edges
+
+    def _load_subway(self, start_date, end_date):
+        """
+        Compact subway chunks from the local mirror, or streamed from Supabase if the mirror is unavailable.
+        """
+        try:
+            df_subway = self.mirror.read("subway_traffic", columns=SUBWAY_COLUMNS.split(","), start_date=start_date, end_date=end_date)
+        except Exception as e:
+            print(f"⚠️ Local mirror unavailable ({e}). Streaming from Supabase.")
+            df_subway = pd.DataFrame()
+        if not df_subway.empty:
+            return [self._compact_subway_chunk(df_subway)]
+        return [
+            self._compact_subway_chunk(chunk)
+            for chunk in self.storage.iter_table_chunks(
+                "subway_traffic", columns=SUBWAY_COLUMNS, start_date=start_date, end_date=end_date
+            )
+        ]
+
+    def _load_weather(self, start_date, end_date):
+        """
+        Daily weather with datetime64 dates: the local Open-Meteo store (only missing dates hit
+        the API), with days the archive has not published yet filled from the nowcast roll-ups.
+        """
+        df_weather = self.weather_collector.fetch_daily(start_date, end_date)
+        return self._fill_from_nowcast(df_weather, start_date, end_date)
+
+    @staticmethod
+    def _join_weather(df_subway, df_weather):
+        """
+        Left join of the daily weather onto the subway rows on datetime64 date keys: subway sorted
+        by date, weather as a sorted, unique date index.
+        """
+        subway = df_subway.assign(date=df_subway['date'].astype('datetime64[ns]'))
+        subway = subway.sort_values('date', kind='stable', ignore_index=True)
+        weather = df_weather.assign(date=pd.to_datetime(df_weather['date']).astype('datetime64[ns]'))
+        weather = weather.drop_duplicates('date', keep='last').set_index('date').sort_index()
+        return subway.join(weather, on='date')
+
+    def _store_artifact(self, key, df, step, **extra):
+        try:
+            self.step_cache.set(key, df, step=step, **extra)
+        except Exception as e:
+            print(f"⚠️ Step cache write failed ({step}): {e}")
+
+    def _fill_from_nowcast(self, df_weather, start_date, end_date):
+        """
+        Fills dates missing from the Open-Meteo frame with the 'weather_daily' roll-ups of the
+        hourly KMA nowcast. Open-Meteo values win wherever both exist.
+        """
+        if not df_weather.empty:
+            df_weather = df_weather.assign(date=pd.to_datetime(df_weather['date']))
+        try:
+            daily = self.mirror.read("weather_daily", start_date=start_date, end_date=end_date)
+        except Exception as e:
+            print(f"⚠️ Nowcast roll-ups unavailable ({e}).")
+            return df_weather
+        if daily.empty:
+            return df_weather
+
+        # Same PTY simplification as the Open-Meteo frame: 3=Snow, 1=Rain, 0=None
+        nowcast = pd.DataFrame({
+            "date": pd.to_datetime(daily['date']),
+            "avg_temp": daily['avg_temp'],
+            "precip_total": daily['precip_total'],
+            "precipitation_type": np.select([daily['snow_hours'] > 0, daily['rain_hours'] > 0], [3, 1], default=0),
+        }).dropna(subset=["avg_temp"])
+        if df_weather.empty:
+            return nowcast.reset_index(drop=True)
+        filled = df_weather.set_index("date").combine_first(nowcast.set_index("date"))
+        return filled.reset_index()
+
+    @staticmethod
+    def _compact_subway_chunk(chunk):
+        """
+        Converts one page of subway rows to compact dtypes before it is concatenated.
+        """
+        chunk = chunk[[c for c in chunk.columns if c in SUBWAY_COLUMNS.split(",")]].copy()
+        chunk['date'] = pd.to_datetime(chunk['date'])
+        for col in ('boarding_count', 'alighting_count'):
+            values = pd.to_numeric(chunk[col])
+            # int32 keeps boarding + alighting sums safe; NULL counts stay float
+            chunk[col] = values if values.isna().any() else values.astype('int32')
+        return chunk
 
     # --- Step 8: Features ---
-    def step_8_features(self):
+    @session_step
+    def step_8_features(self, incremental=False, day=None, session=None):
         """
         Generates Lags (1, 7, 364) and Rolling.
         Requires step_7_merge to have run.
+        incremental=True only computes features for dates newer than the latest stored
+        model_features.date, using the trailing FEATURE_CONTEXT_DAYS of history as context.
+        day (YYYY-MM-DD) keeps only that day's rows, with NaN lags left in place (flagged by
+        the lag_{n}d_is_gap masks) instead of dropped: gaps in the history never drop the day.
+        Outputs are cached per (merged artifact, mode, code version) like step_7_merge.
         """
-        if self.df_merged_cache is None:
+        df = self.frames.get(session.merged_key)
+        if df is None:
             return "❌ Please run Step 7 first.", pd.DataFrame()
         
-        df = self.df_merged_cache.copy()
+        # 0. Incremental window (falls back to full history if the store is empty)
+        latest_stored = self.storage.fetch_latest_date("model_features") if incremental else None
+        key = self.step_cache.make_key("step_8_features", {
+            "code": FEATURES_CODE_VERSION,
+            "merged": session.merged_key,
+            "latest_stored": latest_stored,
+            "day": day,
+        })
+        cached = self.step_cache.get(key)
+        if cached is not None:
+            df_clean, meta = cached
+            self.frames.put(key, df_clean)
+            session.final_key = key
+            return f"{meta['message']}\n{describe_hit(meta)}", self._feature_preview(df_clean)
+        if latest_stored:
+            cutoff = pd.Timestamp(latest_stored)
+            df = df[df['date'] > cutoff - pd.Timedelta(days=FEATURE_CONTEXT_DAYS)]
+        if day:
+            target = pd.Timestamp(day)
+            df = df[df['date'].between(target - pd.Timedelta(days=FEATURE_CONTEXT_DAYS), target)]
+        df = df.copy()
         
         # 1. Calendar
         df = self.fe.add_calendar_features(df, date_col='date')
         
         # 2. Sort
         df['total_traffic'] = df['boarding_count'] + df['alighting_count']
-        df.sort_values(by='date', inplace=True)
+        df.sort_values(by=STATION_COLUMNS + ['date'], inplace=True)
         
-        # 3. Lags
-        df['lag_1d'] = df['total_traffic'].shift(1)
-        df['lag_7d'] = df['total_traffic'].shift(7)
-        df['lag_364d'] = df['total_traffic'].shift(364) # Yearly Seasonality
+        # 3. Lags & Rolling (by date offset on a dense daily calendar, gap-aware, per station)
+        # lag_364d = Yearly Seasonality
+        gaps = self.fe.find_gaps(df['date'])
+        df = self.fe.add_lag_features(df, value_col='total_traffic', date_col='date', group_cols=STATION_COLUMNS)
         
-        # 4. Rolling
-        df['rolling_7d_avg'] = df['total_traffic'].shift(1).rolling(window=7).mean()
+        # 4. Keep only new dates (context rows were for lags/rolling only)
+        if latest_stored:
+            df = df[df['date'] > cutoff]
+        if day:
+            df = df[df['date'] == target]
+            if df.empty:
+                return f"❌ No subway data for {day}.", pd.DataFrame()
         
-        # 5. Clean
-        df_clean = df.dropna().copy()
+        # 5. Clean (a single day keeps its gap-flagged NaN lags)
+        df_clean = df.copy() if day else df.dropna().copy()
         dropped = len(df) - len(df_clean)
         
-        self.df_final_cache = df_clean
-        
-        msg = f"✅ Generated Features.\nRows: {len(df_clean)} (Dropped {dropped} NaNs)\nFeatures: Lag-1, Lag-7, Lag-364, Rolling-7"
-        return msg, df_clean[['date', 'total_traffic', 'lag_1d', 'lag_7d', 'lag_364d', 'rolling_7d_avg']].tail()
+        if day:
+            mode = f"Single day {day} (gaps flagged, not dropped)"
+        elif latest_stored:
+            mode = f"Incremental (after {latest_stored})"
+        else:
+            mode = "Full history"
+        if latest_stored and df_clean.empty:
+            msg = f"✅ Feature Store is up to date.\nMode: {mode}"
+        else:
+            msg = f"✅ Generated Features.\nRows: {len(df_clean)} (Dropped {dropped} NaNs)\nMode: {mode}\nStations: {df_clean.groupby(STATION_COLUMNS).ngroups}\nGaps: {len(gaps)} missing days in calendar\nFeatures: Lag-1, Lag-7, Lag-364, Rolling-7"
+        self._store_artifact(key, df_clean, "step_8_features", message=msg)
+        self.frames.put(key, df_clean)
+        session.final_key = key
+        return msg, self._feature_preview(df_clean)
+
+    @staticmethod
+    def _feature_preview(df):
+        if df.empty:
+            return df
+        return df[['date', 'station_name', 'total_traffic', 'lag_1d', 'lag_7d', 'lag_364d', 'rolling_7d_avg']].tail()
 
     # --- Step 9: Store ---
-    def step_9_store(self):
+    @session_step
+    def step_9_store(self, session=None):
         """
         Validates and Uploads to Supabase.
         """
-        if self.df_final_cache is None:
+        df_final = self.frames.get(session.final_key)
+        if df_final is None:
             return "❌ No feature data. Run Step 8 first."
         
-        df = self.df_final_cache.copy()
+        if df_final.empty:
+            return "ℹ️ Nothing new to upload. Feature Store is up to date."
+        
+        df = df_final.copy()
+        
+        # 0. 'model_features' is keyed by date: store the primary station's panel only
+        #    (a panel without it, e.g. no primary rows in the window, stores nothing)
+        primary_station, primary_line = SUBWAY_STATIONS[0]
+        df = df[(df['station_name'] == primary_station) & (df['line_number'] == primary_line)]
+        if df.empty:
+            return f"ℹ️ Nothing to upload: no rows for {primary_station} ({primary_line}) in the features."
         
         # 1. Validation
         if (df['total_traffic'] < 0).any():
@@ -148,19 +439,21 @@ class DataPipeline:
             
             # Save Local CSV Log
             log_path = f"logs/level2_execution_log_{datetime.now().strftime('%Y%m%d')}.md"
-            self.log_execution(log_path, df)
+            self.log_execution(log_path, df, artifact_key=session.final_key)
             
-            return f"✅ SUCCESS!\nUpserted {len(df)} rows to Supabase.\nVersion: {self.version_id}\nLog: {log_path}"
+            return f"✅ SUCCESS!\nUpserted {len(df)} rows to Supabase.\nVersion: {self.version_id}\nArtifact: {session.final_key[:12]}\nLog: {log_path}"
         except Exception as e:
             return f"❌ Upload Error: {str(e)}"
 
-    def log_execution(self, filepath, df):
+    def log_execution(self, filepath, df, artifact_key=None):
         os.makedirs("logs", exist_ok=True)
         with open(filepath, "w") as f:
             f.write("# Level 2 Execution Log\n")
             f.write(f"- **Date**: {datetime.now()}\n")
             f.write(f"- **Version**: {self.version_id}\n")
             f.write(f"- **Rows**: {len(df)}\n")
+            if artifact_key:
+                f.write(f"- **Features Artifact**: {artifact_key}\n")
             f.write("## Sample Data\n")
             f.write(df.tail().to_markdown())
 
@@ -185,6 +478,26 @@ class DataPipeline:
         except Exception as e:
             return f"❌ Verification Failed: {str(e)}", pd.DataFrame()
 
+    async def astep_10_verify(self):
+        """
+        Async step_10_verify for Gradio: the sample and the count are awaited concurrently.
+        """
+        storage = get_async_storage()
+        try:
+            if not await storage.get_client():
+                return "❌ Verification Failed: Supabase not connected", pd.DataFrame()
+            data, total_count = await asyncio.gather(
+                storage.fetch_recent("model_features", limit=5),
+                storage.count_rows("model_features"),
+            )
+            if not data:
+                return "⚠️ Table exists but no data found.", pd.DataFrame()
+            
+            msg = f"✅ Final Verification Passed!\nTotal Rows in DB: {total_count}\nVersion: {data[0].get('version_id')}"
+            return msg, pd.DataFrame(data)
+        except Exception as e:
+            return f"❌ Verification Failed: {str(e)}", pd.DataFrame()
+
 if __name__ == "__main__":
     # Test Run
     p = DataPipeline()
@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from crawler.step_cache import get_step_cache
+
+# Sessions untouched for this long (seconds) are dropped; their artifacts stay in the step cache
+PIPELINE_SESSION_IDLE_TTL = float(os.environ.get("PIPELINE_SESSION_IDLE_TTL", "1800"))
+PIPELINE_MAX_SESSIONS = int(os.environ.get("PIPELINE_MAX_SESSIONS", "500"))
+
+# In-memory budget for step frames shared by all sessions (the container limit is 1 GiB)
+PIPELINE_FRAME_BUDGET_BYTES = int(float(os.environ.get("PIPELINE_FRAME_BUDGET_MB", "256")) * 1024 * 1024)
+
+
+class PipelineSession:
+    """
+    One visitor's Level 2 progress. Holds artifact keys (handles into the step cache), never
+    DataFrames, so an idle session costs a few hundred bytes. The lock serializes clicks
+    within a session; different sessions run their steps concurrently.
+    """
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.merged_key = None
+        self.final_key = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class FrameCache:
+    """
+    Process-wide LRU of step frames keyed by artifact key, bounded by their in-memory size.
+    Misses are loaded from the on-disk step cache, so an evicted frame costs a Parquet read,
+    not a recompute. Sessions that reach the same inputs share one frame (keys are content-addressed);
+    frames are shared, so callers must copy before mutating.
+    """
+    def __init__(self, step_cache=None, max_bytes=PIPELINE_FRAME_BUDGET_BYTES):
+        self.step_cache = step_cache or get_step_cache()
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()  # key -> (df, bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._frames:
+                self._size -= self._frames.pop(key)[1]
+            self._frames[key] = (df, size)
+            self._size += size
+            self._evict()
+
+    def get(self, key):
+        """
+        Returns the frame for `key` (from memory, else from the step cache), or None if it is gone.
+        """
+        if key is None:
+            return None
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key][0]
+        cached = self.step_cache.get(key)
+        if cached is None:
+            return None
+        self.put(key, cached[0])
+        return cached[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": len(self._frames),
+                "size_mb": self._size / (1024 * 1024),
+                "max_mb": self.max_bytes / (1024 * 1024),
+            }
+
+    def _evict(self):
+        # Least recently used first; the newest frame stays even if it alone exceeds the budget
+        while self._size > self.max_bytes and len(self._frames) > 1:
+            _, (_, size) = self._frames.popitem(last=False)
+            self._size -= size
+
+
+class SessionRegistry:
+    """
+    Session id -> PipelineSession, dropping sessions idle for longer than idle_ttl
+    and the least recently used ones beyond max_sessions.
+    """
+    def __init__(self, idle_ttl=PIPELINE_SESSION_IDLE_TTL, max_sessions=PIPELINE_MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """
+        Returns the session for `session_id`, creating it on first use.
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None) or PipelineSession(session_id)
+            session.touch()
+            self._sessions[session_id] = session
+            self._evict()
+            return session
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
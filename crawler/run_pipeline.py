@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+# Ensure imports work if run directly (python crawler/run_pipeline.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.backfill_subway import run_subway_backfill
+from crawler.backfill_weather import run_weather_backfill
+from crawler.checkpoint import BackfillCheckpoint
+from crawler.nowcast import NowcastCollector, expected_hours
+from crawler.pipeline import DataPipeline
+from crawler.scraper import nowcast_base_time
+
+# Default location: <repo>/data/pipeline_state.json (override with PIPELINE_RUN_STATE)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_RUN_STATE = os.environ.get("PIPELINE_RUN_STATE", os.path.join(BASE_DIR, "data", "pipeline_state.json"))
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", "4"))
+
+# Output of collect_nowcast when the KMA API or the hourly table is unavailable
+NOWCAST_UNAVAILABLE = "unavailable"
+
+
+class PipelineStepError(Exception):
+    """A node reported failure (a ❌ status or a CRITICAL log line)."""
+
+
+class Node:
+    """
+    One step of the DAG.
+    run(inputs) receives the outputs of `deps` by name and returns this node's output: a short
+    fingerprint (e.g. an artifact key) that downstream nodes are keyed on.
+    `params` are the node's own inputs (date range, mode). If the last successful run saw the
+    same params and upstream outputs, the node is skipped and its stored output is reused,
+    provided restore(output) confirms the output is still usable.
+    always_run nodes (collectors, checks) never skip.
+    """
+    def __init__(self, name, run, deps=(), *, params=None, restore=None, always_run=False):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.params = params or {}
+        self.restore = restore
+        self.always_run = always_run
+
+
+class NodeResult:
+    def __init__(self, status, output=None, seconds=0.0, message=""):
+        self.status = status  # "ran", "skipped", "failed", "blocked"
+        self.output = output
+        self.seconds = seconds
+        self.message = message
+
+
+class DagRunner:
+    """
+    Runs nodes in dependency order on a thread pool: every node whose dependencies are done is
+    started at once, so independent nodes (the collectors) overlap. A failed node blocks its
+    dependents but not unrelated branches. Successful runs are recorded in a JSON state file
+    ({node: inputs fingerprint, output, finished_at}) that drives skipping on the next run.
+    """
+    def __init__(self, nodes, state_path=PIPELINE_RUN_STATE, workers=PIPELINE_WORKERS, log=print):
+        self.nodes = {node.name: node for node in nodes}
+        for node in nodes:
+            unknown = [dep for dep in node.deps if dep not in self.nodes]
+            if unknown:
+                raise ValueError(f"Node '{node.name}' depends on unknown nodes: {unknown}")
+        self.order = self._topological_order()
+        self.state_path = state_path
+        self.workers = workers
+        self.log = log
+        self.state = self._load_state()
+        self._state_lock = threading.Lock()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline DAG at '{name}'")
+            visiting.add(name)
+            for dep in self.nodes[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    # --- State ---
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def input_fingerprint(node, inputs):
+        payload = json.dumps({"params": node.params, "inputs": inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Run ---
+    def run(self, targets=None, force=()):
+        """
+        Runs `targets` (default: all nodes) and their upstream nodes. `force` names nodes to
+        rerun even if unchanged ("all" forces every node). Returns {name: NodeResult}.
+        """
+        selected = self._with_upstream(targets or self.order)
+        results = {}
+        pending = [name for name in self.order if name in selected]
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.nodes[name].deps
+                    if any(results.get(dep) and results[dep].status in ("failed", "blocked") for dep in deps):
+                        results[name] = NodeResult("blocked", message="upstream failed")
+                        self.log(f"⛔ {name}: blocked (upstream failed)")
+                        pending.remove(name)
+                    elif all(dep in results for dep in deps):
+                        inputs = {dep: results[dep].output for dep in deps}
+                        forced = "all" in force or name in force
+                        running[pool.submit(self._run_node, self.nodes[name], inputs, forced)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results[running.pop(future)] = future.result()
+        return results
+
+    def _with_upstream(self, targets):
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise ValueError(f"Unknown pipeline node: '{name}'")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.nodes[name].deps)
+        return selected
+
+    def _run_node(self, node, inputs, forced=False):
+        fingerprint = self.input_fingerprint(node, inputs)
+        previous = self.state.get(node.name, {})
+        if not (forced or node.always_run) and previous.get("inputs") == fingerprint:
+            output = previous.get("output")
+            if node.restore is None or node.restore(output):
+                self.log(f"⏭️ {node.name}: inputs unchanged since {previous.get('finished_at')}, skipped")
+                return NodeResult("skipped", output=output)
+
+        self.log(f"▶️ {node.name}: running")
+        started = time.time()
+        try:
+            output = node.run(inputs)
+        except Exception as e:
+            seconds = time.time() - started
+            self.log(f"❌ {node.name}: failed after {seconds:.1f}s ({e})")
+            return NodeResult("failed", seconds=seconds, message=str(e))
+
+        seconds = time.time() - started
+        with self._state_lock:
+            self.state[node.name] = {
+                "inputs": fingerprint,
+                "output": output,
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._save_state()
+        self.log(f"✅ {node.name}: done in {seconds:.1f}s")
+        return NodeResult("ran", output=output, seconds=seconds)
+
+
+# --- Pipeline nodes ---
+def _fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def drain_logs(logs, name):
+    """
+    Prints a collector's log generator and raises if it reported a critical error.
+    """
+    critical = None
+    for line in logs:
+        print(f"[{name}] {line.rstrip()}")
+        if "CRITICAL" in line:
+            critical = line.strip()
+    if critical:
+        raise PipelineStepError(critical)
+
+
+def check_step(message, name):
+    """
+    Prints a step's status message and raises if it reported failure (❌).
+    """
+    if str(message).lstrip().startswith("❌"):
+        raise PipelineStepError(str(message).strip())
+    print(f"[{name}] {str(message).strip()}")
+
+
+def _checkpoint_output(source, start_date, end_date):
+    """
+    Output of a collector: the stored dates of its range, as recorded by its backfill checkpoint.
+    Changes only when the run stored new days.
+    """
+    done = sorted(d for d in BackfillCheckpoint(source).completed() if start_date <= d <= end_date)
+    return _fingerprint(done)
+
+
+def build_pipeline_nodes(pipeline, start_date, end_date, incremental=True, session=None):
+    """
+    The collect → merge → features → store → verify DAG for one collection window
+    (start_date / end_date as YYYYMMDD). The three collectors are independent and run in
+    parallel; merge waits for all of them. collect_nowcast never fails: merge only uses it to
+    fill unpublished days.
+    """
+    session = session or pipeline.default_session
+
+    def collect_subway(inputs):
+        drain_logs(run_subway_backfill(start_date, end_date), "collect_subway")
+        return _checkpoint_output("subway", start_date, end_date)
+
+    def collect_weather(inputs):
+        drain_logs(run_weather_backfill(start_date, end_date), "collect_weather")
+        return _checkpoint_output("weather", start_date, end_date)
+
+    def collect_nowcast(inputs):
+        # Best effort: merge only uses the nowcast to fill days the archive has not published,
+        # so a KMA outage or a missing 'weather_hourly' table must not block it
+        try:
+            collector = NowcastCollector(storage=pipeline.storage)
+            rows = collector.collect()
+            print(f"[collect_nowcast] Stored {len(rows)} hourly observations.")
+            hours = collector.stored_hours(expected_hours()[0]) if pipeline.storage.client else set()
+        except Exception as e:
+            print(f"[collect_nowcast] ⚠️ Nowcast unavailable, merging with the stored roll-ups ({e})")
+            return NOWCAST_UNAVAILABLE
+        return _fingerprint(sorted(str(h) for h in hours))
+
+    def merge(inputs):
+        check_step(pipeline.step_7_merge(session=session)[0], "merge")
+        return session.merged_key
+
+    def features(inputs):
+        session.merged_key = inputs["merge"]
+        check_step(pipeline.step_8_features(incremental, session=session)[0], "features")
+        return session.final_key
+
+    def store(inputs):
+        session.final_key = inputs["features"]
+        check_step(pipeline.step_9_store(session=session), "store")
+        return inputs["features"]
+
+    def verify(inputs):
+        check_step(pipeline.step_10_verify()[0], "verify")
+
+    def restore(attr):
+        # A skipped step is only reusable while its artifact is still in the step cache
+        def restore_key(key):
+            if key is None or pipeline.frames.get(key) is None:
+                return False
+            setattr(session, attr, key)
+            return True
+        return restore_key
+
+    # Collectors always run (their inputs are the upstream APIs); they resume from what is stored,
+    # and their outputs only change when new days/hours were written
+    window = {"start_date": start_date, "end_date": end_date}
+    return [
+        Node("collect_subway", collect_subway, params=window, always_run=True),
+        Node("collect_weather", collect_weather, params=window, always_run=True),
+        Node("collect_nowcast", collect_nowcast, params={"base_time": nowcast_base_time()}, always_run=True),
+        Node("merge", merge, deps=("collect_subway", "collect_weather", "collect_nowcast"), restore=restore("merged_key")),
+        Node("features", features, deps=("merge",), params={"incremental": incremental}, restore=restore("final_key")),
+        Node("store", store, deps=("features",), params={"version_id": pipeline.version_id}),
+        Node("verify", verify, deps=("store",), always_run=True),
+    ]
+
+
+def main(argv=None):
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    parser = argparse.ArgumentParser(description="Headless collect → merge → features → store → verify pipeline.")
+    parser.add_argument("--start", default=yesterday, help="Collection window start (YYYYMMDD, default: yesterday)")
+    parser.add_argument("--end", default=yesterday, help="Collection window end (YYYYMMDD, default: yesterday)")
+    parser.add_argument("--full", action="store_true", help="Recompute features for the full history (not incremental)")
+    parser.add_argument("--only", default="", help="Comma-separated target nodes (their upstream nodes run too)")
+    parser.add_argument("--force", default="", help="Comma-separated nodes to rerun even if unchanged, or 'all'")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS)
+    parser.add_argument("--state", default=PIPELINE_RUN_STATE, help="Run state file used for skipping")
+    args = parser.parse_args(argv)
+
+    pipeline = DataPipeline()
+    nodes = build_pipeline_nodes(pipeline, args.start, args.end, incremental=not args.full)
+    runner = DagRunner(nodes, state_path=args.state, workers=args.workers)
+    results = runner.run(
+        targets=[n for n in args.only.split(",") if n] or None,
+        force={n for n in args.force.split(",") if n},
+    )
+
+    print("\n=== Pipeline Summary ===")
+    for name in runner.order:
+        if name in results:
+            result = results[name]
+            print(f"{name:16} {result.status:8} {result.seconds:6.1f}s {result.message}")
+    return 1 if any(r.status in ("failed", "blocked") for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,5 +19,8 @@ create table if not exists weather_data (
   temperature float,
   precipitation_type int,
   humidity float,
-  created_at timestamp with time zone default timezone('utc'::text, now())
+  created_at timestamp with time zone default timezone('utc'::text, now()),
+
+  -- One row per observation time (upsert conflict target)
+  unique(measured_at)
 );
@@ -1,21 +1,57 @@
 import os
-import requests
-import pandas as pd
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
+from crawler.http_cache import get_response_cache, ttl_for_date
+from crawler.http_client import api_base, api_key, get_transport
 
 # Ensure we load .env from the crawler directory
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(env_path)
 
+# Target stations as (station name, line name) pairs, matching SBWY_STNS_NM / SBWY_ROUT_LN_NM.
+# Override with SUBWAY_STATIONS, e.g. "성수:2호선,뚝섬:2호선,서울숲:수인분당선". The first entry is the primary station.
+DEFAULT_STATIONS = [("성수", "2호선")]
+
+def parse_station_set(value):
+    """
+    Parses "station:line,station:line" into a list of (station, line) tuples.
+    """
+    stations = []
+    for item in (value or "").split(","):
+        if ":" in item:
+            station, line = item.split(":", 1)
+            stations.append((station.strip(), line.strip()))
+    return stations
+
+SUBWAY_STATIONS = parse_station_set(os.getenv("SUBWAY_STATIONS")) or DEFAULT_STATIONS
+
+# CardSubwayStatsNew returns at most 1000 rows per request; remaining pages are fetched concurrently
+SEOUL_PAGE_SIZE = 1000
+SEOUL_PAGE_WORKERS = 4
+# Days older than this are final (the API publishes with a ~3 day lag) and can be cached forever
+SEOUL_API_LAG_DAYS = 4
+DAY_CACHE_SIZE = 4096
+
+# Parsed days shared by all collector instances: (YYYYMMDD, stations) -> rows
+_day_cache = OrderedDict()
+_day_cache_lock = threading.Lock()
+
 class SeoulSubwayCollector:
     """
     Collects subway passenger data from Seoul Data Square.
-    Target Station: Seongsu (Station Code: 211 - Line 2)
+    Target Stations: SUBWAY_STATIONS (default: Seongsu, Station Code: 211 - Line 2)
     """
-    def __init__(self):
-        self.api_key = os.getenv("SEOUL_DATA_API_KEY")
-        self.base_url = "http://openapi.seoul.go.kr:8088"
+    def __init__(self, stations=None):
+        self.api_key = api_key("SEOUL_DATA_API_KEY")
+        self.base_url = api_base("http://openapi.seoul.go.kr:8088")
+        self.stations = list(stations or SUBWAY_STATIONS)
+        self._station_keys = set(self.stations)
+        # Shared pooled transport (keep-alive, timeouts, retry/backoff) for page fetches and backfill threads
+        self.http = get_transport()
         
     def fetch_realtime_station_arrival(self, station_name="성수"):
         """
@@ -30,7 +66,7 @@ class SeoulSubwayCollector:
         url = f"http://swopenAPI.seoul.go.kr/api/subway/{self.api_key}/json/realtimeStationArrival/0/5/{station_name}"
         
         try:
-            response = requests.get(url)
+            response = self.http.get(url, endpoint="seoul:realtimeStationArrival")
             response.raise_for_status()
             data = response.json()
             return data.get("realtimeArrivalList", [])
@@ -41,65 +77,128 @@ class SeoulSubwayCollector:
     def fetch_daily_passenger_count(self, user_date):
         """
         Fetches daily passenger count for a specific date (YYYYMMDD).
-        Service: CardSubwayStatsNew
+        Service: CardSubwayStatsNew (one download covers every station; all configured stations are kept)
         """
         if not self.api_key:
              print("Warning: SEOUL_DATA_API_KEY is missing")
              return None
 
-        # Format: http://openapi.seoul.go.kr:8088/{KEY}/json/CardSubwayStatsNew/1/1000/{DATE}
-        url = f"{self.base_url}/{self.api_key}/json/CardSubwayStatsNew/1/1000/{user_date}"
-        
+        cache_key = (user_date, tuple(self.stations))
+        with _day_cache_lock:
+            if cache_key in _day_cache:
+                _day_cache.move_to_end(cache_key)
+                return list(_day_cache[cache_key])
+
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "CardSubwayStatsNew" in data and "row" in data["CardSubwayStatsNew"]:
-                rows = data["CardSubwayStatsNew"]["row"]
-                # Filter for Seongsu station (Line 2) and map to expected keys
-                seongsu_data = []
-                for row in rows:
-                    # New API Keys: SBWY_STNS_NM (Station), SBWY_ROUT_LN_NM (Line)
-                    if row.get("SBWY_STNS_NM") == "성수" and row.get("SBWY_ROUT_LN_NM") == "2호선":
-                        seongsu_data.append({
-                            "USE_DT": row.get("USE_YMD"),
-                            "SUB_STA_NM": row.get("SBWY_STNS_NM"),
-                            "LINE_NUM": row.get("SBWY_ROUT_LN_NM"),
-                            "RIDE_PASGR_NUM": row.get("GTON_TNOPE"),
-                            "ALIGHT_PASGR_NUM": row.get("GTOFF_TNOPE")
-                        })
-                return seongsu_data
-            return []
+            # 1. First page tells us list_total_count
+            data = self._fetch_stats_page(user_date, 1, SEOUL_PAGE_SIZE)
+            if "CardSubwayStatsNew" not in data or "row" not in data["CardSubwayStatsNew"]:
+                return []
+            rows = list(data["CardSubwayStatsNew"]["row"])
+            total = int(data["CardSubwayStatsNew"].get("list_total_count", len(rows)))
+
+            # 2. Remaining pages, fetched concurrently over the pooled session
+            ranges = [(start, min(start + SEOUL_PAGE_SIZE - 1, total)) for start in range(SEOUL_PAGE_SIZE + 1, total + 1, SEOUL_PAGE_SIZE)]
+            if ranges:
+                with ThreadPoolExecutor(max_workers=min(SEOUL_PAGE_WORKERS, len(ranges))) as executor:
+                    pages = executor.map(lambda r: self._fetch_stats_page(user_date, *r), ranges)
+                    for page in pages:
+                        rows.extend(page.get("CardSubwayStatsNew", {}).get("row", []))
+
+            station_data = self.parse_daily_rows(rows)
         except Exception as e:
             print(f"Error fetching daily subway stats: {e}")
             return []
 
+        # 3. Historical days never change once published: keep the parsed result
+        if station_data and self._is_final(user_date):
+            with _day_cache_lock:
+                _day_cache[cache_key] = list(station_data)
+                if len(_day_cache) > DAY_CACHE_SIZE:
+                    _day_cache.popitem(last=False)
+        return station_data
+
+    def _fetch_stats_page(self, user_date, start, end):
+        # Format: http://openapi.seoul.go.kr:8088/{KEY}/json/CardSubwayStatsNew/{START}/{END}/{DATE}
+        url = f"{self.base_url}/{self.api_key}/json/CardSubwayStatsNew/{start}/{end}/{user_date}"
+
+        def fetch():
+            response = self.http.get(url, endpoint="seoul:CardSubwayStatsNew")
+            response.raise_for_status()
+            return response.json()
+
+        # On-disk cache (API key masked): published days are immutable, recent days expire
+        return get_response_cache().get_or_fetch(
+            url, fetch,
+            ttl=ttl_for_date(user_date, SEOUL_API_LAG_DAYS),
+            secrets=[self.api_key],
+            cacheable=lambda body: "CardSubwayStatsNew" in body,
+        )
+
+    @staticmethod
+    def _is_final(user_date):
+        return datetime.strptime(user_date, "%Y%m%d") < datetime.now() - timedelta(days=SEOUL_API_LAG_DAYS)
+
+    def parse_daily_rows(self, rows):
+        """
+        Filters one CardSubwayStatsNew day down to the configured stations in a single pass
+        and maps them to the expected keys.
+        """
+        station_data = []
+        for row in rows:
+            # New API Keys: SBWY_STNS_NM (Station), SBWY_ROUT_LN_NM (Line)
+            if (row.get("SBWY_STNS_NM"), row.get("SBWY_ROUT_LN_NM")) in self._station_keys:
+                station_data.append({
+                    "USE_DT": row.get("USE_YMD"),
+                    "SUB_STA_NM": row.get("SBWY_STNS_NM"),
+                    "LINE_NUM": row.get("SBWY_ROUT_LN_NM"),
+                    "RIDE_PASGR_NUM": row.get("GTON_TNOPE"),
+                    "ALIGHT_PASGR_NUM": row.get("GTOFF_TNOPE")
+                })
+        return station_data
+
+# KMA ultra-short-term observations: produced on the hour, published ~40 minutes later (KST)
+KST = ZoneInfo("Asia/Seoul")
+KMA_NOWCAST_PUBLISH_MINUTE = 40
+
+def nowcast_base_time(now=None):
+    """
+    Returns (base_date YYYYMMDD, base_time HH00) of the latest published nowcast.
+    Computed from a single KST datetime so the date rolls back correctly around midnight.
+    """
+    now = now.astimezone(KST) if now else datetime.now(KST)
+    if now.minute < KMA_NOWCAST_PUBLISH_MINUTE:
+        now -= timedelta(hours=1)
+    return now.strftime("%Y%m%d"), now.strftime("%H00")
+
 class WeatherCollector:
     """
     Collects weather data from KMA (Korea Meteorological Administration).
     Location: Seongsu-dong (Grid approximation: X=61, Y=126 for Seongdong-gu)
     """
     def __init__(self):
-        self.api_key = os.getenv("KMA_API_KEY")
+        self.api_key = api_key("KMA_API_KEY")
         # Base URL for Ultra Short Term Forecast
-        self.base_url = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst"
+        self.base_url = api_base("http://apis.data.go.kr") + "/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst"
         self.nx = 61
         self.ny = 126
+        self.http = get_transport()
         
     def fetch_current_weather(self):
         """
         Fetches current weather (Temperature, Precipitation, etc.)
         """
+        base_date, base_time = nowcast_base_time()
+        return self.fetch_observation(base_date, base_time)
+
+    def fetch_observation(self, base_date, base_time):
+        """
+        Fetches the ultra-short-term observation for one hour (base_date YYYYMMDD, base_time HH00, KST).
+        KMA serves only the last ~24 hours of observations.
+        """
         if not self.api_key:
             print("Warning: KMA_API_KEY is missing")
             return None
-            
-        now = datetime.now()
-        base_date = now.strftime("%Y%m%d")
-        # API requires base_time in HHMM format, closest past hour
-        # Logic to find closest hour (not implemented fully robustly here for brevity, assuming run at reasonable times)
-        base_time = (now - pd.Timedelta(hours=1)).strftime("%H00") 
 
         params = {
             "serviceKey": self.api_key, # Note: Encoding might be an issue with requests param, better to put in URL if special chars exist
@@ -117,7 +216,7 @@ class WeatherCollector:
         # Here passing as param dict.
         
         try:
-            response = requests.get(self.base_url, params=params)
+            response = self.http.get(self.base_url, params=params, endpoint="kma:getUltraSrtNcst")
             # If key error, it might return XML or error msg.
             if response.status_code == 200:
                 try:
@@ -129,4 +228,3 @@ class WeatherCollector:
         except Exception as e:
             print(f"Error fetching weather data: {e}")
             return None
-
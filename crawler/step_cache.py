@@ -0,0 +1,219 @@
+import os
+import json
+import hashlib
+import threading
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Default location: <repo>/data/step_cache (override with STEP_CACHE_DIR, e.g. a PVC shared by replicas)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEP_CACHE_DIR = os.environ.get("STEP_CACHE_DIR", os.path.join(BASE_DIR, "data", "step_cache"))
+STEP_CACHE_MAX_BYTES = int(float(os.environ.get("STEP_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+
+def source_fingerprint(paths):
+    """
+    Hash of the given source files' contents: the code-version part of an artifact key,
+    so editing a step's code invalidates its artifacts.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df):
+    """
+    Content hash of a DataFrame (columns, dtypes and rows, independent of row order),
+    so re-reading or rewriting unchanged data yields the same fingerprint.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+class StepCache:
+    """
+    Content-addressed on-disk cache for pipeline step outputs.
+    An artifact is a DataFrame stored at {root}/{key[:2]}/{key}.parquet with a {key}.json
+    sidecar (step, inputs, message, created_at), where key = sha256(step + inputs).
+    Reads bump the mtime, and when the cache grows past max_bytes the least recently
+    used artifacts are evicted first.
+    """
+    def __init__(self, root=STEP_CACHE_DIR, max_bytes=STEP_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(step, inputs):
+        """
+        Builds the artifact key from the step name and a JSON-serializable description of its inputs.
+        """
+        payload = json.dumps({"step": step, "inputs": inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, key):
+        """
+        Returns (DataFrame, meta) for a stored artifact, or None on a miss.
+        """
+        meta_path = self._path(key, "json")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            df = pd.read_parquet(self._path(key, "parquet"))
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Step cache read failed ({key[:12]}): {e}")
+            self._count("misses")
+            return None
+
+        for path in (meta_path, self._path(key, "parquet")):
+            with contextlib.suppress(OSError):
+                os.utime(path)  # LRU: most recently used = newest mtime
+        self._count("hits")
+        return df, meta
+
+    def set(self, key, df, step=None, inputs=None, **extra):
+        """
+        Stores `df` with its provenance (`extra` is kept in the sidecar). Returns the meta dict.
+        """
+        path = self._path(key, "parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replaced = sum(self._file_size(p) for p in (path, self._path(key, "json")))
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        written = os.path.getsize(path)
+
+        meta = {
+            "key": key,
+            "step": step,
+            "inputs": inputs,
+            "rows": len(df),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            **extra,
+        }
+        # The sidecar is written last: an artifact only becomes visible once complete
+        meta_path = self._path(key, "json")
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, meta_path)
+        written += os.path.getsize(meta_path)
+
+        with self._lock:
+            self.stores += 1
+            # An overwritten artifact's old files leave the total; a fresh scan already counts the new ones
+            self._size = self._scan_size() if self._size is None else self._size + written - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+        return meta
+
+    def stats(self):
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "size_mb": self._size / (1024 * 1024),
+                "max_mb": self.max_bytes / (1024 * 1024),
+            }
+
+    # --- Internals ---
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _entries(self):
+        """
+        One (mtime, size, key paths) entry per artifact; the frame and sidecar are evicted together.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        artifacts = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                stem, ext = os.path.splitext(name)
+                if ext not in (".json", ".parquet"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                mtime, size, paths = artifacts.get(stem, (0, 0, []))
+                artifacts[stem] = (max(mtime, st.st_mtime), size + st.st_size, paths + [path])
+        return list(artifacts.values())
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Oldest mtime first, down to 90% of the budget so we don't evict on every write
+        target = self.max_bytes * 0.9
+        for _, size, paths in sorted(self._entries(), key=lambda e: e[0]):
+            if self._size <= target:
+                break
+            # Sidecar first, so a half-evicted artifact reads as a miss; try every file even if one fails
+            removed = [self._remove(path) for path in sorted(paths, key=lambda p: not p.endswith(".json"))]
+            if all(removed):
+                self._size -= size
+                self.evictions += 1
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+def describe_hit(meta):
+    """
+    One-line provenance for a cache hit, shown in step messages.
+    """
+    return f"♻️ Cache hit: {meta.get('step')} artifact {meta['key'][:12]} (built {meta.get('created_at')})"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_step_cache():
+    """
+    Process-wide StepCache, so hit/miss counters aggregate across pipeline instances.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = StepCache()
+        return _cache
@@ -1,21 +1,101 @@
 import os
+import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
+from crawler.fake_supabase import FakeSupabaseClient, use_fake_backend
 import pandas as pd
 
+# Buffered subway writer defaults (rows per upsert / max seconds a row may sit in the buffer)
+SUBWAY_BATCH_SIZE = int(os.environ.get("SUBWAY_BATCH_SIZE", "500"))
+SUBWAY_FLUSH_INTERVAL = float(os.environ.get("SUBWAY_FLUSH_INTERVAL", "10"))
+
+# Bulk upserts: max JSON payload per request and requests in flight at once
+UPSERT_BATCH_BYTES = int(os.environ.get("SUPABASE_UPSERT_BATCH_BYTES", str(512 * 1024)))
+UPSERT_CONCURRENCY = int(os.environ.get("SUPABASE_UPSERT_CONCURRENCY", "4"))
+
+# Keyset pagination: page size and (date filter column, ordered unique key) per table
+PAGE_SIZE = 1000
+TABLE_KEYSETS = {
+    "subway_traffic": ("date", ("date", "id")),
+    "weather_data": ("measured_at", ("measured_at", "id")),
+    "model_features": ("date", ("date",)),
+    "weather_hourly": ("measured_at", ("measured_at",)),
+    "weather_daily": ("date", ("date",)),
+}
+
+# Shared client health: re-probe at most this often, and wait this long before retrying a failed init (seconds)
+HEALTH_CHECK_INTERVAL = float(os.environ.get("SUPABASE_HEALTH_CHECK_INTERVAL", "60"))
+CLIENT_RETRY_INTERVAL = float(os.environ.get("SUPABASE_CLIENT_RETRY_INTERVAL", "30"))
+
 class SupabaseStorage:
+    """
+    Supabase access layer. The client (and its pooled HTTP connections) is created lazily on
+    first use, so constructing a SupabaseStorage never touches the network.
+    Use get_storage() to share one instance per process.
+    """
     def __init__(self):
         self.url = os.environ.get("SUPABASE_URL")
         self.key = os.environ.get("SUPABASE_KEY")
-        self.client: Client = None
+        self._client: Client = None
+        self._client_lock = threading.Lock()
+        self._failed_at = None
+        self._checked_at = None
+        self._healthy = None
         
-        if self.url and self.key:
-            try:
-                self.client = create_client(self.url, self.key)
-            except Exception as e:
-                print(f"Failed to initialize Supabase client: {e}")
-        else:
+        if not (self.url and self.key or use_fake_backend()):
             print("Warning: SUPABASE_URL or SUPABASE_KEY not found in environment variables.")
 
+    @property
+    def client(self):
+        """
+        The shared Supabase client, created on first access (None if unconfigured or unreachable).
+        """
+        if self._client is not None or not (self.url and self.key or use_fake_backend()):
+            return self._client
+        with self._client_lock:
+            if self._client is None:
+                if self._failed_at and time.time() - self._failed_at < CLIENT_RETRY_INTERVAL:
+                    return None
+                try:
+                    # SUPABASE_BACKEND=sqlite swaps in the local PostgREST stand-in (offline runs/benchmarks)
+                    self._client = FakeSupabaseClient() if use_fake_backend() else create_client(self.url, self.key)
+                    self._failed_at = None
+                except Exception as e:
+                    self._failed_at = time.time()
+                    print(f"Failed to initialize Supabase client: {e}")
+            return self._client
+
+    def reset(self):
+        """
+        Drops the client so the next access builds a fresh one (e.g. after a failed health check).
+        """
+        with self._client_lock:
+            self._client = None
+            self._checked_at = None
+
+    def health_check(self, force=False):
+        """
+        Cheap round trip (one key from 'subway_traffic') proving the client is usable.
+        The result is reused for HEALTH_CHECK_INTERVAL seconds; a failure resets the client.
+        """
+        if not force and self._checked_at and time.time() - self._checked_at < HEALTH_CHECK_INTERVAL:
+            return self._healthy
+        client = self.client
+        if client is None:
+            return False
+        try:
+            client.table("subway_traffic").select("date").limit(1).execute()
+            self._healthy = True
+        except Exception as e:
+            print(f"Supabase health check failed: {e}")
+            self.reset()
+            self._healthy = False
+        self._checked_at = time.time()
+        return self._healthy
+
     def save_subway_data(self, data):
         """
         Upserts subway traffic data into 'subway_traffic' table.
@@ -25,13 +105,33 @@ class SupabaseStorage:
             print("Supabase client not initialized. Skipping save.")
             return
 
+        formatted_data = self._format_subway_rows(data)
+        if not formatted_data:
+            return
+
+        try:
+            self._upsert_subway_rows(formatted_data)
+            print(f"Successfully saved {len(formatted_data)} records to Supabase (subway_traffic).")
+        except Exception as e:
+            print(f"Error saving subway data to Supabase: {e}")
+
+    def buffered_subway_writer(self, batch_size=SUBWAY_BATCH_SIZE, flush_interval=SUBWAY_FLUSH_INTERVAL, on_flush=None):
+        """
+        Returns a SubwayBatchWriter that collects rows across days and upserts them in batches.
+        Use as a context manager so the final partial batch is flushed on exit.
+        on_flush(rows) is called after each flush with the rows of fully written days.
+        """
+        return SubwayBatchWriter(self, batch_size=batch_size, flush_interval=flush_interval, on_flush=on_flush)
+
+    @staticmethod
+    def _format_subway_rows(data):
+        """
+        Maps SeoulSubwayCollector rows to the 'subway_traffic' schema.
+        Input format: {'USE_DT': '20231024', 'LINE_NUM': '2호선', 'SUB_STA_NM': '성수', 'RIDE_PASGR_NUM': 100, 'ALIGHT_PASGR_NUM': 200, ...}
+        """
         if not isinstance(data, list):
             data = [data]
 
-        # Process data to match schema
-        # Input format from SeoulSubwayCollector (likely):
-        # {'USE_DT': '20231024', 'LINE_NUM': '2호선', 'SUB_STA_NM': '성수', 'RIDE_PASGR_NUM': 100, 'ALIGHT_PASGR_NUM': 200, ...}
-        
         formatted_data = []
         for row in data:
             try:
@@ -46,16 +146,40 @@ class SupabaseStorage:
             except KeyError as e:
                 print(f"Skipping row due to missing key: {e} in {row}")
                 continue
+        return formatted_data
 
-        if not formatted_data:
-            return
+    def _upsert_subway_rows(self, formatted_data):
+        # Upserting based on unique constraint (date, station, line)
+        self.client.table("subway_traffic").upsert(formatted_data, on_conflict="date, station_name, line_number").execute()
 
-        try:
-            # Upserting based on unique constraint (date, station, line)
-            _ = self.client.table("subway_traffic").upsert(formatted_data, on_conflict="date, station_name, line_number").execute()
-            print(f"Successfully saved {len(formatted_data)} records to Supabase (subway_traffic).")
-        except Exception as e:
-            print(f"Error saving subway data to Supabase: {e}")
+    def upsert_records(self, table, records, on_conflict, max_batch_bytes=UPSERT_BATCH_BYTES, concurrency=UPSERT_CONCURRENCY):
+        """
+        Idempotently upserts `records` into `table`, split into batches of at most
+        `max_batch_bytes` of JSON and sent with up to `concurrency` requests in flight.
+        Returns (written_rows, failed_rows); a failed batch does not stop the others.
+        """
+        if not self.client:
+            print("Supabase client not initialized. Skipping save.")
+            return 0, len(records)
+
+        batches = split_by_bytes(records, max_batch_bytes)
+
+        def send(batch):
+            try:
+                self.client.table(table).upsert(batch, on_conflict=on_conflict).execute()
+                return len(batch), 0
+            except Exception as e:
+                print(f"❌ Error upserting {len(batch)} rows into {table}: {e}")
+                if "no unique or exclusion constraint" in str(e):
+                    print(f"⚠️ '{table}' needs a unique constraint on ({on_conflict}). Please run the SQL script.")
+                return 0, len(batch)
+
+        written = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches) or 1))) as executor:
+            for ok, bad in executor.map(send, batches):
+                written += ok
+                failed += bad
+        return written, failed
 
     def save_weather_data(self, data):
         """
@@ -66,78 +190,189 @@ class SupabaseStorage:
             print("Supabase client not initialized. Skipping save.")
             return
 
+        try:
+            payload = self._format_weather_row(data)
+            _ = self.client.table("weather_data").insert(payload).execute()
+            print("Successfully saved weather data to Supabase (weather_data).")
+            
+        except Exception as e:
+            print(f"Error parsing or saving weather data to Supabase: {e}")
+
+    @staticmethod
+    def _format_weather_row(data):
+        """
+        Maps a KMA getUltraSrtNcst response to one 'weather_data' row.
+        """
         # WeatherCollector returns complex JSON from KMA API. We need to parse it.
-        # However, WeatherCollector.fetch_current_weather might assume raw structure.
-        # Let's inspect what main.py currently does. It saves raw JSON.
         # We need to extract: temp, rain_type, humidity.
         # KMA API response structure (roughly): response -> body -> items -> item list
         # Categories: T1H (Temp), PTY (Precipitation Type), REH (Humidity)
+        items = data['response']['body']['items']['item']
         
-        try:
-            items = data['response']['body']['items']['item']
-            
-            # Simple extraction
-            temp = None
-            rain_type = None
-            humidity = None
-            measured_at = None # We should determine this, or just use now()
-            
-            # Extract basic obs time from first item if available
-            base_date = items[0].get('baseDate')
-            base_time = items[0].get('baseTime') # HHMM
-            if base_date and base_time:
-                # Naive ISO formatting: YYYY-MM-DDTHH:MM:00Z (Assuming KST but storing as compatible string)
-                # Ideally convert to UTC for "timestamp with time zone"
-                from datetime import datetime
-                dt_str = f"{base_date}{base_time}"
-                dt_obj = datetime.strptime(dt_str, "%Y%m%d%H%M")
-                measured_at = dt_obj.isoformat()
-
-            for item in items:
-                category = item.get('category')
-                obs_value = item.get('obsrValue')
-                
-                if category == 'T1H': # Temperature
-                    temp = float(obs_value)
-                elif category == 'PTY': # Precipitation Type
-                    rain_type = int(obs_value)
-                elif category == 'REH': # Humidity
-                    humidity = float(obs_value)
-            
-            if measured_at is None:
-                 from datetime import datetime
-                 measured_at = datetime.utcnow().isoformat()
-
-            payload = {
-                "measured_at": measured_at,
-                "temperature": temp,
-                "precipitation_type": rain_type,
-                "humidity": humidity
-            }
-            
-            _ = self.client.table("weather_data").insert(payload).execute()
-            print("Successfully saved weather data to Supabase (weather_data).")
+        # Simple extraction
+        temp = None
+        rain_type = None
+        humidity = None
+        measured_at = None # We should determine this, or just use now()
+        
+        # Extract basic obs time from first item if available
+        base_date = items[0].get('baseDate')
+        base_time = items[0].get('baseTime') # HHMM
+        if base_date and base_time:
+            # Naive ISO formatting: YYYY-MM-DDTHH:MM:00Z (Assuming KST but storing as compatible string)
+            # Ideally convert to UTC for "timestamp with time zone"
+            dt_str = f"{base_date}{base_time}"
+            dt_obj = datetime.strptime(dt_str, "%Y%m%d%H%M")
+            measured_at = dt_obj.isoformat()
+
+        for item in items:
+            category = item.get('category')
+            obs_value = item.get('obsrValue')
             
+            if category == 'T1H': # Temperature
+                temp = float(obs_value)
+            elif category == 'PTY': # Precipitation Type
+                rain_type = int(obs_value)
+            elif category == 'REH': # Humidity
+                humidity = float(obs_value)
+        
+        if measured_at is None:
+             measured_at = datetime.utcnow().isoformat()
+
+        return {
+            "measured_at": measured_at,
+            "temperature": temp,
+            "precipitation_type": rain_type,
+            "humidity": humidity
+        }
+
+    def append_weather_hourly(self, rows):
+        """
+        Appends nowcast rows to 'weather_hourly'. Hours already stored are skipped (insert-only),
+        so the 'weather_daily' roll-up trigger counts every hour exactly once.
+        """
+        if not self.client:
+            print("Supabase client not initialized. Skipping save.")
+            return
+
+        try:
+            self.client.table("weather_hourly").upsert(rows, on_conflict="measured_at", ignore_duplicates=True).execute()
+            print(f"Successfully saved {len(rows)} hourly observations to Supabase (weather_hourly).")
         except Exception as e:
-            print(f"Error parsing or saving weather data to Supabase: {e}")
+            print(f"Error saving hourly weather to Supabase: {e}")
+            if "relation" in str(e) and "does not exist" in str(e):
+                print("⚠️ Table 'weather_hourly' does not exist. Please run the SQL script.")
+
     def fetch_all_subway_data(self):
         """
         Fetches all records from 'subway_traffic' table.
+        Pages through the whole table (no row cap); prefer iter_table_chunks for large reads.
         """
         if not self.client:
             print("Supabase client not initialized.")
             return []
 
         try:
-            # Need to paginate if > 1000 rows. Supabase limit defaults to 1000.
-            # For now, let's try to fetch a reasonably large limit or implement Loop.
-            # OCI free tier might be slow, but let's just fetch 10000 for verified portfolio.
-            response = self.client.table("subway_traffic").select("*").range(0, 9999).execute()
-            data = response.data
+            data = []
+            for chunk in self.iter_table_chunks("subway_traffic"):
+                data.extend(chunk.to_dict(orient="records"))
             return data
         except Exception as e:
             print(f"Error fetching all subway data: {e}")
             return []
+
+    def fetch_latest_date(self, table):
+        """
+        Returns the most recent value of the table's date column (YYYY-MM-DD string), or None.
+        """
+        if not self.client:
+            print("Supabase client not initialized.")
+            return None
+
+        date_col = TABLE_KEYSETS[table][0]
+        try:
+            res = self.client.table(table).select(date_col).order(date_col, desc=True).limit(1).execute()
+            return str(res.data[0][date_col])[:10] if res.data else None
+        except Exception as e:
+            print(f"Error fetching latest date from {table}: {e}")
+            return None
+
+    def fetch_status(self):
+        """
+        Per-table counts, date ranges, gap days and last-ingest timestamps in one round trip
+        (the 'pipeline_status' RPC, see create_status_rpc.sql). Returns None if unavailable.
+        """
+        if not self.client:
+            return None
+        try:
+            return self.client.rpc("pipeline_status").execute().data
+        except Exception as e:
+            print(f"Error fetching pipeline status: {e}")
+            return None
+
+    def fetch_stored_dates(self, table, start_date=None, end_date=None, min_rows=1):
+        """
+        Returns the set of dates (YYYY-MM-DD) in `table` having at least `min_rows` rows
+        (e.g. one per configured station). Only the date column is transferred.
+        """
+        date_col = TABLE_KEYSETS[table][0]
+        counts = {}
+        for chunk in self.iter_table_chunks(table, columns=date_col, start_date=start_date, end_date=end_date):
+            for day, n in chunk[date_col].astype(str).str[:10].value_counts().items():
+                counts[day] = counts.get(day, 0) + n
+        return {day for day, n in counts.items() if n >= min_rows}
+
+    def iter_table_chunks(self, table, columns="*", start_date=None, end_date=None, since=None, page_size=PAGE_SIZE):
+        """
+        Streams a table as DataFrame chunks using keyset pagination.
+        Rows are ordered by the table's keyset (see TABLE_KEYSETS) and each page asks for
+        rows strictly after the last key seen, so deep pages cost the same as the first one
+        (no OFFSET scan) and nothing is silently dropped past a fixed range.
+        Params:
+            start_date / end_date (str): optional YYYY-MM-DD bounds (inclusive), filtered server-side.
+            since (str): optional ISO timestamp; only rows with created_at > since are returned.
+        """
+        if not self.client:
+            print("Supabase client not initialized.")
+            return
+
+        date_col, key_cols = TABLE_KEYSETS[table]
+        if columns != "*":
+            wanted = [c.strip() for c in columns.split(",")]
+            columns = ",".join(wanted + [c for c in key_cols if c not in wanted])
+
+        last_key = None
+        while True:
+            query = self.client.table(table).select(columns)
+            if start_date:
+                query = query.gte(date_col, start_date)
+            if end_date:
+                # '< next day' so timestamp columns (measured_at) include the whole end day
+                next_day = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+                query = query.lt(date_col, next_day)
+            if since:
+                query = query.gt("created_at", since)
+            if last_key is not None:
+                query = self._after_keyset(query, key_cols, last_key)
+            for col in key_cols:
+                query = query.order(col)
+
+            rows = query.limit(page_size).execute().data
+            if not rows:
+                return
+            yield pd.DataFrame(rows)
+            if len(rows) < page_size:
+                return
+            last_key = tuple(rows[-1][col] for col in key_cols)
+
+    @staticmethod
+    def _after_keyset(query, key_cols, last_key):
+        # Single key: key > last. Composite (a, b): a > A OR (a = A AND b > B)
+        if len(key_cols) == 1:
+            return query.gt(key_cols[0], last_key[0])
+        (a, b), (va, vb) = key_cols, last_key
+        return query.or_(f'{a}.gt."{va}",and({a}.eq."{va}",{b}.gt."{vb}")')
+
     def save_model_features(self, df):
         """
         Upserts processed features to 'model_features' table.
@@ -167,3 +402,115 @@ class SupabaseStorage:
                 if "relation" in str(e) and "does not exist" in str(e):
                     print("⚠️ Table 'model_features' does not exist. Please run the SQL script.")
                     return
+
+
+def split_by_bytes(records, max_bytes):
+    """
+    Groups records into consecutive batches whose JSON array payload stays under max_bytes
+    (a single oversized record still gets a batch of its own).
+    """
+    batches, batch, size = [], [], 2  # "[]"
+    for record in records:
+        record_size = len(json.dumps(record, ensure_ascii=False).encode("utf-8")) + 1  # trailing comma
+        if batch and size + record_size > max_bytes:
+            batches.append(batch)
+            batch, size = [], 2
+        batch.append(record)
+        size += record_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class SubwayBatchWriter:
+    """
+    Buffers formatted 'subway_traffic' rows across days and upserts them in large batches.
+    A flush happens when the buffer reaches `batch_size` rows or when the oldest buffered
+    row is older than `flush_interval` seconds, plus a final flush on close().
+    """
+    def __init__(self, storage, batch_size=SUBWAY_BATCH_SIZE, flush_interval=SUBWAY_FLUSH_INTERVAL, on_flush=None):
+        self.storage = storage
+        self.on_flush = on_flush
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.buffer = {}
+        self.first_buffered_at = None
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.batches = 0
+
+    def add(self, data):
+        """
+        Formats and buffers rows. Returns the number of rows flushed by this call (0 if only buffered).
+        """
+        for row in self.storage._format_subway_rows(data):
+            # Key by the conflict target: Postgres rejects an upsert that touches the same row twice.
+            self.buffer[(row["date"], row["station_name"], row["line_number"])] = row
+        if self.buffer and self.first_buffered_at is None:
+            self.first_buffered_at = time.monotonic()
+
+        if len(self.buffer) >= self.batch_size:
+            return self.flush()
+        if self.first_buffered_at is not None and time.monotonic() - self.first_buffered_at >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """
+        Upserts everything currently buffered in chunks of `batch_size`. Returns the number of rows written.
+        """
+        rows = list(self.buffer.values())
+        self.buffer = {}
+        self.first_buffered_at = None
+        if not rows:
+            return 0
+
+        if not self.storage.client:
+            print("Supabase client not initialized. Skipping save.")
+            self.failed_rows += len(rows)
+            return 0
+
+        written_rows, failed_dates = [], set()
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i+self.batch_size]
+            try:
+                self.storage._upsert_subway_rows(batch)
+                written_rows.extend(batch)
+                self.batches += 1
+            except Exception as e:
+                print(f"Error saving subway batch to Supabase: {e}")
+                self.failed_rows += len(batch)
+                failed_dates.update(row["date"] for row in batch)
+
+        written = len(written_rows)
+        self.flushed_rows += written
+        print(f"Successfully saved {written} records to Supabase (subway_traffic).")
+        if self.on_flush and written_rows:
+            # Only report days whose rows were all written (a day may span two batches)
+            self.on_flush([row for row in written_rows if row["date"] not in failed_dates])
+        return written
+
+    def close(self):
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    """
+    Process-wide SupabaseStorage shared by collectors, the pipeline and the Gradio handlers
+    (one lazily created client, one connection pool).
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = SupabaseStorage()
+        return _storage
@@ -0,0 +1,130 @@
+import os
+import asyncio
+from supabase import acreate_client, AsyncClient
+
+from crawler.fake_supabase import FakeSupabaseClient, use_fake_backend
+from crawler.storage_supabase import (
+    TABLE_KEYSETS,
+    UPSERT_BATCH_BYTES,
+    UPSERT_CONCURRENCY,
+    split_by_bytes,
+)
+
+
+class AsyncSupabaseStorage:
+    """
+    Async counterpart of SupabaseStorage for the Gradio handlers: the reads and upserts they
+    await, on an AsyncClient so a slow query yields the event loop instead of holding a worker
+    thread. SupabaseStorage stays the interface for scripts and collectors.
+    """
+    def __init__(self):
+        self.url = os.environ.get("SUPABASE_URL")
+        self.key = os.environ.get("SUPABASE_KEY")
+        self._client: AsyncClient = None
+        self._client_lock = None
+
+    async def get_client(self):
+        """
+        The shared AsyncClient, created on first await (None if unconfigured or unreachable).
+        """
+        if self._client is not None or not (self.url and self.key or use_fake_backend()):
+            return self._client
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self._client is None:
+                try:
+                    if use_fake_backend():
+                        self._client = FakeSupabaseClient(is_async=True)
+                    else:
+                        self._client = await acreate_client(self.url, self.key)
+                except Exception as e:
+                    print(f"Failed to initialize async Supabase client: {e}")
+            return self._client
+
+    # --- Save ---
+    async def upsert_records(self, table, records, on_conflict, max_batch_bytes=UPSERT_BATCH_BYTES, concurrency=UPSERT_CONCURRENCY):
+        """
+        Byte-sized batches upserted with at most `concurrency` requests in flight.
+        Returns (written_rows, failed_rows).
+        """
+        client = await self.get_client()
+        if not client:
+            print("Supabase client not initialized. Skipping save.")
+            return 0, len(records)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def send(batch):
+            async with semaphore:
+                try:
+                    await client.table(table).upsert(batch, on_conflict=on_conflict).execute()
+                    return len(batch), 0
+                except Exception as e:
+                    print(f"❌ Error upserting {len(batch)} rows into {table}: {e}")
+                    return 0, len(batch)
+
+        results = await asyncio.gather(*(send(batch) for batch in split_by_bytes(records, max_batch_bytes)))
+        return sum(ok for ok, _ in results), sum(bad for _, bad in results)
+
+    # --- Fetch ---
+    async def fetch_recent(self, table, limit=5):
+        """
+        Latest `limit` rows of `table` by its date column.
+        """
+        client = await self.get_client()
+        if not client:
+            return None
+        date_col = TABLE_KEYSETS[table][0]
+        res = await client.table(table).select("*").limit(limit).order(date_col, desc=True).execute()
+        return res.data
+
+    async def count_rows(self, table):
+        """
+        Exact row count of `table`.
+        """
+        client = await self.get_client()
+        if not client:
+            return None
+        res = await client.table(table).select("*", count="exact").limit(1).execute()
+        return res.count
+
+    async def health_check(self):
+        """
+        Cheap round trip (one key from 'subway_traffic') proving the async client is usable.
+        """
+        client = await self.get_client()
+        if not client:
+            return False
+        try:
+            await client.table("subway_traffic").select("date").limit(1).execute()
+            return True
+        except Exception as e:
+            print(f"Supabase health check failed: {e}")
+            self._client = None
+            return False
+
+    async def fetch_status(self):
+        """
+        One-call per-table status (the 'pipeline_status' RPC). Returns None if unavailable.
+        """
+        client = await self.get_client()
+        if not client:
+            return None
+        try:
+            return (await client.rpc("pipeline_status").execute()).data
+        except Exception as e:
+            print(f"Error fetching pipeline status: {e}")
+            return None
+
+
+_async_storage = None
+
+def get_async_storage():
+    """
+    Process-wide AsyncSupabaseStorage (the client is created lazily on the serving event loop).
+    """
+    global _async_storage
+    if _async_storage is None:
+        _async_storage = AsyncSupabaseStorage()
+    return _async_storage
@@ -1,8 +1,12 @@
 import os
-import requests
+import sys
 from supabase import create_client
 from dotenv import load_dotenv
 
+# Ensure imports work if run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.http_client import get_transport
+
 load_dotenv()
 
 def verify_seoul_data():
@@ -15,7 +19,7 @@ def verify_seoul_data():
     # Testing with a simple call: Realtime station arrival for 'Seongsu'
     url = f"http://swopenAPI.seoul.go.kr/api/subway/{api_key}/json/realtimeStationArrival/0/1/성수"
     try:
-        response = requests.get(url)
+        response = get_transport().get(url, endpoint="seoul:realtimeStationArrival")
         data = response.json()
         if "available" in data.get("RESULT", {}).get("code", ""): # Check for service unavailable or error codes in result
              print(f"❌ FAILED: API Error - {data}")
@@ -55,7 +59,7 @@ def verify_kma_data():
     }
     
     try:
-        response = requests.get(base_url, params=params)
+        response = get_transport().get(base_url, params=params, endpoint="kma:getUltraSrtNcst")
         # KMA often returns SERVICE_KEY_IS_NOT_REGISTERED_ERROR in XML if failed
         content = response.text
         if "SERVICE_KEY_IS_NOT_REGISTERED_ERROR" in content:
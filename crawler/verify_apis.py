@@ -1,7 +1,7 @@
 import os
-import requests
 from dotenv import load_dotenv
-from .storage_supabase import SupabaseStorage
+from .storage_supabase import get_storage
+from .http_client import get_transport
 
 # Ensure we load .env from the crawler directory
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
@@ -10,14 +10,15 @@ load_dotenv(env_path)
 def verify_supabase_connection():
     print("\n[3] Testing Supabase Connection...")
     try:
-        storage = SupabaseStorage()
+        storage = get_storage()
         if not storage.client:
             print("❌ FAILED: Client init failed.")
             return False
         
-        # Lightweight query to check connection
-        # Checking 'weather_data' existance by selecting 1 row
-        storage.client.table("weather_data").select("count", count="exact").limit(1).execute()
+        # Lightweight query on the shared (warm) client; a failure resets it for the next call
+        if not storage.health_check(force=True):
+            print("❌ FAILED: Supabase health check failed.")
+            return False
         print("✅ SUCCESS: Connected to Supabase.")
         return True
     except Exception as e:
@@ -36,8 +37,8 @@ def verify_seoul_data():
     url = f"http://openapi.seoul.go.kr:8088/{api_key}/json/CardSubwayStatsNew/1/5/20231024"
     
     try:
-        response = requests.get(url)
-        data = response.json()
+        # Not routed through the response cache: a revoked or swapped key must fail right away
+        data = get_transport().get(url, endpoint="seoul:CardSubwayStatsNew").json()
         
         # Check for service codes
         if "CardSubwayStatsNew" in data:
@@ -75,7 +76,7 @@ def verify_kma_data():
     }
     
     try:
-        response = requests.get(base_url, params=params)
+        response = get_transport().get(base_url, params=params, endpoint="kma:getUltraSrtNcst")
         content = response.text
         if "SERVICE_KEY_IS_NOT_REGISTERED_ERROR" in content:
             print("❌ FAILED: Key is not registered or invalid (KMA Error).")
@@ -15,7 +15,7 @@ from guidebook.tabs.level4_automl import create_automl_tab
 from guidebook.tabs.level5_docker import create_docker_tab
 from guidebook.tabs.level6_cicd import create_cicd_tab
 
-# Instantiate Pipeline (Stateful - Shared across tabs)
+# Instantiate Pipeline (shared components; per-visitor Level 2 state lives in pipeline sessions)
 pipeline = DataPipeline()
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'crawler', '.env'))
@@ -1,6 +1,16 @@
 import gradio as gr
 import pandas as pd
 import os
+from crawler.storage_supabase import get_storage
+from crawler.local_mirror import get_mirror
+
+def load_feature_store():
+    """Level 2 Feature Store(model_features)를 로컬 Parquet 미러에서 로드합니다 (증분 동기화)."""
+    try:
+        return get_mirror(get_storage()).read("model_features")
+    except Exception as e:
+        print(f"Local mirror read failed: {e}")
+        return pd.DataFrame()
 
 def load_data():
     """Level 2에서 생성된 피처 데이터를 로드합니다 (Fallback for Demo)."""
@@ -160,9 +170,11 @@ def create_observer_tab():
         data_path = os.path.join(base_dir, "data_features_level2.csv")
         
         # source = "Real Data"
-        df = pd.DataFrame()
+        df = load_feature_store()
         
-        if os.path.exists(data_path):
+        if not df.empty:
+            logs.append(f"- ✅ Loaded **{len(df)} rows** from local mirror (`model_features`)")
+        elif os.path.exists(data_path):
             try:
                 df = pd.read_csv(data_path)
                 logs.append(f"- ✅ Loaded **{len(df)} rows** from `{data_path}`")
@@ -370,8 +382,10 @@ def create_observer_tab():
         base_dir = "/home/ubuntu/workspace/daily_seongsu"
         data_path = os.path.join(base_dir, "data_features_level2.csv")
         
-        df = pd.DataFrame()
-        if os.path.exists(data_path):
+        df = load_feature_store()
+        if not df.empty:
+            logs.append(f"- ✅ Loaded {len(df)} rows from local mirror")
+        elif os.path.exists(data_path):
             try:
                 df = pd.read_csv(data_path)
                 logs.append(f"- ✅ Loaded {len(df)} rows")
@@ -1,35 +1,62 @@
+import asyncio
 import gradio as gr
 import pandas as pd
 import os
-from crawler.verify_apis import verify_seoul_data, verify_kma_data, verify_supabase_connection
-from crawler.storage_supabase import SupabaseStorage
+from crawler.verify_apis import verify_seoul_data, verify_kma_data
+from crawler.storage_supabase_async import get_async_storage
 from crawler.backfill_subway import run_subway_backfill
 from crawler.backfill_weather import run_weather_backfill
-from crawler.check_status import check_readiness_stats, get_data_preview
+from crawler.check_status import acheck_readiness_stats, get_data_preview
+from crawler.http_cache import get_response_cache
+from crawler.step_cache import get_step_cache
+from crawler.http_client import get_transport
 
 # --- HELPER FUNCTIONS ---
-def check_apis():
-    res_seoul = verify_seoul_data()
-    res_kma = verify_kma_data()
-    res_supa = verify_supabase_connection()
+async def check_apis():
+    # External API checks are blocking; run them side by side off the event loop
+    res_seoul, res_kma, res_supa = await asyncio.gather(
+        asyncio.to_thread(verify_seoul_data),
+        asyncio.to_thread(verify_kma_data),
+        get_async_storage().health_check(),
+    )
     
     status = f"SEOUL: {'✅' if res_seoul else '❌'}\n"
     status += f"KMA: {'✅' if res_kma else '❌'}\n"
     status += f"SUPABASE: {'✅' if res_supa else '❌'}"
     return status
 
-def fetch_db_data():
+def get_cache_stats():
+    stats = get_response_cache().stats()
+    status = f"HITS: {stats['hits']} / MISSES: {stats['misses']} ({stats['hit_rate']:.0%} hit rate)\n"
+    status += f"STORED: {stats['stores']} / EVICTED: {stats['evictions']}\n"
+    status += f"SIZE: {stats['size_mb']:.1f} MB / {stats['max_mb']:.0f} MB"
+    for endpoint, lat in get_transport().latency_stats().items():
+        status += f"\n{endpoint}: {lat['requests']} req, avg {lat['avg_ms']:.0f} ms, p95 ≤ {lat['p95_ms']:g} ms, {lat['retries']} retries, {lat['errors']} errors"
+    return status
+
+def get_step_cache_stats(pipeline):
+    stats = get_step_cache().stats()
+    status = f"HITS: {stats['hits']} / MISSES: {stats['misses']} ({stats['hit_rate']:.0%} hit rate)\n"
+    status += f"STORED: {stats['stores']} / EVICTED: {stats['evictions']}\n"
+    status += f"SIZE: {stats['size_mb']:.1f} MB / {stats['max_mb']:.0f} MB\n"
+    frames = pipeline.frames.stats()
+    status += f"IN MEMORY: {frames['frames']} frames, {frames['size_mb']:.1f} MB / {frames['max_mb']:.0f} MB across {len(pipeline.sessions)} sessions"
+    return status
+
+async def fetch_db_data():
     try:
-        storage = SupabaseStorage()
-        if not storage.client: 
+        storage = get_async_storage()
+        if not await storage.get_client():
             err = pd.DataFrame({"Error": ["Supabase not connected"]})
             return err, err
 
-        res_sub = storage.client.table("subway_traffic").select("*").limit(5).order("date", desc=True).execute()
-        res_wea = storage.client.table("weather_data").select("*").limit(5).order("measured_at", desc=True).execute()
+        res_sub, res_wea = await asyncio.gather(
+            storage.fetch_recent("subway_traffic", limit=5),
+            storage.fetch_recent("weather_data", limit=5),
+        )
         
-        return (pd.DataFrame(res_sub.data) if res_sub.data else pd.DataFrame({"Status": ["No Data"]})), \
-               (pd.DataFrame(res_wea.data) if res_wea.data else pd.DataFrame({"Status": ["No Data"]}))
+        return (pd.DataFrame(res_sub) if res_sub else pd.DataFrame({"Status": ["No Data"]})), \
+               (pd.DataFrame(res_wea) if res_wea else pd.DataFrame({"Status": ["No Data"]}))
     except Exception as e:
         err_df = pd.DataFrame({"Error": [str(e)]})
         return err_df, err_df
@@ -46,9 +73,9 @@ def trigger_weather(start, end):
         logs += chunk
         yield logs
 
-def check_readiness_and_preview():
-    status = check_readiness_stats()
-    df = get_data_preview()
+async def check_readiness_and_preview():
+    # The preview reads the local mirror (disk); keep it off the event loop
+    status, df = await asyncio.gather(acheck_readiness_stats(), asyncio.to_thread(get_data_preview))
     return status, df
 
 def read_code(filename):
@@ -85,7 +112,8 @@ graph LR
     User[User Click] --> Check{Inputs Valid?}
     Check -->|Yes| Trigger[trigger_backfill]
     Trigger --> Gen[Generator Loop]
-    Gen --> Fetch[SeoulSubwayCollector<br>.fetch_daily_passenger_count]
+    Gen --> FanOut["Async Fan-out<br>(Semaphore + Rate Limiter)"]
+    FanOut --> Fetch[SeoulSubwayCollector<br>.fetch_daily_passenger_count]
     Gen --> Save[SupabaseStorage<br>.save_subway_data]
     Save --> Yield[Subway Log]
 </div>"""
@@ -95,8 +123,10 @@ graph LR
     User[User Click] --> Call[check_readiness_and_preview]
     Call --> Stats[check_readiness_stats]
     Call --> Preview[get_data_preview]
-    Stats --> Count["Supabase...select(count)"]
-    Preview --> Fetch["Supabase...select(limit)"]
+    Stats --> Cache{"TTL Cache"}
+    Cache -->|miss| Count["rpc('pipeline_status')<br>or Local Mirror"]
+    Cache -->|hit| UI1
+    Preview --> Fetch["Local Mirror...read"]
     Count --> UI1[Status Textbox]
     Fetch --> UI2[Dataframe]
 </div>"""
@@ -131,6 +161,10 @@ def create_level1_controls(pipeline):
     btn_check = gr.Button("▶ Run Verification", size="lg", variant="secondary")
     out_status = gr.Textbox(label="Result", lines=3)
     btn_check.click(check_apis, [], out_status)
+
+    btn_cache = gr.Button("📦 HTTP Cache & Latency Stats", size="sm", variant="secondary")
+    out_cache = gr.Textbox(label="Cache (historical API responses) & Per-Endpoint Latency", lines=5)
+    btn_cache.click(get_cache_stats, [], out_cache)
     
     gr.HTML('<hr style="border: none; border-top: 1px solid #4b5563; margin: 48px 0;">')
 
@@ -195,6 +229,16 @@ def create_level1_controls(pipeline):
 def create_level2_controls(pipeline):
     """Level 2: Preprocessing & Feature Engineering"""
     
+    # Each browser session steps through Level 2 with its own PipelineSession
+    def merge(request: gr.Request):
+        return pipeline.step_7_merge(session=pipeline.session(request.session_hash))
+
+    def features(incremental, request: gr.Request):
+        return pipeline.step_8_features(incremental, session=pipeline.session(request.session_hash))
+
+    def store(request: gr.Request):
+        return pipeline.step_9_store(session=pipeline.session(request.session_hash))
+    
     gr.Markdown("""
     > **Goal**: Transform raw data into ML-ready features (Calendar, Lags, Rolling Averages).
     
@@ -225,20 +269,24 @@ def create_level2_controls(pipeline):
         gr.Code(read_code("crawler/pipeline.py"), language="python", lines=15)
     btn_merge = gr.Button("▶ Merge Datasets", size="lg", variant="secondary")
     with gr.Row():
-        out_merge_status = gr.Textbox(label="Merge Status", lines=2)
+        out_merge_status = gr.Textbox(label="Merge Status", lines=3)
         out_merge_df = gr.Dataframe(label="Merged Data Preview", max_height=200)
-    btn_merge.click(pipeline.step_7_merge, [], [out_merge_status, out_merge_df])
+    btn_merge.click(merge, [], [out_merge_status, out_merge_df])
     
     gr.HTML('<hr style="border: none; border-top: 1px solid #4b5563; margin: 48px 0;">')
 
     # L2-S3
     gr.Markdown("### L2-S3: Feature Generation (Lag & Rolling)")
     gr.Markdown("Create time-series features: `lag_1d`, `lag_7d`, `rolling_7d_mean`, etc.")
+    chk_incremental = gr.Checkbox(label="Incremental (only dates after the latest stored feature)", value=True)
     btn_feat = gr.Button("▶ Generate Features", size="lg", variant="secondary")
     with gr.Row():
         out_feat_status = gr.Textbox(label="Feature Stats", lines=2)
         out_feat_df = gr.Dataframe(label="Feature Preview", max_height=200)
-    btn_feat.click(pipeline.step_8_features, [], [out_feat_status, out_feat_df])
+    btn_feat.click(features, [chk_incremental], [out_feat_status, out_feat_df])
+    btn_step_cache = gr.Button("📦 Step Cache Stats", size="sm", variant="secondary")
+    out_step_cache = gr.Textbox(label="Step Cache (merged & feature artifacts: LRU on disk, shared frames in memory)", lines=4)
+    btn_step_cache.click(lambda: get_step_cache_stats(pipeline), [], out_step_cache)
     
     gr.HTML('<hr style="border: none; border-top: 1px solid #4b5563; margin: 48px 0;">')
 
@@ -247,7 +295,7 @@ def create_level2_controls(pipeline):
     gr.Markdown("Upload processed features to Supabase `model_features` table for ML training.")
     btn_store = gr.Button("▶ Upload to Feature Store", size="lg", variant="secondary")
     out_store = gr.Textbox(label="Upload Log", lines=4)
-    btn_store.click(pipeline.step_9_store, [], out_store)
+    btn_store.click(store, [], out_store)
     
     gr.HTML('<hr style="border: none; border-top: 1px solid #4b5563; margin: 48px 0;">')
 
@@ -258,7 +306,7 @@ def create_level2_controls(pipeline):
     with gr.Row():
         out_verify_msg = gr.Textbox(label="Verification Report", lines=3)
         out_verify_df = gr.Dataframe(label="Live DB Preview")
-    btn_verify_final.click(pipeline.step_10_verify, [], [out_verify_msg, out_verify_df])
+    btn_verify_final.click(pipeline.astep_10_verify, [], [out_verify_msg, out_verify_df])
 
 
 # ==============================================
@@ -0,0 +1,63 @@
+"""
+Tests for the aggregated, TTL-cached readiness status.
+"""
+from crawler import check_status
+
+
+class FakeStorage:
+    client = object()
+
+    def __init__(self):
+        self.calls = 0
+
+    def fetch_status(self):
+        self.calls += 1
+        return {
+            "subway_traffic": {"rows": 400, "min_date": "2024-01-01", "max_date": "2024-12-31",
+                               "days": 364, "gap_days": 2, "last_ingest": "2025-01-04T00:00:00+00:00"},
+            "weather_data": {"rows": 366, "min_date": "2024-01-01", "max_date": "2024-12-31",
+                             "days": 366, "gap_days": 0, "last_ingest": None},
+        }
+
+
+class TestReadinessStatus:
+    """Test one aggregated query per TTL window."""
+
+    def test_summary_is_cached_within_ttl(self, monkeypatch):
+        """Repeated clicks inside the TTL reuse the cached summary."""
+        storage = FakeStorage()
+        monkeypatch.setattr(check_status, "get_storage", lambda: storage)
+        monkeypatch.setattr(check_status, "_status_cache", {})
+
+        message = check_status.check_readiness_stats()
+        check_status.check_readiness_stats()
+        assert storage.calls == 1
+        assert "Gap Days: Subway 2, Weather 0" in message
+        assert "READY FOR LEVEL 2" in message
+
+        check_status.get_status_summary(force=True)
+        assert storage.calls == 2
+
+    def test_async_viewers_share_one_refresh(self, monkeypatch):
+        """Concurrent async callers after the TTL expires trigger a single RPC."""
+        import asyncio
+
+        sync_storage = FakeStorage()
+
+        class FakeAsyncStorage:
+            calls = 0
+
+            async def fetch_status(self):
+                FakeAsyncStorage.calls += 1
+                await asyncio.sleep(0.05)
+                return sync_storage.fetch_status()
+
+        monkeypatch.setattr(check_status, "get_async_storage", FakeAsyncStorage)
+        monkeypatch.setattr(check_status, "_status_cache", {})
+
+        async def viewers():
+            return await asyncio.gather(*(check_status.aget_status_summary() for _ in range(5)))
+
+        summaries = asyncio.run(viewers())
+        assert FakeAsyncStorage.calls == 1
+        assert all(s["subway_traffic"]["rows"] == 400 for s in summaries)
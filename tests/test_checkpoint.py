@@ -0,0 +1,25 @@
+"""
+Tests for crawler.checkpoint (resumable backfill bookkeeping).
+"""
+from crawler.checkpoint import BackfillCheckpoint, missing_dates, to_ranges
+
+
+class TestBackfillCheckpoint:
+    """Test checkpoint persistence and date set arithmetic."""
+
+    def test_marks_survive_reload(self, tmp_path):
+        """Completed dates are persisted and normalized to YYYYMMDD."""
+        BackfillCheckpoint("subway", root=str(tmp_path)).mark(["2024-01-01", "20240102"])
+        assert BackfillCheckpoint("subway", root=str(tmp_path)).completed() == {"20240101", "20240102"}
+
+    def test_missing_dates_preserves_order(self):
+        """Set difference against stored and checkpointed dates keeps the schedule order."""
+        dates = ["20240101", "20240102", "20240103", "20240104"]
+        assert missing_dates(dates, {"20240102"}, {"20240104"}) == ["20240101", "20240103"]
+
+    def test_to_ranges_groups_contiguous_days(self):
+        """Missing days collapse into contiguous fetch ranges."""
+        assert to_ranges(["20240105", "20240101", "20240102", "20240103"]) == [
+            ("20240101", "20240103"),
+            ("20240105", "20240105"),
+        ]
@@ -0,0 +1,61 @@
+"""
+Tests for the SQLite-backed PostgREST stand-in (SUPABASE_BACKEND=sqlite).
+"""
+import asyncio
+
+import pytest
+
+from crawler.fake_supabase import FakeAPIError, FakeSupabaseClient
+from crawler.storage_supabase import SupabaseStorage
+
+
+def _subway_row(day, station="성수", boarding=100):
+    return {"USE_DT": f"202401{day:02d}", "LINE_NUM": "2호선", "SUB_STA_NM": station,
+            "RIDE_PASGR_NUM": boarding, "ALIGHT_PASGR_NUM": boarding}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SupabaseStorage()
+    storage._client = FakeSupabaseClient(path=str(tmp_path / "fake.sqlite3"))
+    return storage
+
+
+class TestFakeSupabase:
+    """Test the PostgREST subset SupabaseStorage relies on."""
+
+    def test_upsert_on_conflict_is_idempotent(self, storage):
+        """Re-saving the same days updates rows instead of duplicating them."""
+        storage.save_subway_data([_subway_row(d) for d in range(1, 4)])
+        storage.save_subway_data([_subway_row(1, boarding=999)])
+
+        res = storage.client.table("subway_traffic").select("*", count="exact").order("date").limit(1).execute()
+        assert res.count == 3
+        assert res.data[0]["boarding_count"] == 999
+
+    def test_keyset_pagination_returns_every_row(self, storage):
+        """iter_table_chunks walks composite (date, id) keys with or_ filters."""
+        storage.save_subway_data([_subway_row(d, station=s) for d in range(1, 11) for s in ("성수", "뚝섬", "서울숲")])
+
+        chunks = list(storage.iter_table_chunks("subway_traffic", columns="date", page_size=4))
+        assert sum(len(c) for c in chunks) == 30
+        assert storage.fetch_stored_dates("subway_traffic", "2024-01-03", "2024-01-05", min_rows=3) == {
+            "2024-01-03", "2024-01-04", "2024-01-05",
+        }
+
+    def test_status_rpc_and_errors(self, storage):
+        """pipeline_status aggregates per table; unknown columns fail like PostgREST."""
+        storage.save_subway_data([_subway_row(d) for d in (1, 2, 5)])
+        status = storage.fetch_status()
+        assert status["subway_traffic"]["rows"] == 3
+        assert status["subway_traffic"]["gap_days"] == 2
+        assert status["weather_data"]["rows"] == 0
+        with pytest.raises(FakeAPIError):
+            storage.client.table("subway_traffic").select("nope").execute()
+
+    def test_async_mode(self, tmp_path):
+        """With is_async=True execute() is awaitable (AsyncClient-compatible)."""
+        client = FakeSupabaseClient(path=str(tmp_path / "fake.sqlite3"), is_async=True)
+        asyncio.run(client.table("model_features").upsert([{"date": "2024-01-01", "total_traffic": 1}], on_conflict="date").execute())
+        res = asyncio.run(client.table("model_features").select("date").execute())
+        assert res.data == [{"date": "2024-01-01"}]
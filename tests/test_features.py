@@ -0,0 +1,97 @@
+"""
+Tests for crawler.features (calendar and lag feature generation).
+
+These run fully offline: no API keys or Supabase connection needed.
+"""
+import pandas as pd
+
+from crawler.features import FeatureEngineer, build_calendar_table
+
+
+class TestCalendarFeatures:
+    """Test vectorized calendar feature generation."""
+
+    def test_weekend_and_holiday_flags(self):
+        """Known weekends and Korean holidays should be flagged."""
+        df = pd.DataFrame({"date": ["2024-01-01", "2024-01-02", "2024-01-06", "2023-12-25", "2023-05-05"]})
+        out = FeatureEngineer().add_calendar_features(df)
+
+        assert out["is_holiday"].tolist() == [1, 0, 0, 1, 1]
+        assert out["is_weekend"].tolist() == [0, 0, 1, 0, 0]
+        assert out["day_of_week"].tolist() == [0, 1, 5, 0, 4]
+
+    def test_matches_holidays_library(self):
+        """Vectorized flags should agree with a per-row holidays.KR() lookup."""
+        import holidays
+        kr = holidays.KR()
+        dates = pd.date_range("2022-01-01", "2024-12-31")
+        out = FeatureEngineer().add_calendar_features(pd.DataFrame({"date": dates}))
+
+        expected = [1 if d in kr else 0 for d in dates]
+        assert out["is_holiday"].tolist() == expected
+
+    def test_unsorted_input_keeps_row_order(self):
+        """Features must line up with the original (unsorted) rows."""
+        df = pd.DataFrame({"date": ["2024-03-01", "2022-01-01", "2023-06-15"]})
+        out = FeatureEngineer().add_calendar_features(df)
+
+        assert out["year"].tolist() == [2024, 2022, 2023]
+        assert out["month"].tolist() == [3, 1, 6]
+
+    def test_calendar_table_is_memoized(self):
+        """Repeat calls for the same range should reuse the cached table."""
+        start, end = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-31")
+        assert build_calendar_table(start, end) is build_calendar_table(start, end)
+
+
+class TestLagFeatures:
+    """Test gap-aware, date-indexed lag features."""
+
+    def _frame(self, dates):
+        dates = pd.to_datetime(dates)
+        return pd.DataFrame({"date": dates, "total_traffic": range(len(dates))})
+
+    def test_contiguous_lags_match_shift(self):
+        """Without gaps, date-offset lags equal positional shifts."""
+        df = self._frame(pd.date_range("2024-01-01", periods=30))
+        out = FeatureEngineer().add_lag_features(df)
+
+        pd.testing.assert_series_equal(out["lag_1d"], df["total_traffic"].shift(1).astype(float), check_names=False)
+        pd.testing.assert_series_equal(out["lag_7d"], df["total_traffic"].shift(7).astype(float), check_names=False)
+
+    def test_missing_day_does_not_misalign_lags(self):
+        """A missing day must produce NaN lags and a gap flag, not the previous row's value."""
+        dates = pd.date_range("2024-01-01", periods=20).delete(10)  # drop 2024-01-11
+        df = self._frame(dates)
+        out = FeatureEngineer().add_lag_features(df).set_index("date")
+
+        # 2024-01-12's lag_1d points at the missing 2024-01-11
+        assert pd.isna(out.loc["2024-01-12", "lag_1d"])
+        assert out.loc["2024-01-12", "lag_1d_is_gap"] == 1
+        # 2024-01-13's lag_1d is 2024-01-12's value
+        assert out.loc["2024-01-13", "lag_1d"] == out.loc["2024-01-12", "total_traffic"]
+        # 2024-01-18's lag_7d points at the missing day
+        assert pd.isna(out.loc["2024-01-18", "lag_7d"])
+        # Rolling windows that include the gap are NaN
+        assert pd.isna(out.loc["2024-01-15", "rolling_7d_avg"])
+
+    def test_find_gaps(self):
+        """find_gaps should list the missing calendar days."""
+        dates = pd.Series(pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-05"]))
+        gaps = FeatureEngineer.find_gaps(dates)
+        assert [d.strftime("%Y-%m-%d") for d in gaps] == ["2024-01-03", "2024-01-04"]
+
+    def test_grouped_lags_stay_within_station(self):
+        """Per-station lags must never read another station's values."""
+        dates = pd.date_range("2024-01-01", periods=10)
+        df = pd.concat([
+            pd.DataFrame({"date": dates, "station_name": "성수", "total_traffic": range(10)}),
+            pd.DataFrame({"date": dates[2:], "station_name": "뚝섬", "total_traffic": range(100, 108)}),
+        ], ignore_index=True).sample(frac=1, random_state=0)
+        out = FeatureEngineer().add_lag_features(df, group_cols=["station_name"]).set_index(["station_name", "date"])
+
+        assert out.loc[("성수", pd.Timestamp("2024-01-05")), "lag_1d"] == 3
+        assert out.loc[("뚝섬", pd.Timestamp("2024-01-05")), "lag_1d"] == 101
+        # 뚝섬 starts on 2024-01-03: its first lag_1d is a gap, not 성수's value
+        assert pd.isna(out.loc[("뚝섬", pd.Timestamp("2024-01-03")), "lag_1d"])
+        assert out.loc[("뚝섬", pd.Timestamp("2024-01-03")), "lag_1d_is_gap"] == 1
@@ -0,0 +1,77 @@
+"""
+Tests for the local API fixture server (synthetic Seoul / KMA / Open-Meteo responses).
+"""
+import pytest
+import requests
+
+from crawler import backfill_weather, scraper
+from crawler.fixture_server import FixtureConfig, start_fixture_server
+from crawler.http_cache import ResponseCache
+from crawler.nowcast import parse_nowcast
+
+
+@pytest.fixture
+def isolated_cache(tmp_path, monkeypatch):
+    cache = ResponseCache(root=str(tmp_path / "http_cache"))
+    monkeypatch.setattr(scraper, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(backfill_weather, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(scraper, "_day_cache", scraper.OrderedDict())
+    return cache
+
+
+class TestFixtureServer:
+    """Test the collectors end-to-end against the fixture server."""
+
+    def test_seoul_day_is_paginated(self, isolated_cache):
+        """A day larger than one page is fetched in two requests and filtered to the stations."""
+        server, url = start_fixture_server(FixtureConfig(seoul_rows=1500))
+        try:
+            collector = scraper.SeoulSubwayCollector(stations=[("성수", "2호선")])
+            collector.base_url, collector.api_key = url, "fixture"
+            rows = collector.fetch_daily_passenger_count("20240105")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert [(r["SUB_STA_NM"], r["USE_DT"]) for r in rows] == [("성수", "20240105")]
+        assert server.state.stats["seoul"]["served"] == 2
+
+    def test_open_meteo_and_kma_shapes(self, isolated_cache):
+        """Synthetic archive and nowcast responses parse like the real ones."""
+        server, url = start_fixture_server()
+        try:
+            collector = backfill_weather.OpenMeteoCollector()
+            collector.base_url = url + "/v1/archive"
+            df = collector.fetch_history("2023-12-01", "2024-01-31")
+            kma = requests.get(url + "/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst",
+                               params={"base_date": "20240105", "base_time": "0900", "nx": 61, "ny": 126}).json()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert len(df) == 62
+        assert df["precipitation_type"].isin([0, 1, 3]).all()
+        assert parse_nowcast(kma)["measured_at"] == "2024-01-05T09:00:00+09:00"
+
+    def test_rate_limit_and_errors(self):
+        """Requests over the per-second limit get 429 + Retry-After; injected errors are 503."""
+        now = [100.0]  # Frozen clock: the window only moves when the test advances it
+        server, url = start_fixture_server(FixtureConfig(rate_limit=1), clock=lambda: now[0])
+        params = {"start_date": "2024-01-01", "end_date": "2024-01-01"}
+        try:
+            statuses = [requests.get(url + "/v1/archive", params=params) for _ in range(2)]
+            now[0] += 1.0
+            statuses.append(requests.get(url + "/v1/archive", params=params))
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert statuses[0].status_code == 200
+        assert statuses[1].status_code == 429 and statuses[1].headers["Retry-After"] == "1"
+        assert statuses[2].status_code == 200
+
+        server, url = start_fixture_server(FixtureConfig(error_rate=1.0))
+        try:
+            assert requests.get(url + "/v1/archive", params={"start_date": "2024-01-01", "end_date": "2024-01-01"}).status_code == 503
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,92 @@
+"""
+Tests for crawler.http_cache (on-disk API response cache).
+"""
+from crawler import verify_apis
+from crawler.http_cache import ResponseCache, ttl_for_date
+
+
+class TestResponseCache:
+    """Test cache keys, TTL rules and LRU eviction."""
+
+    def test_key_ignores_api_key(self):
+        """Keys must not depend on the API key (path segment or param)."""
+        k1 = ResponseCache.make_key("http://api/KEY_A/json/CardSubwayStatsNew/1/5/20231024", secrets=["KEY_A"])
+        k2 = ResponseCache.make_key("http://api/KEY_B/json/CardSubwayStatsNew/1/5/20231024", secrets=["KEY_B"])
+        assert k1 == k2
+        assert ResponseCache.make_key("u", {"a": 1, "serviceKey": "x"}) == ResponseCache.make_key("u", {"a": 1})
+
+    def test_hit_after_store(self, tmp_path):
+        """Second lookup should be served from disk without calling fetch."""
+        cache = ResponseCache(root=str(tmp_path))
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {"row": [1, 2]}
+
+        assert cache.get_or_fetch("u", fetch) == {"row": [1, 2]}
+        assert cache.get_or_fetch("u", fetch) == {"row": [1, 2]}
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_expired_entry_is_refetched(self, tmp_path):
+        """Entries past their TTL count as misses."""
+        cache = ResponseCache(root=str(tmp_path))
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {"v": 1}
+
+        cache.get_or_fetch("u", fetch, ttl=-1)
+        cache.get_or_fetch("u", fetch)
+        assert len(calls) == 2
+
+    def test_lru_eviction_keeps_size_bounded(self, tmp_path):
+        """Least recently used entries are evicted once over budget."""
+        cache = ResponseCache(root=str(tmp_path), max_bytes=3000)
+        for i in range(10):
+            cache.get_or_fetch(f"u{i}", lambda: {"v": "x" * 500})
+
+        stats = cache.stats()
+        assert stats["evictions"] > 0
+        assert stats["size_mb"] * 1024 * 1024 <= 3000
+
+    def test_overwrite_keeps_size_exact(self, tmp_path):
+        """Re-storing a key replaces its size in the running total instead of adding to it."""
+        cache = ResponseCache(root=str(tmp_path))
+        cache.set("ab" * 32, {"v": "x" * 500})
+        cache.set("ab" * 32, {"v": "x" * 500})
+        assert cache.stats()["size_mb"] * 1024 * 1024 == cache._scan_size()
+
+    def test_historical_dates_are_immutable(self):
+        """Old dates never expire; recent ones get a TTL."""
+        assert ttl_for_date("20220101", lag_days=4) is None
+        assert ttl_for_date("2999-01-01", lag_days=4) is not None
+
+
+class TestVerificationProbes:
+    """Test that key verification always reaches the API."""
+
+    def test_revoked_seoul_key_fails_immediately(self, monkeypatch):
+        """A key revoked after a successful check is reported on the next check."""
+        bodies = [
+            {"CardSubwayStatsNew": {"row": []}},
+            {"RESULT": {"code": "INFO-100", "message": "인증키가 유효하지 않습니다."}},
+        ]
+
+        class Response:
+            def __init__(self, body):
+                self.body = body
+
+            def json(self):
+                return self.body
+
+        class Transport:
+            def get(self, url, endpoint=None, **_):
+                return Response(bodies.pop(0))
+
+        monkeypatch.setenv("SEOUL_DATA_API_KEY", "KEY_A")
+        monkeypatch.setattr(verify_apis, "get_transport", Transport)
+        assert verify_apis.verify_seoul_data() is True
+        assert verify_apis.verify_seoul_data() is False
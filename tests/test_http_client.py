@@ -0,0 +1,40 @@
+"""
+Tests for crawler.http_client (shared pooled transport) against a local stub server.
+"""
+import requests
+
+from crawler.bench_transport import start_stub_server
+from crawler.http_client import HttpTransport
+
+
+class TestHttpTransport:
+    """Test retries, quota handling and latency histograms."""
+
+    def test_retries_transient_errors(self):
+        """503 responses are retried until a 200 comes back."""
+        server, url = start_stub_server(latency_ms=0, error_rate=0.5)
+        try:
+            transport = HttpTransport(backoff_base=0.001)
+            statuses = [transport.get(url, endpoint="stub").status_code for _ in range(6)]
+        finally:
+            server.shutdown()
+
+        assert statuses == [200] * 6
+        assert transport.latency_stats()["stub"]["retries"] > 0
+
+    def test_quota_errors_are_not_retried(self):
+        """Daily quota errors return immediately instead of burning more quota."""
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"<returnAuthMsg>LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR</returnAuthMsg>"
+        assert HttpTransport._should_retry(response) is False
+
+        response._content = b'{"RESULT": {"CODE": "ERROR-500"}}'
+        assert HttpTransport._should_retry(response) is True
+
+    def test_backoff_honours_retry_after(self):
+        """Retry-After overrides the jittered delay (capped)."""
+        transport = HttpTransport(backoff_base=1, backoff_cap=5)
+        assert transport.backoff_delay(0, retry_after="2") == 2
+        assert transport.backoff_delay(0, retry_after="60") == 5
+        assert 0 <= transport.backoff_delay(3) <= 5
@@ -0,0 +1,56 @@
+"""
+Tests for the hourly KMA nowcast collector (base_time and backfill window).
+"""
+from datetime import datetime
+
+import pandas as pd
+
+from crawler.nowcast import NowcastCollector, expected_hours, parse_nowcast
+from crawler.scraper import KST, nowcast_base_time
+
+
+class TestNowcastBaseTime:
+    """Test base_date/base_time selection around the publish minute and midnight."""
+
+    def test_uses_current_hour_after_publish(self):
+        """After HH:40 the HH00 observation is available."""
+        assert nowcast_base_time(datetime(2024, 3, 5, 14, 45, tzinfo=KST)) == ("20240305", "1400")
+
+    def test_rolls_back_date_before_first_publish(self):
+        """At 00:10 the latest observation is 23:00 of the previous day."""
+        assert nowcast_base_time(datetime(2024, 3, 1, 0, 10, tzinfo=KST)) == ("20240229", "2300")
+
+    def test_expected_hours_cover_window(self):
+        """The backfill window ends at the latest published hour."""
+        hours = expected_hours(datetime(2024, 3, 1, 0, 10, tzinfo=KST), hours=3)
+        assert [h.strftime("%Y%m%d%H") for h in hours] == ["2024022921", "2024022922", "2024022923"]
+
+
+class TestNowcastCollector:
+    """Test parsing and gap detection."""
+
+    def test_parse_nowcast(self):
+        """Categories map to weather_hourly columns with a KST timestamp."""
+        data = {"response": {"body": {"items": {"item": [
+            {"baseDate": "20240301", "baseTime": "0900", "category": "T1H", "obsrValue": "3.5"},
+            {"baseDate": "20240301", "baseTime": "0900", "category": "PTY", "obsrValue": "1"},
+            {"baseDate": "20240301", "baseTime": "0900", "category": "VEC", "obsrValue": "200"},
+        ]}}}}
+        assert parse_nowcast(data) == {
+            "measured_at": "2024-03-01T09:00:00+09:00",
+            "temperature": 3.5,
+            "precipitation_type": 1,
+        }
+
+    def test_missing_hours_skips_stored(self):
+        """Only hours absent from weather_hourly are fetched again."""
+        class FakeStorage:
+            client = object()
+            def iter_table_chunks(self, table, columns, start_date):
+                yield pd.DataFrame({"measured_at": ["2024-02-29T13:00:00+00:00"]})  # 22:00 KST
+
+        collector = NowcastCollector.__new__(NowcastCollector)
+        collector.storage = FakeStorage()
+        missing = collector.missing_hours(datetime(2024, 3, 1, 0, 10, tzinfo=KST))
+        assert len(missing) == 23
+        assert datetime(2024, 2, 29, 22, tzinfo=KST) not in missing
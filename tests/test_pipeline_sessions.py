@@ -0,0 +1,54 @@
+"""
+Tests for crawler.pipeline_sessions (per-visitor Level 2 state).
+"""
+import time
+import pandas as pd
+
+from crawler.pipeline_sessions import FrameCache, SessionRegistry
+from crawler.step_cache import StepCache
+
+
+class TestSessionRegistry:
+    """Test session isolation and idle / count eviction."""
+
+    def test_sessions_are_isolated(self):
+        """Each session id gets its own handles; the same id returns the same session."""
+        registry = SessionRegistry()
+        a, b = registry.get("a"), registry.get("b")
+        a.merged_key = "k1"
+        assert b.merged_key is None
+        assert registry.get("a") is a
+
+    def test_idle_sessions_are_evicted(self):
+        """Sessions idle past the TTL are dropped on the next access."""
+        registry = SessionRegistry(idle_ttl=60)
+        registry.get("old").last_used = time.monotonic() - 120
+        registry.get("new")
+        assert len(registry) == 1
+        assert registry.get("old").merged_key is None
+
+    def test_session_count_is_capped(self):
+        """Least recently used sessions beyond max_sessions are dropped."""
+        registry = SessionRegistry(max_sessions=2)
+        for sid in ("a", "b", "a", "c"):
+            registry.get(sid)
+        assert len(registry) == 2
+        assert registry.evictions == 1
+
+
+class TestFrameCache:
+    """Test the in-memory budget and reloads from the step cache."""
+
+    def test_budget_evicts_and_reloads_from_disk(self, tmp_path):
+        """Frames over the budget leave memory but are reloaded from their artifacts."""
+        step_cache = StepCache(root=str(tmp_path))
+        df = pd.DataFrame({"v": range(10_000)})
+        frames = FrameCache(step_cache, max_bytes=int(df.memory_usage(deep=True).sum() * 1.5))
+        for key in ("aa" * 32, "bb" * 32):
+            step_cache.set(key, df, step="s")
+            frames.put(key, df)
+
+        assert frames.stats()["frames"] == 1
+        pd.testing.assert_frame_equal(frames.get("aa" * 32), df)
+        assert frames.get("cc" * 32) is None
+        assert frames.get(None) is None
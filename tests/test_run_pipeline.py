@@ -0,0 +1,109 @@
+"""
+Tests for crawler.run_pipeline (headless DAG runner).
+"""
+import threading
+from types import SimpleNamespace
+
+from crawler import run_pipeline
+from crawler.pipeline_sessions import PipelineSession
+from crawler.run_pipeline import DagRunner, Node
+
+
+def make_runner(tmp_path, nodes):
+    return DagRunner(nodes, state_path=str(tmp_path / "state.json"), workers=4, log=lambda msg: None)
+
+
+class TestDagRunner:
+    """Test ordering, parallelism, skipping and failure handling."""
+
+    def test_independent_nodes_run_in_parallel(self, tmp_path):
+        """Both collectors must be in flight at the same time before merge runs."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def collect(inputs):
+            barrier.wait()  # times out unless the other collector is running concurrently
+            return "ok"
+
+        merged = []
+        nodes = [
+            Node("subway", collect),
+            Node("weather", collect),
+            Node("merge", lambda inputs: merged.append(inputs) or "m", deps=("subway", "weather")),
+        ]
+        results = make_runner(tmp_path, nodes).run()
+
+        assert {name: r.status for name, r in results.items()} == {"subway": "ran", "weather": "ran", "merge": "ran"}
+        assert merged == [{"subway": "ok", "weather": "ok"}]
+
+    def test_unchanged_inputs_are_skipped(self, tmp_path):
+        """A second run skips nodes whose params and upstream outputs did not change."""
+        calls = []
+        source = {"value": "v1"}
+        nodes = [
+            Node("collect", lambda inputs: calls.append("collect") or source["value"]),
+            Node("merge", lambda inputs: calls.append("merge") or inputs["collect"], deps=("collect",)),
+            Node("verify", lambda inputs: calls.append("verify"), deps=("merge",), always_run=True),
+        ]
+        make_runner(tmp_path, nodes).run()
+        results = make_runner(tmp_path, nodes).run()
+        assert calls == ["collect", "merge", "verify", "verify"]
+        assert results["collect"].status == "skipped"
+        assert results["merge"].status == "skipped"
+        assert results["verify"].status == "ran"
+
+        # New upstream output -> downstream reruns
+        source["value"] = "v2"
+        results = make_runner(tmp_path, nodes).run(force={"collect"})
+        assert results["merge"].status == "ran"
+
+    def test_unrestorable_output_reruns(self, tmp_path):
+        """A skipped node whose artifact is gone runs again."""
+        nodes = [Node("merge", lambda inputs: "key", restore=lambda output: False)]
+        make_runner(tmp_path, nodes).run()
+        assert make_runner(tmp_path, nodes).run()["merge"].status == "ran"
+
+    def test_failure_blocks_dependents_only(self, tmp_path):
+        """A failed node blocks its dependents; unrelated branches still run."""
+        def fail(inputs):
+            raise RuntimeError("API down")
+        nodes = [
+            Node("subway", fail),
+            Node("weather", lambda inputs: "w"),
+            Node("merge", lambda inputs: "m", deps=("subway", "weather")),
+            Node("features", lambda inputs: "f", deps=("merge",)),
+        ]
+        results = make_runner(tmp_path, nodes).run()
+
+        assert results["subway"].status == "failed"
+        assert results["weather"].status == "ran"
+        assert results["merge"].status == "blocked"
+        assert results["features"].status == "blocked"
+
+    def test_targets_pull_in_upstream_only(self, tmp_path):
+        """Running a target runs its upstream nodes but not its dependents."""
+        nodes = [
+            Node("collect", lambda inputs: "c"),
+            Node("merge", lambda inputs: "m", deps=("collect",)),
+            Node("store", lambda inputs: "s", deps=("merge",)),
+        ]
+        results = make_runner(tmp_path, nodes).run(targets=["merge"])
+        assert set(results) == {"collect", "merge"}
+
+
+class TestPipelineNodes:
+    """Test the collect → merge → features → store → verify node wiring."""
+
+    def test_nowcast_outage_does_not_block_merge(self, monkeypatch):
+        """A failing nowcast collector yields a sentinel output instead of failing its node."""
+        class FailingCollector:
+            def __init__(self, storage):
+                pass
+
+            def collect(self):
+                raise RuntimeError("relation 'weather_hourly' does not exist")
+
+        monkeypatch.setattr(run_pipeline, "NowcastCollector", FailingCollector)
+        pipeline = SimpleNamespace(storage=None, default_session=PipelineSession("default"), version_id="v")
+        nodes = {node.name: node for node in run_pipeline.build_pipeline_nodes(pipeline, "20240101", "20240101")}
+
+        assert nodes["collect_nowcast"].run({}) == run_pipeline.NOWCAST_UNAVAILABLE
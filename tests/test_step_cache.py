@@ -0,0 +1,70 @@
+"""
+Tests for crawler.step_cache (content-addressed pipeline step artifacts).
+"""
+import pandas as pd
+
+from crawler.step_cache import StepCache, frame_fingerprint, source_fingerprint
+
+
+class TestStepCache:
+    """Test artifact keys, round trips and LRU eviction."""
+
+    def test_key_depends_on_inputs_only(self):
+        """Same step + inputs give the same key regardless of dict order."""
+        k1 = StepCache.make_key("step_7_merge", {"code": "a", "range": [None, None]})
+        k2 = StepCache.make_key("step_7_merge", {"range": [None, None], "code": "a"})
+        assert k1 == k2
+        assert k1 != StepCache.make_key("step_7_merge", {"code": "b", "range": [None, None]})
+        assert k1 != StepCache.make_key("step_8_features", {"code": "a", "range": [None, None]})
+
+    def test_round_trip_keeps_dtypes_and_provenance(self, tmp_path):
+        """A stored frame comes back with its dtypes and the message it was built with."""
+        cache = StepCache(root=str(tmp_path))
+        df = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=3), "count": pd.Series([1, 2, 3], dtype="int32")})
+
+        assert cache.get("ab" * 32) is None
+        cache.set("ab" * 32, df, step="step_7_merge", message="✅ Merged 3 rows.")
+        cached, meta = cache.get("ab" * 32)
+
+        pd.testing.assert_frame_equal(cached, df)
+        assert meta["message"] == "✅ Merged 3 rows."
+        assert meta["rows"] == 3
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_lru_eviction_keeps_size_bounded(self, tmp_path):
+        """Least recently used artifacts are evicted whole once over budget."""
+        cache = StepCache(root=str(tmp_path), max_bytes=20000)
+        df = pd.DataFrame({"v": ["x" * 50] * 200})
+        keys = [f"{i:02d}" * 32 for i in range(10)]
+        for key in keys:
+            cache.set(key, df.assign(i=key), step="s")
+            cache.get(keys[0])  # keep the first artifact hot
+
+        stats = cache.stats()
+        assert stats["evictions"] > 0
+        assert stats["size_mb"] * 1024 * 1024 <= 20000
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+
+    def test_source_fingerprint_changes_with_code(self, tmp_path):
+        """Editing a step's source file changes the code version."""
+        path = tmp_path / "step.py"
+        path.write_text("x = 1")
+        code = source_fingerprint([str(path)])
+        path.write_text("x = 2")
+        assert source_fingerprint([str(path)]) != code
+
+    def test_frame_fingerprint_is_content_based(self):
+        """Row order does not matter; values and dtypes do."""
+        df = pd.DataFrame({"date": ["2024-01-01", "2024-01-02"], "count": [1, 2]})
+        assert frame_fingerprint(df) == frame_fingerprint(df.iloc[::-1])
+        assert frame_fingerprint(df) != frame_fingerprint(df.assign(count=[1, 3]))
+        assert frame_fingerprint(df) != frame_fingerprint(df.astype({"count": "float64"}))
+
+    def test_overwrite_keeps_size_exact(self, tmp_path):
+        """Re-storing an artifact replaces its size in the running total instead of adding to it."""
+        cache = StepCache(root=str(tmp_path))
+        df = pd.DataFrame({"date": ["2024-01-01"], "count": [1]})
+        cache.set("cd" * 32, df, step="step_7_merge")
+        cache.set("cd" * 32, df, step="step_7_merge")
+        assert cache.stats()["size_mb"] * 1024 * 1024 == cache._scan_size()
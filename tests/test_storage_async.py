@@ -0,0 +1,47 @@
+"""
+Tests for the async Supabase storage used by the Gradio handlers.
+"""
+import asyncio
+
+from crawler.storage_supabase_async import AsyncSupabaseStorage
+
+
+class FakeQuery:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    async def execute(self):
+        self.client.in_flight += 1
+        self.client.peak = max(self.client.peak, self.client.in_flight)
+        await asyncio.sleep(0.01)
+        self.client.in_flight -= 1
+        self.client.written.extend(self.rows)
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.written = []
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows, on_conflict):
+        return FakeQuery(self, rows)
+
+
+class TestAsyncStorage:
+    """Test bounded concurrent upserts on the async client."""
+
+    def test_upsert_records_bounds_in_flight_requests(self):
+        """All rows are written while at most `concurrency` batches are in flight."""
+        storage = AsyncSupabaseStorage()
+        storage._client = FakeAsyncClient()
+        records = [{"date": f"2024-01-{d:02d}", "value": d} for d in range(1, 29)]
+
+        written, failed = asyncio.run(storage.upsert_records("model_features", records, "date", max_batch_bytes=120, concurrency=2))
+        assert (written, failed) == (28, 0)
+        assert sorted(r["value"] for r in storage._client.written) == list(range(1, 29))
+        assert storage._client.peak == 2
@@ -0,0 +1,47 @@
+"""
+Tests for the shared, lazily initialized SupabaseStorage.
+"""
+import threading
+
+from crawler import storage_supabase
+from crawler.storage_supabase import SupabaseStorage, get_storage
+
+
+class TestStorageRegistry:
+    """Test lazy client creation and the process-wide instance."""
+
+    def test_client_is_created_on_first_access_only(self, monkeypatch):
+        """Constructing storage does not build a client; concurrent first accesses build one."""
+        monkeypatch.setenv("SUPABASE_URL", "http://localhost")
+        monkeypatch.setenv("SUPABASE_KEY", "key")
+        created = []
+        monkeypatch.setattr(storage_supabase, "create_client", lambda url, key: created.append(url) or object())
+
+        storage = SupabaseStorage()
+        assert created == []
+
+        threads = [threading.Thread(target=lambda: storage.client) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(created) == 1
+
+    def test_failed_health_check_resets_client(self, monkeypatch):
+        """A failing probe drops the client so the next access rebuilds it."""
+        monkeypatch.setenv("SUPABASE_URL", "http://localhost")
+        monkeypatch.setenv("SUPABASE_KEY", "key")
+
+        class BrokenClient:
+            def table(self, name):
+                raise ConnectionError("down")
+
+        monkeypatch.setattr(storage_supabase, "create_client", lambda url, key: BrokenClient())
+        storage = SupabaseStorage()
+        first = storage.client
+        assert storage.health_check() is False
+        assert storage.client is not first
+
+    def test_get_storage_is_shared(self):
+        """Every caller gets the same instance."""
+        assert get_storage() is get_storage()
@@ -0,0 +1,253 @@
+"""
+Tests for Open-Meteo range chunking, weather persistence and the local daily weather store.
+"""
+import json
+
+import pandas as pd
+
+from crawler.backfill_weather import OpenMeteoCollector, split_by_year
+from crawler.features import FeatureEngineer
+from crawler.local_mirror import DailyWeatherStore
+from crawler.pipeline import DataPipeline
+from crawler.storage_supabase import split_by_bytes
+
+
+def _daily(dates, temp=1.0):
+    return pd.DataFrame({
+        "date": dates,
+        "avg_temp": temp,
+        "precip_total": 0.0,
+        "rain_sum": 0.0,
+        "snowfall_sum": 0.0,
+        "precipitation_type": 0,
+    })
+
+
+class TestSplitByYear:
+    """Test year-sized chunking of long spans."""
+
+    def test_splits_on_year_boundaries(self):
+        """A multi-year span becomes contiguous calendar-year chunks."""
+        assert split_by_year("2022-06-01", "2024-02-10") == [
+            ("2022-06-01", "2022-12-31"),
+            ("2023-01-01", "2023-12-31"),
+            ("2024-01-01", "2024-02-10"),
+        ]
+
+
+class TestDailyWeatherStore:
+    """Test persistence and range reads of the local weather store."""
+
+    def test_upsert_replaces_dates_and_skips_missing_temps(self, tmp_path):
+        """Later rows win per date; rows without a temperature are not stored."""
+        store = DailyWeatherStore(path=str(tmp_path / "weather.parquet"))
+        store.upsert(_daily(["2023-01-01", "2023-01-02"]))
+        store.upsert(pd.concat([_daily(["2023-01-02"], temp=5.0), _daily(["2023-01-03"], temp=None)]))
+
+        df = store.read()
+        assert df["date"].tolist() == ["2023-01-01", "2023-01-02"]
+        assert df["avg_temp"].tolist() == [1.0, 5.0]
+        assert store.read("2023-01-02", "2023-01-02")["date"].tolist() == ["2023-01-02"]
+
+    def test_fetch_daily_only_requests_missing_ranges(self, tmp_path):
+        """Dates already in the store are not fetched again."""
+        collector = OpenMeteoCollector.__new__(OpenMeteoCollector)
+        collector.store = DailyWeatherStore(path=str(tmp_path / "weather.parquet"))
+        collector.store.upsert(_daily(["2023-01-02", "2023-01-03"]))
+
+        requested = []
+        def fake_history(start_date, end_date):
+            requested.append((start_date, end_date))
+            return _daily(pd.date_range(start_date, end_date).strftime("%Y-%m-%d").tolist())
+        collector.fetch_history = fake_history
+
+        df = collector.fetch_daily("2023-01-01", "2023-01-05")
+        assert requested == [("2023-01-01", "2023-01-01"), ("2023-01-04", "2023-01-05")]
+        assert len(df) == 5
+
+
+class TestWeatherRecords:
+    """Test the vectorized 'weather_data' payload and byte-sized batching."""
+
+    def test_records_are_json_ready_and_unique(self):
+        """NaN becomes None, ints stay ints and measured_at is unique per upsert."""
+        df = _daily(["2024-01-01", "2024-01-02", "2024-01-02"])
+        df.loc[0, "avg_temp"] = float("nan")
+        records = OpenMeteoCollector.to_weather_records(df)
+        assert [r["measured_at"] for r in records] == ["2024-01-01T12:00:00", "2024-01-02T12:00:00"]
+        assert records[0]["temperature"] is None
+        assert type(records[1]["precipitation_type"]) is int
+
+    def test_split_by_bytes_respects_limit(self):
+        """Batches stay under the byte budget and keep every record in order."""
+        records = [{"measured_at": f"2024-01-{d:02d}T12:00:00", "temperature": 1.0} for d in range(1, 31)]
+        batches = split_by_bytes(records, 400)
+        assert len(batches) > 1
+        assert [r for b in batches for r in b] == records
+        assert all(len(json.dumps(b)) <= 400 for b in batches)
+
+
+class TestWeatherJoin:
+    """Test the datetime64 date-indexed weather join used by step_7_merge."""
+
+    def test_left_join_on_datetime_keys(self):
+        """String weather dates join onto datetime subway dates; unmatched days stay NaN."""
+        subway = pd.DataFrame({
+            "date": pd.to_datetime(["2024-01-03", "2024-01-01", "2024-01-02"]),
+            "station_name": ["성수"] * 3,
+            "boarding_count": [3, 1, 2],
+        })
+        weather = pd.DataFrame({
+            "date": ["2024-01-01", "2024-01-02", "2024-01-02"],
+            "avg_temp": [1.0, 2.0, 2.5],
+        })
+        merged = DataPipeline._join_weather(subway, weather)
+
+        assert merged["date"].dtype == "datetime64[ns]"
+        assert merged["date"].is_monotonic_increasing
+        assert len(merged) == 3
+        assert merged["boarding_count"].tolist() == [1, 2, 3]
+        assert merged["avg_temp"].tolist()[:2] == [1.0, 2.5]
+        assert pd.isna(merged["avg_temp"].iloc[2])
+
+
+class OfflineStorage:
+    client = None
+
+
+def _offline_pipeline(tmp_path):
+    """A DataPipeline over a tmp mirror, weather store and step cache, without Supabase."""
+    from crawler.local_mirror import LocalMirror
+    from crawler.pipeline_sessions import FrameCache, PipelineSession
+    from crawler.step_cache import StepCache
+
+    pipeline = DataPipeline.__new__(DataPipeline)
+    pipeline.storage = OfflineStorage()
+    pipeline.mirror = LocalMirror(pipeline.storage, root=str(tmp_path / "mirror"))
+    pipeline.weather_collector = OpenMeteoCollector.__new__(OpenMeteoCollector)
+    pipeline.weather_collector.store = DailyWeatherStore(path=str(tmp_path / "weather.parquet"))
+    pipeline.step_cache = StepCache(root=str(tmp_path / "step_cache"))
+    pipeline.frames = FrameCache(pipeline.step_cache)
+    pipeline.default_session = PipelineSession("default")
+
+    pipeline.mirror._merge_rows("subway_traffic", pd.DataFrame({
+        "id": [1, 2, 3],
+        "date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "station_name": "성수",
+        "line_number": "2호선",
+        "boarding_count": [10, 20, 30],
+        "alighting_count": [1, 2, 3],
+    }))
+    pipeline.mirror.state = {"subway_traffic": {"max_date": "2024-01-03", "created_at_watermark": "2024-01-04"}}
+    pipeline.mirror._save_state()
+    pipeline.weather_collector.store.upsert(_daily(["2024-01-01", "2024-01-02", "2024-01-03"]))
+    return pipeline
+
+
+class TestMergeCache:
+    """Test that step_7_merge serves unchanged inputs before fetching anything."""
+
+    def test_hit_skips_loading(self, tmp_path, monkeypatch):
+        """A second merge over unchanged mirror and store state reads neither source."""
+        pipeline = _offline_pipeline(tmp_path)
+        msg, _ = pipeline.step_7_merge("2024-01-01", "2024-01-03")
+        assert msg.startswith("✅ Merged 3 rows.")
+        first_key = pipeline.default_session.merged_key
+
+        def fail(*args):
+            raise AssertionError("inputs were fetched on a cache hit")
+        monkeypatch.setattr(pipeline, "_load_subway", fail)
+        monkeypatch.setattr(pipeline, "_load_weather", fail)
+        msg, preview = pipeline.step_7_merge("2024-01-01", "2024-01-03")
+        assert "♻️ Cache hit" in msg
+        assert pipeline.default_session.merged_key == first_key
+        assert len(preview) == 3
+
+    def test_store_change_misses(self, tmp_path):
+        """Revised weather changes the key, so the merge is rebuilt."""
+        pipeline = _offline_pipeline(tmp_path)
+        pipeline.step_7_merge("2024-01-01", "2024-01-03")
+        first_key = pipeline.default_session.merged_key
+
+        pipeline.weather_collector.store.upsert(_daily(["2024-01-02"], temp=9.0))
+        msg, _ = pipeline.step_7_merge("2024-01-01", "2024-01-03")
+        assert "Cache hit" not in msg
+        assert pipeline.default_session.merged_key != first_key
+
+    def test_new_days_load_only_the_tail(self, tmp_path, monkeypatch):
+        """Days the sync added after the known range are loaded on their own, not the whole range again."""
+        pipeline = _offline_pipeline(tmp_path)
+        monkeypatch.setattr(pipeline, "_known_subway_range", lambda start, end: ("2024-01-01", "2024-01-02"))
+        load_weather = pipeline._load_weather
+        calls = []
+
+        def recording_load(start_date, end_date):
+            calls.append((start_date, end_date))
+            return load_weather(start_date, end_date)
+        monkeypatch.setattr(pipeline, "_load_weather", recording_load)
+
+        msg, _ = pipeline.step_7_merge()
+        assert msg.startswith("✅ Merged 3 rows.")
+        assert sorted(calls) == [("2024-01-01", "2024-01-02"), ("2024-01-03", "2024-01-03")]
+        merged = pipeline.frames.get(pipeline.default_session.merged_key)
+        assert merged["avg_temp"].notna().all()
+
+
+class TestFetchHistory:
+    """Test that year chunks succeed or fail independently."""
+
+    def test_reversed_range_is_empty(self):
+        """start_date after end_date yields an empty frame, not a thread pool error."""
+        collector = OpenMeteoCollector.__new__(OpenMeteoCollector)
+        assert collector.fetch_history("2024-02-10", "2024-01-01").empty
+
+    def test_failed_chunk_keeps_other_years(self):
+        """A chunk that fails twice is left out; the other years are still returned."""
+        collector = OpenMeteoCollector.__new__(OpenMeteoCollector)
+        attempts = []
+
+        def fake_range(start_date, end_date):
+            attempts.append(start_date)
+            if start_date.startswith("2023"):
+                raise ConnectionError("archive unavailable")
+            return pd.DataFrame({
+                "time": [start_date],
+                "temperature_2m_mean": [1.0],
+                "precipitation_sum": [0.0],
+                "rain_sum": [0.0],
+                "snowfall_sum": [0.0],
+            })
+        collector._fetch_range = fake_range
+
+        df = collector.fetch_history("2022-12-31", "2024-01-01")
+        assert df["date"].tolist() == ["2022-12-31", "2024-01-01"]
+        assert attempts.count("2023-01-01") == 2
+
+
+class TestDayFeatures:
+    """Test single-day features over a context window with gaps."""
+
+    def test_gaps_are_flagged_not_dropped(self, tmp_path):
+        """The day's row survives lags the context cannot supply; they are NaN and gap-flagged."""
+        pipeline = _offline_pipeline(tmp_path)
+        pipeline.fe = FeatureEngineer()
+        pipeline.step_7_merge("2024-01-01", "2024-01-03")
+
+        msg, _ = pipeline.step_8_features(day="2024-01-03")
+        assert msg.startswith("✅ Generated Features.")
+        df = pipeline.frames.get(pipeline.default_session.final_key)
+        assert df["date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-03"]
+        row = df.iloc[0]
+        assert row["lag_1d"] == 22 and row["lag_1d_is_gap"] == 0
+        assert pd.isna(row["lag_7d"]) and row["lag_7d_is_gap"] == 1
+        assert pd.isna(row["lag_364d"]) and row["lag_364d_is_gap"] == 1
+        assert pd.isna(row["rolling_7d_avg"])
+
+    def test_missing_day_fails(self, tmp_path):
+        """A day without a subway row is reported as a failure."""
+        pipeline = _offline_pipeline(tmp_path)
+        pipeline.fe = FeatureEngineer()
+        pipeline.step_7_merge("2024-01-01", "2024-01-03")
+
+        msg, _ = pipeline.step_8_features(day="2024-01-05")
+        assert msg.startswith("❌ No subway data for 2024-01-05.")